@@ -5,6 +5,7 @@ import subprocess
 import json
 import sys
 import pprint
+from concurrent.futures import ThreadPoolExecutor
 
 import reframe as rfm
 from reframe.core.exceptions import BuildSystemError, CommandLineError
@@ -96,15 +97,16 @@ def parse_path_metadata(path):
     info['path'] = path
     return info
 
-def find_run_outputs(root='.', test='*', ext='.out'):
+def find_run_outputs(root='.', test='*', ext='.out', workers=1):
     """ Find test files within an output tree.
 
         Args:
             root: str, path to start searching from
             test: str, limit results to last directory component matching this (can use shell-style wildcards), default any
             ext: str, limit results to files with this extension
+            workers: int, number of threads used to list directories in parallel
 
-        Returns a sequence of str paths.
+        Returns a sorted sequence of str paths.
     """
 
     # directory is soemthing like:
@@ -123,19 +125,39 @@ def find_run_outputs(root='.', test='*', ext='.out'):
     # runtime.init_runtime(settings.site_configuration, options.system,
     #                              non_default_craype=options.non_default_craype)
 
+    # list directories one level at a time, in parallel as listing is slow on parallel filesystems
     results = []
-    for (dirpath, dirnames, filenames) in os.walk(root):
-        # in-place filter dirnames to avoid hidden directories:
-        for idx, d in enumerate(dirnames):
-            if d.startswith('.'):
-                del dirnames[idx]
-        for f in filenames:
-            if os.path.splitext(f)[-1] == ext:
-                path = os.path.join(dirpath, f)
-                testdir = os.path.basename(os.path.dirname(path))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        dirpaths = [root]
+        while dirpaths:
+            subdirs = []
+            for dirpath, dirnames, filenames in pool.map(scan_dir, dirpaths):
+                # avoid hidden directories:
+                subdirs.extend(os.path.join(dirpath, d) for d in dirnames if not d.startswith('.'))
+                testdir = os.path.basename(os.path.normpath(dirpath))
                 if fnmatch.fnmatchcase(testdir, test):
-                    results.append(path)
-    return(results)
+                    results.extend(os.path.join(dirpath, f) for f in filenames if os.path.splitext(f)[-1] == ext)
+            dirpaths = subdirs
+    # sort so the order does not depend on directory listing order or the level-by-level search
+    return(sorted(results))
+
+def scan_dir(path):
+    """ List a directory with a single os.scandir call.
+
+        Args:
+            path: str, path to directory
+
+        Returns a tuple (path, subdirectory names, file names), as os.walk.
+    """
+    dirnames, filenames = [], []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                # symlinks to directories are not followed, as os.walk
+                (dirnames if entry.is_dir(follow_symlinks=False) else filenames).append(entry.name)
+    except OSError: # e.g. directory removed or not readable, skipped as by os.walk
+        pass
+    return path, dirnames, filenames
 
 def diff_dicts(dicts, ignore=None):
     """ Given a sequence of dicts, returns
@@ -0,0 +1,197 @@
+import math
+import re
+
+import pandas as pd
+
+# statistics exported for each aggregated group (in addition to the number of runs)
+STATISTICS = ["mean", "median", "min", "max", "std"]
+# statistics that can be plotted (or a percentile, e.g. "p90")
+PLOT_STATISTICS = ["mean", "median", "min", "max"]
+# error bar options (or a percentile range, e.g. "p5_p95")
+ERRORS = ["std", "ci95", "min_max"]
+# two-sided 95% critical values of Student's t-distribution for 1 to 30 degrees of freedom
+T_CRITICAL_95 = [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+                 2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+                 2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042]
+# two-sided 95% critical value of the standard normal distribution
+Z_CRITICAL_95 = 1.959964
+
+PERCENTILE = re.compile(r"^p(\d+(?:\.\d+)?)$")
+PERCENTILE_RANGE = re.compile(r"^p(\d+(?:\.\d+)?)_p(\d+(?:\.\d+)?)$")
+
+
+def get_percentile(statistic: str):
+    """
+        Return the percentile of a percentile statistic (e.g. 90 for "p90"), or None if
+        the statistic is not a valid percentile.
+
+        Args:
+            statistic: str, statistic name.
+    """
+
+    match = PERCENTILE.match(str(statistic))
+    if match and 0 <= float(match.group(1)) <= 100:
+        return float(match.group(1))
+    return None
+
+
+def get_percentile_range(error: str):
+    """
+        Return a tuple containing the lower and upper percentiles of a percentile range
+        (e.g. (5, 95) for "p5_p95"), or None if the error is not a valid percentile range.
+
+        Args:
+            error: str, error bar option.
+    """
+
+    match = PERCENTILE_RANGE.match(str(error))
+    if match:
+        lower, upper = float(match.group(1)), float(match.group(2))
+        if 0 <= lower <= upper <= 100:
+            return lower, upper
+    return None
+
+
+def is_statistic(statistic: str):
+    """
+        Return whether a statistic can be plotted.
+
+        Args:
+            statistic: str, statistic name.
+    """
+    return statistic in PLOT_STATISTICS or get_percentile(statistic) is not None
+
+
+def is_error(error: str):
+    """
+        Return whether an error bar option is valid.
+
+        Args:
+            error: str, error bar option.
+    """
+    return error in ERRORS or get_percentile_range(error) is not None
+
+
+def get_error_columns(y_column: str, aggregation: 'dict | None'):
+    """
+        Return the names of the lower and upper error bar columns of an aggregated y-axis,
+        or an empty list if there are no error bars.
+
+        Args:
+            y_column: str, name of y-axis column.
+            aggregation: dict | None, aggregation statistic and error bar information.
+    """
+
+    if not aggregation or not aggregation.get("error"):
+        return []
+    return ["{0}_lower".format(y_column), "{0}_upper".format(y_column)]
+
+
+def t_critical_95(dof: pd.Series):
+    """
+        Return the two-sided 95% critical values of Student's t-distribution for given
+        degrees of freedom (NaN for less than one degree of freedom).
+
+        Args:
+            dof: pd.Series, degrees of freedom.
+    """
+
+    def critical_value(n):
+        if n < 1:
+            return math.nan
+        if n <= len(T_CRITICAL_95):
+            return T_CRITICAL_95[int(n) - 1]
+        # Cornish-Fisher expansion (accurate to three decimal places beyond the table)
+        z = Z_CRITICAL_95
+        return z + (z**3 + z) / (4 * n) + (5 * z**5 + 16 * z**3 + 3 * z) / (96 * n**2)
+
+    # one look-up per distinct number of runs
+    return dof.map({n: critical_value(n) for n in dof.unique()})
+
+
+def group_statistic(grouped, statistic: str):
+    """
+        Return a statistic of grouped values.
+
+        Args:
+            grouped: pd.core.groupby.SeriesGroupBy, grouped values.
+            statistic: str, statistic name (or percentile, e.g. "p90").
+    """
+
+    percentile = get_percentile(statistic)
+    return grouped.quantile(percentile / 100) if percentile is not None else grouped.agg(statistic)
+
+
+def aggregate(df: pd.DataFrame, group_columns: 'list[str]', y_column: str, statistic: str,
+              error: 'str | None' = None, other_columns: 'list[str] | None' = None):
+    """
+        Return a tuple containing a dataframe with one row per group of repeated runs and
+        the names of its statistic columns. The y-axis column holds the selected statistic,
+        and error bars are stored in <y_column>_lower and <y_column>_upper columns.
+
+        Args:
+            df: pd.DataFrame, data to aggregate.
+            group_columns: list[str], names of columns identifying repeated runs (x-axis and series).
+            y_column: str, name of y-axis column.
+            statistic: str, plotted statistic (mean, median, min, max, or a percentile, e.g. "p90").
+            error: str | None, error bars (std, ci95, min_max, or a percentile range, e.g. "p5_p95").
+                ci95 error bars can only be used with the mean.
+            other_columns: list[str] | None, names of columns to keep (the first value of each group).
+    """
+
+    if not pd.api.types.is_numeric_dtype(df[y_column].dtype):
+        raise TypeError("Cannot aggregate column '{0}' of type {1}. Aggregated column must be numeric."
+                        .format(y_column, df[y_column].dtype))
+    if error == "ci95" and statistic != "mean":
+        raise RuntimeError("ci95 error bars are a confidence interval of the mean and can only be "
+                           "used with the mean statistic.")
+
+    group_columns = list(dict.fromkeys(group_columns))
+    other_columns = [c for c in dict.fromkeys(other_columns or [])
+                     if c not in group_columns and c != y_column]
+    # NOTE: null x-axis and series values form their own groups
+    groups = df.groupby(group_columns, sort=False, observed=True, dropna=False)
+    grouped = groups[y_column]
+
+    # compute all statistics in one pass over the groups
+    stats = grouped.agg(["count"] + STATISTICS)
+    percentile_range = get_percentile_range(error) if error else None
+    percentiles = list(dict.fromkeys(
+        ([get_percentile(statistic)] if get_percentile(statistic) is not None else []) +
+        (list(percentile_range) if percentile_range else [])))
+    if percentiles:
+        values = grouped.quantile([p / 100 for p in percentiles]).unstack()
+        values.columns = [percentile_name(p) for p in percentiles]
+        stats = stats.join(values)
+
+    # plotted values and error bars
+    plotted = stats[statistic if statistic in STATISTICS else percentile_name(get_percentile(statistic))]
+    errors = {}
+    if error == "std":
+        errors = {"lower": plotted - stats["std"], "upper": plotted + stats["std"]}
+    elif error == "ci95":
+        # confidence interval of the mean (NaN for single runs)
+        half_width = t_critical_95(stats["count"] - 1) * stats["std"] / stats["count"]**0.5
+        errors = {"lower": stats["mean"] - half_width, "upper": stats["mean"] + half_width}
+    elif error == "min_max":
+        errors = {"lower": stats["min"], "upper": stats["max"]}
+    elif percentile_range:
+        errors = {"lower": stats[percentile_name(percentile_range[0])],
+                  "upper": stats[percentile_name(percentile_range[1])]}
+
+    stats.columns = ["{0}_{1}".format(y_column, c) for c in stats.columns]
+    errors = {"{0}_{1}".format(y_column, e): values for e, values in errors.items()}
+    result = pd.concat([groups[other_columns].first(), plotted.rename(y_column)] +
+                       [values.rename(c) for c, values in errors.items()] + [stats], axis=1)
+
+    return result.reset_index(), list(errors) + stats.columns.tolist()
+
+
+def percentile_name(percentile: float):
+    """
+        Return the statistic name of a percentile (e.g. "p90" for 90.0).
+
+        Args:
+            percentile: float, percentile between 0 and 100.
+    """
+    return "p{0:g}".format(percentile)
@@ -0,0 +1,210 @@
+import argparse
+import glob
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+
+from config_handler import ConfigHandler
+from perflog_handler import PerflogHandler
+from post_processing import PostProcessing, enable_copy_on_write
+
+# config file extensions searched for in config directories
+CONFIG_EXTS = [".yaml", ".yml"]
+
+# post-processing instance shared by all configs processed in a worker
+worker_post = None
+
+
+def find_configs(config_path: str):
+    """
+        Return a sorted list of paths to config files in a directory or matching a glob pattern.
+
+        Args:
+            config_path: str, path to a directory containing config files, or a glob pattern
+                (e.g. "configs/*.yaml").
+    """
+
+    if os.path.isdir(config_path):
+        config_files = [os.path.join(config_path, f) for f in os.listdir(config_path)
+                        if os.path.splitext(f)[1] in CONFIG_EXTS]
+    else:
+        config_files = glob.glob(config_path)
+
+    config_files = sorted(f for f in config_files if os.path.isfile(f))
+    if not config_files:
+        raise FileNotFoundError("No config files found", config_path)
+    return config_files
+
+
+def init_worker(df, output_path: Path, save_data, debug):
+    """
+        Create the post-processing instance of a worker from the shared perflog data.
+
+        Args:
+            df: pd.DataFrame, perflog data shared by all configs.
+            output_path: Path, path to a directory for storing outputs.
+            save_data: str, state of dataframe to save to csv file.
+            debug: bool, flag to print additional information to console.
+    """
+
+    global worker_post
+    # configs processed by the same instance reuse the masks of common filter conditions
+    worker_post = PostProcessing.from_dataframe(df, output_path, save_data, debug=debug)
+
+
+def run_config(config_file: str):
+    """
+        Return a dictionary containing the config path, the processing time in seconds,
+        the number of plotted rows, and an error message (None if processing succeeded).
+        Outputs are stored in a subdirectory of the output path named after the config file.
+
+        Args:
+            config_file: str, path to config file.
+    """
+
+    start = time.perf_counter()
+    post = worker_post
+    output_path = post.output_path
+    rows, error = None, None
+    try:
+        config = ConfigHandler.from_path(config_file)
+        # keep outputs of different configs apart (e.g. csv files or plots with the same title)
+        post.output_path = os.path.join(output_path, Path(config_file).stem)
+        post.reset_df()
+        rows = len(post.run_post_processing(config))
+    except Exception as e:
+        error = "{0}: {1}".format(type(e).__name__, e)
+        if post.debug:
+            print(traceback.format_exc())
+    finally:
+        post.output_path = output_path
+
+    return {"config": config_file, "time": time.perf_counter() - start, "rows": rows, "error": error}
+
+
+def run_batch(log_path: Path, config_files: 'list[str]', output_path=Path(__file__).parent,
+              save_data=None, debug=False, workers=1, cache_path=None, project=False, categorical=True):
+    """
+        Return a list of per-config results (see run_config) from post-processing several configs.
+        Perflogs are read once and the resulting dataframe is shared (read-only) by all configs.
+
+        Args:
+            log_path: Path, path to performance log file or directory, or to a perflog archive.
+            config_files: list[str], paths to config files.
+            output_path: Path, path to a directory for storing outputs. Default is current directory.
+            save_data: str, state of dataframe to save to csv file.
+                Options: ['original', 'filtered', 'transformed']
+            debug: bool, flag to print additional information to console.
+            workers: int, number of processes used to parse perflogs and process configs in parallel.
+            cache_path: Path | None, path to a directory for caching parsed perflogs.
+            project: bool, flag to only load the columns used by any of the configs.
+            categorical: bool, flag to store repetitive string columns as pandas categoricals.
+    """
+
+    columns = None
+    if project:
+        configs = [ConfigHandler.from_path(f) for f in config_files]
+        columns = list(dict.fromkeys(c for config in configs
+                                     for c in config.all_columns + config.extra_columns))
+
+    start = time.perf_counter()
+    perflogs = PerflogHandler(log_path, debug, workers, cache_path, columns=columns, categorical=categorical)
+    df = perflogs.get_df()
+    print("Loaded {0} rows in {1:.2f}s".format(len(df), time.perf_counter() - start))
+
+    # NOTE: forked workers share the dataframe with the parent process until it is modified,
+    # which post-processing never does (processed columns are copied on write when main
+    # enables copy-on-write, and copied up front otherwise)
+    parallel = workers > 1 and len(config_files) > 1
+    initargs = (df, output_path, save_data, debug)
+    with (ProcessPoolExecutor(max_workers=min(workers, len(config_files)),
+                              initializer=init_worker, initargs=initargs)
+          if parallel else nullcontext()) as pool:
+        if not parallel:
+            init_worker(*initargs)
+        results = list(pool.map(run_config, config_files) if parallel else map(run_config, config_files))
+
+    return results
+
+
+def print_summary(results: 'list[dict]', total_time: float):
+    """
+        Print the processing time, number of plotted rows, and status of each config.
+
+        Args:
+            results: list[dict], per-config results (see run_config).
+            total_time: float, total wall time in seconds.
+    """
+
+    width = max(len(r["config"]) for r in results)
+    print("{0:<{1}}  {2:>8}  {3:>8}  {4}".format("config", width, "time (s)", "rows", "status"))
+    for r in results:
+        print("{0:<{1}}  {2:>8.2f}  {3:>8}  {4}".format(
+            r["config"], width, r["time"], r["rows"] if r["rows"] is not None else "-", r["error"] or "ok"))
+    failed = sum(r["error"] is not None for r in results)
+    print("Processed {0} configs ({1} failed) in {2:.2f}s".format(len(results), failed, total_time))
+
+
+def read_args():
+    """
+        Return parsed command line arguments.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Plot benchmark data for several configs, reading the perflogs only once.")
+
+    # required positional arguments
+    parser.add_argument("log_path", type=Path,
+                        help="path to a perflog file or a directory containing perflog files")
+    parser.add_argument("config_path", type=str,
+                        help="path to a directory containing configuration files, or a glob pattern \
+                            matching configuration files (quote it to stop the shell expanding it)")
+
+    # optional arguments
+    parser.add_argument("-o", "--output_path", type=Path, default=Path(__file__).parent,
+                        help="path to a directory for storing outputs, with one subdirectory per config \
+                            (default is current directory)")
+    parser.add_argument("-s", "--save_data", type=str,
+                        help="state in which to save perflog data to a csv file (default is no data saved); \
+                            options: ['original', 'filtered', 'transformed']")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of processes used to parse perflogs and process configs in parallel \
+                            (default is 1)")
+    parser.add_argument("-c", "--cache_path", type=Path,
+                        help="path to a directory for caching parsed perflogs between runs \
+                            (default is no caching)")
+    parser.add_argument("-p", "--project", action="store_true",
+                        help="only load the columns used in any of the configs")
+    parser.add_argument("--no_categorical", action="store_true",
+                        help="store all string columns as python objects rather than pandas categoricals")
+    parser.add_argument("-d", "--debug", action="store_true",
+                        help="debug flag for printing additional information")
+
+    return parser.parse_args()
+
+
+def main():
+
+    args = read_args()
+    # share unmodified columns between the perflog data and the data processed for each config
+    enable_copy_on_write()
+
+    try:
+        start = time.perf_counter()
+        results = run_batch(args.log_path, find_configs(args.config_path), args.output_path,
+                            args.save_data, args.debug, args.jobs, args.cache_path,
+                            args.project, not args.no_categorical)
+        print_summary(results, time.perf_counter() - start)
+
+    except Exception as e:
+        print(type(e).__name__ + ":", e)
+        print("Batch post-processing stopped")
+        if args.debug:
+            print(traceback.format_exc())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,9 @@
 from pathlib import Path
 
 import yaml
+from aggregation_handler import is_error, is_statistic
+from downsampling import DOWNSAMPLING_METHODS, MIN_POINTS
+from scaling_analysis import SCALING_METRICS, SCALING_TYPES
 
 
 class ConfigHandler:
@@ -27,6 +30,9 @@ class ConfigHandler:
         self.series = config.get("series")
         self.column_types = config.get("column_types")
         self.extra_columns = config.get("extra_columns_to_csv")
+        self.aggregation = config.get("aggregation")
+        self.scaling_analysis = config.get("scaling_analysis")
+        self.downsampling = config.get("downsampling")
 
         # parse filter information
         self.and_filters = []
@@ -152,14 +158,16 @@ class ConfigHandler:
         # FIXME (issue #255): allow all series values to be selected with *
         # (or if only column name is supplied)
 
-        # series columns
-        # NOTE: currently assuming there can only be one unique series column
+        # series columns (one series per combination of their values)
         self.series_columns = (list(dict.fromkeys([s[0] for s in self.series_filters]))
                                if self.series_filters else [])
-        # add series column to plot column list
+        # add series columns to plot column list
         for s in self.series_columns:
             if s not in self.plot_columns:
                 self.plot_columns.append(s)
+        # add scaling analysis resource column to plot column list
+        if self.scaling_analysis and self.scaling_analysis.get("resource_column"):
+            self.plot_columns.append(self.scaling_analysis["resource_column"])
         # drop None values
         self.plot_columns = list(dict.fromkeys([c for c in self.plot_columns if c is not None]))
 
@@ -203,7 +211,11 @@ class ConfigHandler:
             "filters": self.filters,
             "series": self.series,
             "column_types": self.column_types,
-            "extra_columns_to_csv": self.extra_columns})
+            "extra_columns_to_csv": self.extra_columns,
+            # only include optional aggregation, scaling analysis, and downsampling information if it is used
+            **({"aggregation": self.aggregation} if self.aggregation else {}),
+            **({"scaling_analysis": self.scaling_analysis} if self.scaling_analysis else {}),
+            **({"downsampling": self.downsampling} if self.downsampling else {})})
 
     def to_yaml(self):
         """
@@ -295,11 +307,34 @@ def read_config(config: dict):
             raise RuntimeError("Invalid custom scaling value (cannot divide by {0})."
                                .format(config.get("y_axis").get("scaling").get("custom")))
 
-    # check optional series information
-    if config.get("series"):
-        if len(set([s[0] for s in config.get("series")])) > 1:
-            raise RuntimeError("Currently supporting grouping of series by only one column. \
-                               Please use a single column name in your series configuration.")
+    # check optional aggregation information
+    if config.get("aggregation"):
+        if not is_statistic(config.get("aggregation").get("statistic")):
+            raise RuntimeError("Aggregation statistic must be one of 'mean', 'median', 'min', 'max', "
+                               "or a percentile (e.g. 'p90').")
+        if (config.get("aggregation").get("error") is not None and
+            not is_error(config.get("aggregation").get("error"))):
+            raise RuntimeError("Aggregation error must be one of 'std', 'ci95', 'min_max', "
+                               "or a percentile range (e.g. 'p5_p95').")
+        if (config.get("aggregation").get("error") == "ci95" and
+            config.get("aggregation").get("statistic") != "mean"):
+            raise RuntimeError("Aggregation error 'ci95' can only be used with the 'mean' statistic.")
+
+    # check optional scaling analysis information
+    if config.get("scaling_analysis"):
+        if config.get("scaling_analysis").get("type") not in SCALING_TYPES:
+            raise RuntimeError("Scaling analysis type must be one of 'strong' or 'weak'.")
+        if config.get("scaling_analysis").get("metric", "efficiency") not in SCALING_METRICS:
+            raise RuntimeError("Scaling analysis metric must be one of 'speedup', 'efficiency', "
+                               "or 'serial_fraction'.")
+
+    # check optional downsampling information
+    if config.get("downsampling"):
+        points = config.get("downsampling").get("points")
+        if isinstance(points, bool) or not isinstance(points, int) or points < MIN_POINTS:
+            raise RuntimeError("Downsampling points must be an integer of at least {0}.".format(MIN_POINTS))
+        if config.get("downsampling").get("method", "lttb") not in DOWNSAMPLING_METHODS:
+            raise RuntimeError("Downsampling method must be one of 'lttb' or 'min_max'.")
 
     # check column types information
     if not config.get("column_types"):
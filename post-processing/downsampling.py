@@ -0,0 +1,110 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype as is_datetime
+
+# downsampling methods (largest-triangle-three-buckets or per-bucket minimum and maximum)
+DOWNSAMPLING_METHODS = ["lttb", "min_max"]
+# smallest number of points a series can be downsampled to (the first and last points are always kept)
+MIN_POINTS = 3
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int):
+    """
+        Return the positions of the points selected by the Largest-Triangle-Three-Buckets
+        algorithm. The first and last points are kept, and one point is kept from each of
+        the buckets in between: the point forming the largest triangle with the point kept
+        from the previous bucket and the mean of the next bucket, so that peaks are preserved.
+
+        Args:
+            x: np.ndarray, sorted x-axis values.
+            y: np.ndarray, y-axis values.
+            points: int, number of points to keep.
+    """
+
+    n = len(x)
+    if points >= n or points < MIN_POINTS:
+        return np.arange(n)
+
+    # bucket edges of all points except the first and last
+    edges = np.linspace(1, n - 1, points - 1).astype(int)
+    selected = np.empty(points, dtype=int)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(points - 2):
+        start, end = edges[i], edges[i + 1]
+        # the next bucket of the last bucket is the last point
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        mean_x, mean_y = x[end:next_end].mean(), y[end:next_end].mean()
+        # twice the triangle areas (the factor does not change the largest triangle)
+        areas = np.abs((x[a] - mean_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (mean_y - y[a]))
+        a = start + int(np.argmax(areas))
+        selected[i + 1] = a
+
+    return selected
+
+
+def min_max(x: np.ndarray, y: np.ndarray, points: int):
+    """
+        Return the positions of the minimum and maximum points of equal-width x-axis buckets
+        (e.g. one bucket per horizontal pixel), together with the first and last points.
+        All local extremes are kept, at the cost of twice as many points per bucket as LTTB.
+
+        Args:
+            x: np.ndarray, sorted x-axis values.
+            y: np.ndarray, y-axis values.
+            points: int, maximum number of points to keep.
+    """
+
+    n = len(x)
+    if points >= n or points < MIN_POINTS:
+        return np.arange(n)
+
+    num_buckets = max((points - 2) // 2, 1)
+    width = x[-1] - x[0]
+    buckets = (np.minimum(((x - x[0]) / width * num_buckets).astype(int), num_buckets - 1)
+               if width > 0 else np.zeros(n, dtype=int))
+    grouped = pd.Series(y).groupby(buckets, sort=False)
+
+    return np.unique(np.concatenate([[0, n - 1], grouped.idxmin().to_numpy(),
+                                     grouped.idxmax().to_numpy()]))
+
+
+def downsample(df: pd.DataFrame, x_column: str, y_column: str, points: int, method="lttb",
+               keep_columns: 'list[str] | None' = None):
+    """
+        Return a dataframe containing at most the target number of rows of a series (in x-axis
+        order), selected to preserve the shape of the plotted line. Rows without x-axis or
+        y-axis values are not plotted as points and are left out.
+
+        Args:
+            df: pd.DataFrame, data of one series.
+            x_column: str, name of (numeric or datetime) x-axis column.
+            y_column: str, name of y-axis column.
+            points: int, target number of points.
+            method: str, downsampling method. Options: ['lttb', 'min_max']
+            keep_columns: list[str] | None, names of columns whose non-null rows are always kept
+                (e.g. flagged runs), in addition to the target number of points.
+    """
+
+    if method not in DOWNSAMPLING_METHODS:
+        raise RuntimeError("Downsampling method must be one of 'lttb' or 'min_max'.")
+    if len(df) <= points:
+        return df
+
+    x = df[x_column]
+    # datetimes are downsampled as nanoseconds since the epoch
+    if is_datetime(x):
+        x = pd.Series(x.to_numpy(dtype="datetime64[ns]").astype("int64"), index=df.index).where(x.notnull())
+    x = pd.to_numeric(x, errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    y = pd.to_numeric(df[y_column], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+
+    valid = np.flatnonzero(~(np.isnan(x) | np.isnan(y)))
+    order = valid[np.argsort(x[valid], kind="stable")]
+    selected = order[(lttb if method == "lttb" else min_max)(x[order], y[order], points)]
+
+    kept = np.flatnonzero(df[keep_columns].notnull().any(axis=1).to_numpy()) if keep_columns else []
+    if len(kept):
+        selected = order[np.isin(order, np.union1d(selected, kept))]
+
+    return df.iloc[selected]
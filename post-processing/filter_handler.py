@@ -0,0 +1,280 @@
+import operator as op
+from collections import OrderedDict
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+# operator lookup dictionary
+OPERATORS = {
+    "==":   op.eq,
+    "!=":   op.ne,
+    "<":    op.lt,
+    ">":    op.gt,
+    "<=":   op.le,
+    ">=":   op.ge
+}
+# maximum number of condition masks kept in a mask cache
+MASK_CACHE_SIZE = 64
+
+
+class MaskCache:
+
+    def __init__(self, max_size=MASK_CACHE_SIZE):
+        """
+            Initialise class. Condition masks are kept in original row order, so that they
+            can be reused after the dataframe has been sorted. The dataframe index must contain
+            the original row positions.
+
+            Args:
+                max_size: int, maximum number of masks to keep (least recently used masks are dropped).
+        """
+
+        self.max_size = max_size
+        self.masks = OrderedDict()
+
+    def get(self, key: tuple):
+        """
+            Return the mask stored for a condition key, or None if it has not been stored.
+
+            Args:
+                key: tuple, dataframe version, column name, column dtype, operator, and value.
+        """
+
+        mask = self.masks.get(key)
+        if mask is not None:
+            self.masks.move_to_end(key)
+        return mask
+
+    def put(self, key: tuple, mask: np.ndarray):
+        """
+            Store the mask of a condition key.
+
+            Args:
+                key: tuple, dataframe version, column name, column dtype, operator, and value.
+                mask: np.ndarray, condition mask in original row order.
+        """
+
+        self.masks[key] = mask
+        self.masks.move_to_end(key)
+        while len(self.masks) > self.max_size:
+            self.masks.popitem(last=False)
+
+    def clear(self):
+        """
+            Remove all stored masks.
+        """
+        self.masks.clear()
+
+
+def compile_filters(df: pd.DataFrame, and_filters: 'list[list[str]]', or_filters: 'list[list[str]]',
+                    series_filters: 'list[list[str]]'):
+    """
+        Return and, or, and series condition lists for a given dataframe. Each condition is
+        a tuple containing a column name, an operator function, and a comparison value
+        interpreted as the column dtype. Duplicate conditions are only kept once.
+
+        Args:
+            df: pd.DataFrame, dataframe the conditions will be applied to.
+            and_filters: list[list[str]], filter conditions to be concatenated together with logical AND.
+            or_filters: list[list[str]], filter conditions to be concatenated together with logical OR.
+            series_filters: list[list[str]], function like or_filters but use series to select x-axis groups.
+    """
+
+    return [list(dict.fromkeys(compile_condition(f, df) for f in filters))
+            for filters in [and_filters, or_filters, series_filters]]
+
+
+def compile_condition(filter: 'list[str]', df: pd.DataFrame):
+    """
+        Return a tuple containing the column name, operator function, and typed comparison
+        value of a filter condition (e.g. ["flops_value", ">=", 1.0]).
+
+        Args:
+            filter: list[str], a condition based on which a dataframe is filtered.
+            df: pd.DataFrame, dataframe the condition will be applied to.
+    """
+
+    column, str_op, value = filter
+    # check operator validity
+    operator = OPERATORS.get(str_op)
+    if operator is None:
+        raise KeyError("Unknown comparison operator", str_op)
+
+    if value is not None:
+        dtype = df[column].dtype
+        try:
+            # interpret comparison value as column dtype (or category dtype)
+            value = pd.Series(value, dtype=(dtype.categories.dtype if isinstance(dtype, pd.CategoricalDtype)
+                                            else dtype)).iloc[0]
+        except (TypeError, ValueError) as e:
+            e.args = (e.args[0] + " for column '{0}' and value '{1}'".format(column, value),)
+            raise
+
+    return column, operator, value
+
+
+def eval_filters(df: pd.DataFrame, conditions: 'list[list[tuple]]',
+                 cache: 'MaskCache | None' = None, version=None):
+    """
+        Return a dataframe mask from compiled and, or, and series condition lists.
+
+        Args:
+            df: pd.DataFrame, used to create a mask by having the conditions applied to it.
+            conditions: list[list[tuple]], compiled and, or, and series condition lists.
+            cache: MaskCache | None, cache used to reuse the masks of previously evaluated conditions.
+            version: hashable, version of the dataframe data (cached masks of other versions are not used).
+    """
+
+    and_conditions, or_conditions, series_conditions = conditions
+    mask = np.ones(len(df), dtype=bool)
+    if and_conditions:
+        np.logical_and(mask, eval_conditions(df, and_conditions, np.logical_and, cache, version), out=mask)
+    if or_conditions:
+        np.logical_and(mask, eval_conditions(df, or_conditions, np.logical_or, cache, version), out=mask)
+    if series_conditions:
+        # rows must match one of the series values of each series column
+        np.logical_and(mask, eval_conditions(df, series_conditions, np.logical_or, cache, version,
+                                             np.logical_and), out=mask)
+
+    return pd.Series(mask, index=df.index)
+
+
+def eval_conditions(df: pd.DataFrame, conditions: 'list[tuple]', logical_op: np.ufunc,
+                    cache: 'MaskCache | None' = None, version=None, column_op: 'np.ufunc | None' = None):
+    """
+        Return a boolean array combining compiled conditions with a logical operator.
+        Conditions on the same column are evaluated together.
+
+        Args:
+            df: pd.DataFrame, used to create a mask by having the conditions applied to it.
+            conditions: list[tuple], compiled conditions.
+            logical_op: np.ufunc, one of np.logical_and or np.logical_or.
+            cache: MaskCache | None, cache used to reuse the masks of previously evaluated conditions.
+            version: hashable, version of the dataframe data.
+            column_op: np.ufunc | None, logical operator combining the conditions of different
+                columns (default is logical_op).
+    """
+
+    # group conditions by column
+    column_conditions = {}
+    for column, operator, value in conditions:
+        column_conditions.setdefault(column, []).append((operator, value))
+
+    mask = None
+    for column, col_conditions in column_conditions.items():
+        try:
+            col_mask = (eval_column(df[column], col_conditions, logical_op) if cache is None
+                        else eval_column_cached(df[column], col_conditions, logical_op, cache, version))
+        except (TypeError, ValueError) as e:
+            e.args = (e.args[0] + " for column '{0}' and values {1}"
+                      .format(column, [value for _, value in col_conditions]),)
+            raise
+        # combine masks in place to avoid allocating a new array per condition
+        mask = col_mask if mask is None else (column_op or logical_op)(mask, col_mask, out=mask)
+
+    return mask
+
+
+def eval_column(series: pd.Series, conditions: 'list[tuple]', logical_op: np.ufunc):
+    """
+        Return a boolean array combining operator and value conditions on one column.
+
+        Args:
+            series: pd.Series, column the conditions are applied to.
+            conditions: list[tuple], operator functions and typed comparison values.
+            logical_op: np.ufunc, one of np.logical_and or np.logical_or.
+    """
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # evaluate conditions once per category (plus once for null values)
+        categories = series.cat.categories
+        category_mask = reduce(logical_op, (eval_categories(categories, operator, value)
+                                            for operator, value in conditions))
+        # broadcast to rows using category codes (null values have code -1)
+        return category_mask[series.cat.codes.to_numpy()]
+
+    # check equality with any of several values in a single pass
+    if (logical_op is np.logical_or and len(conditions) > 1 and
+            all(operator is op.eq and value is not None for operator, value in conditions)):
+        return series.isin([value for _, value in conditions]).to_numpy(copy=True)
+
+    mask = None
+    for operator, value in conditions:
+        condition_mask = eval_condition(series, operator, value)
+        mask = condition_mask if mask is None else logical_op(mask, condition_mask, out=mask)
+    return mask
+
+
+def eval_column_cached(series: pd.Series, conditions: 'list[tuple]', logical_op: np.ufunc,
+                       cache: MaskCache, version):
+    """
+        Return a boolean array combining operator and value conditions on one column,
+        reusing cached condition masks and caching newly evaluated ones.
+
+        Args:
+            series: pd.Series, column the conditions are applied to.
+            conditions: list[tuple], operator functions and typed comparison values.
+            logical_op: np.ufunc, one of np.logical_and or np.logical_or.
+            cache: MaskCache, cache of condition masks.
+            version: hashable, version of the dataframe data.
+    """
+
+    # original row positions of the (possibly sorted) column
+    positions = series.index.to_numpy()
+    mask = None
+    for operator, value in conditions:
+        key = (version, series.name, str(series.dtype), operator.__name__, value)
+        original_mask = cache.get(key)
+        if original_mask is None:
+            original_mask = np.empty(len(series), dtype=bool)
+            original_mask[positions] = eval_condition(series, operator, value)
+            cache.put(key, original_mask)
+        condition_mask = original_mask[positions]
+        mask = condition_mask if mask is None else logical_op(mask, condition_mask, out=mask)
+    return mask
+
+
+def eval_categories(categories: pd.Index, operator, value):
+    """
+        Return a boolean array containing the result of a condition for each category,
+        followed by the result for null values.
+
+        Args:
+            categories: pd.Index, column categories.
+            operator: function, comparison operator.
+            value: typed comparison value (None to compare with null).
+    """
+
+    if value is None:
+        return np.append(np.full(len(categories), operator is not op.eq), operator is op.eq)
+    return np.append(np.asarray(operator(categories, value), dtype=bool), operator is op.ne)
+
+
+def eval_condition(series: pd.Series, operator, value):
+    """
+        Return a boolean array containing the result of a condition for each row.
+        Comparisons with null values are False (True for !=).
+
+        Args:
+            series: pd.Series, column the condition is applied to.
+            operator: function, comparison operator.
+            value: typed comparison value (None to compare with null).
+    """
+
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return eval_categories(series.cat.categories, operator, value)[series.cat.codes.to_numpy()]
+    # NOTE: arrays are copied where pandas may return read-only views (masks are combined in place)
+    if value is None:
+        return (series.isnull() if operator is op.eq else series.notnull()).to_numpy(copy=True)
+    # let pandas handle null values in python object comparisons
+    if series.dtype == object:
+        return operator(series, value).to_numpy(dtype=bool, copy=True)
+
+    # compare the underlying arrays directly
+    result = operator(series.array if isinstance(series.dtype, pd.api.extensions.ExtensionDtype)
+                      else series.to_numpy(), value)
+    # comparisons with missing values of nullable dtypes are treated as False (True for !=),
+    # as for other dtypes
+    return (result if isinstance(result, np.ndarray)
+            else result.to_numpy(dtype=bool, na_value=operator is op.ne))
@@ -0,0 +1,82 @@
+import argparse
+import os
+import shutil
+import traceback
+from pathlib import Path
+
+from perflog_handler import PerflogHandler, is_archive, write_archive
+
+
+def convert_perflogs(log_path: Path, archive_path: Path, debug=False, workers=1, cache_path=None):
+    """
+        Convert all perflogs in a path to a perflog archive, replacing any previous archive
+        at the archive path.
+
+        Args:
+            log_path: Path, path to a perflog file or a directory containing perflog files.
+            archive_path: Path, path to a directory for storing the archive.
+            debug: bool, flag to print additional information to console.
+            workers: int, number of processes used to parse perflogs in parallel.
+            cache_path: Path | None, path to a directory for caching parsed perflogs.
+    """
+
+    # avoid overwriting anything other than a previous archive
+    if (os.path.exists(archive_path) and not is_archive(archive_path) and
+            (not os.path.isdir(archive_path) or os.listdir(archive_path))):
+        raise FileExistsError("Archive path exists and is not a perflog archive", archive_path)
+
+    df = PerflogHandler(log_path, debug, workers, cache_path).get_df()
+
+    # write to a temporary directory first so that the previous archive remains readable
+    tmp_path = "{0}.tmp".format(os.path.normpath(archive_path))
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    write_archive(df, tmp_path)
+    shutil.rmtree(archive_path, ignore_errors=True)
+    os.replace(tmp_path, archive_path)
+
+    print("Archived {0} rows to {1}".format(len(df), archive_path))
+
+
+def read_args():
+    """
+        Return parsed command line arguments.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Convert perflogs to a partitioned Parquet archive that can be used as a log path \
+            for post-processing.")
+
+    # required positional arguments
+    parser.add_argument("log_path", type=Path,
+                        help="path to a perflog file or a directory containing perflog files")
+    parser.add_argument("archive_path", type=Path,
+                        help="path to a directory for storing the archive (replaced if it is an archive)")
+
+    # optional arguments
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of processes used to parse perflogs in parallel (default is 1)")
+    parser.add_argument("-c", "--cache_path", type=Path,
+                        help="path to a directory for caching parsed perflogs between runs \
+                            (default is no caching)")
+    parser.add_argument("-d", "--debug", action="store_true",
+                        help="debug flag for printing additional information")
+
+    return parser.parse_args()
+
+
+def main():
+
+    args = read_args()
+
+    try:
+        convert_perflogs(args.log_path, args.archive_path, args.debug, args.jobs, args.cache_path)
+
+    except Exception as e:
+        print(type(e).__name__ + ":", e)
+        print("Archiving stopped")
+        if args.debug:
+            print(traceback.format_exc())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+import pandas as pd
+
+
+class PerflogCache:
+
+    def __init__(self, cache_path: Path):
+        """
+            Initialise class.
+
+            Args:
+                cache_path: Path, path to a directory for storing parsed perflog data.
+        """
+
+        self.cache_path = cache_path
+        os.makedirs(self.cache_path, exist_ok=True)
+
+    def entry_path(self, log_path: Path):
+        """
+            Return the path to the cache entry of a given perflog.
+
+            Args:
+                log_path: Path, path to log file.
+        """
+
+        # one entry per perflog, named after its absolute path
+        key = hashlib.sha1(os.path.abspath(log_path).encode()).hexdigest()
+        return os.path.join(self.cache_path, "{0}.pkl".format(key))
+
+    def get(self, log_path: Path):
+        """
+            Return a tuple containing the read state and the parsed dataframe of a given
+            perflog, or a tuple of None values if the perflog has not been cached.
+
+            Args:
+                log_path: Path, path to log file.
+        """
+
+        try:
+            with open(self.entry_path(log_path), "rb") as file:
+                entry = pickle.load(file)
+        # treat unreadable entries as missing (the perflog is then parsed again), including
+        # entries pickled with other versions of pandas or numpy that cannot be loaded
+        except Exception:
+            return None, None
+
+        # guard against hash collisions
+        if not isinstance(entry, dict) or entry.get("log_path") != os.path.abspath(log_path):
+            return None, None
+        return entry["state"], entry["df"]
+
+    def put(self, log_path: Path, state: dict, df: pd.DataFrame):
+        """
+            Store the read state and the parsed dataframe of a given perflog.
+
+            Args:
+                log_path: Path, path to log file.
+                state: dict, file size, modification time, and byte offset already parsed.
+                df: DataFrame, all parsed perflog rows up to the byte offset.
+        """
+
+        entry_path = self.entry_path(log_path)
+        tmp_path = "{0}.{1}.tmp".format(entry_path, os.getpid())
+        with open(tmp_path, "wb") as file:
+            pickle.dump({"log_path": os.path.abspath(log_path), "state": state, "df": df},
+                        file, protocol=pickle.HIGHEST_PROTOCOL)
+        # replace atomically so that concurrent readers never see a partial entry
+        os.replace(tmp_path, entry_path)
@@ -0,0 +1,126 @@
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+
+# perflog file extension
+PERFLOG_EXT = ".log"
+# depth of reframe's <system>/<partition> perflog directories below the searched directory
+PARTITION_DEPTH = 2
+# directories modified more recently than this (in nanoseconds) are always scanned again,
+# as coarse (e.g. one second) modification times may not have changed after a new entry
+MANIFEST_MTIME_MARGIN = 2_000_000_000
+
+
+def find_perflogs(root: Path, workers=1, manifest: 'dict | None' = None, full_search=False):
+    """
+        Return a tuple containing a sorted list of paths to all perflogs in a directory tree
+        and the updated directory manifest.
+
+        ReFrame stores perflogs in <system>/<partition> directories, so directories at least
+        as deep as a partition directory are not searched any further once they contain
+        perflogs (perflogs closer to the searched directory, e.g. a reframe.log, never stop
+        the search). Directories on the same level of the tree are scanned in parallel, as
+        listing directories on parallel filesystems is slow. Directories that cannot be read
+        are skipped.
+
+        Args:
+            root: Path, path to the directory to search.
+            workers: int, number of threads used to scan directories in parallel.
+            manifest: dict | None, directory manifest from a previous search. Directories
+                that have not been modified since are not scanned again.
+            full_search: bool, flag to also search the subdirectories of partition directories
+                that contain perflogs.
+    """
+
+    manifest = manifest or {}
+    new_manifest = {}
+    log_files = []
+
+    parallel = workers and workers > 1
+    with ThreadPoolExecutor(max_workers=workers) if parallel else nullcontext() as pool:
+        # scan the tree one level at a time
+        dirs, depth = [str(root)], 0
+        while dirs:
+            keys = [os.path.abspath(d) for d in dirs]
+            entries = (pool.map(scan_dir, dirs, [manifest.get(k) for k in keys]) if parallel
+                       else map(scan_dir, dirs, [manifest.get(k) for k in keys]))
+            subdirs = []
+            for path, key, entry in zip(dirs, keys, entries):
+                new_manifest[key] = entry
+                log_files.extend(os.path.join(path, file) for file in entry["logs"])
+                # only search below partition directories that do not contain perflogs
+                if full_search or depth < PARTITION_DEPTH or not entry["logs"]:
+                    subdirs.extend(os.path.join(path, d) for d in entry["dirs"])
+            dirs, depth = subdirs, depth + 1
+
+    return sorted(log_files), new_manifest
+
+
+def scan_dir(path: Path, entry: 'dict | None' = None):
+    """
+        Return a manifest entry containing the modification time, perflog names, and
+        subdirectory names of a directory. Directories that cannot be read have no entries.
+
+        Args:
+            path: Path, path to the directory to scan.
+            entry: dict | None, manifest entry from a previous scan, returned unchanged
+                if the directory has not been modified since.
+    """
+
+    logs, dirs = [], []
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        # adding or removing directory entries updates the directory modification time
+        if entry and entry["mtime"] is not None and entry["mtime"] == mtime:
+            return entry
+
+        with os.scandir(path) as it:
+            for e in it:
+                # NOTE: symbolic links to directories are not followed (as with os.walk)
+                if e.is_dir(follow_symlinks=False):
+                    dirs.append(e.name)
+                elif os.path.splitext(e.name)[1] == PERFLOG_EXT and e.is_file():
+                    logs.append(e.name)
+    # skip directories that have been removed or cannot be read (as with os.walk)
+    except OSError:
+        return {"mtime": None, "logs": [], "dirs": []}
+
+    # recently modified directories may be modified again within the same timestamp
+    if time.time_ns() - mtime < MANIFEST_MTIME_MARGIN:
+        mtime = None
+    return {"mtime": mtime, "logs": sorted(logs), "dirs": sorted(dirs)}
+
+
+def load_manifest(manifest_path: Path):
+    """
+        Return a directory manifest from a file, or an empty manifest if it cannot be read.
+
+        Args:
+            manifest_path: Path, path to manifest file.
+    """
+
+    try:
+        with open(manifest_path, "r") as file:
+            return json.load(file)
+    # treat unreadable manifests as missing (all directories are then scanned again)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest_path: Path, manifest: dict):
+    """
+        Store a directory manifest in a file.
+
+        Args:
+            manifest_path: Path, path to manifest file.
+            manifest: dict, directory manifest.
+    """
+
+    tmp_path = "{0}.{1}.tmp".format(manifest_path, os.getpid())
+    with open(tmp_path, "w") as file:
+        json.dump(manifest, file)
+    # replace atomically so that concurrent readers never see a partial manifest
+    os.replace(tmp_path, manifest_path)
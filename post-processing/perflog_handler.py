@@ -1,29 +1,93 @@
 import errno
+import io
 import json
 import os
 import re
-from itertools import chain
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from itertools import repeat
 from pathlib import Path
 
 import pandas as pd
+from perflog_cache import PerflogCache
+from perflog_discovery import find_perflogs, load_manifest, save_manifest
+from profiler import Profiler, get_peak_rss
+
+# number of bytes before the parsed offset used to check that a perflog has not been rewritten
+TAIL_SIZE = 256
+# display name parameter name-value pairs (values run up to the next parameter)
+DISPLAY_NAME_PARAM_REGEX = r" %(?P<key>[^=]*)=(?P<value>.*?)(?= %|$)"
+# fields that must be present in a valid perflog
+REQUIRED_LOG_FIELDS = ["job_completion_time", r"\w+_value$", r"\w+_unit$", "display_name"]
+# fields containing dictionaries that are replaced by their (flattened) contents
+DICT_LOG_FIELDS = ["extra_resources", "env_vars", "spack_spec_dict"]
+# maximum ratio of distinct values to rows for a string column to be stored as categorical
+CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+# metadata file marking a directory as a perflog archive
+ARCHIVE_MARKER = "_perflog_archive.json"
+# columns used to partition perflog archives
+ARCHIVE_PARTITION_COLS = ["system", "partition", "test_name"]
+# name of the directory manifest file stored with cached perflogs
+MANIFEST_FILE = "manifest.json"
+# stages of perflog parsing timed in each perflog (summed over all perflogs)
+PARSE_STAGES = ["csv parsing", "display name parsing", "json flattening"]
+# units of performance variables for which lower values are better (otherwise higher is better)
+TIME_UNITS = re.compile(r"^(s|sec|secs|seconds?|ms|milliseconds?|us|µs|microseconds?|ns|nanoseconds?|"
+                        r"min|mins|minutes?|h|hours?)$", re.IGNORECASE)
 
 
 class PerflogHandler:
 
-    def __init__(self, log_path: Path, debug=False):
+    def __init__(self, log_path: Path, debug=False, workers=1, cache_path=None,
+                 columns=None, row_filter=None, categorical=True, profiler: 'Profiler | None' = None,
+                 full_search=False):
         """
             Initialise class.
 
             Args:
-                log_path: Path, path to performance log file or directory.
+                log_path: Path, path to performance log file or directory, or to a perflog archive.
                 debug: bool, flag to print additional information to console.
+                workers: int, number of processes used to parse perflogs in parallel.
+                cache_path: Path | None, path to a directory for caching parsed perflogs.
+                    Subsequent runs only parse lines appended to a perflog since it was cached,
+                    and only list directories that have been modified since they were cached.
+                columns: list[str] | None, names of the only columns to load, matched ignoring case
+                    as in SQL queries (default is all columns).
+                row_filter: callable | None, function returning a mask of the rows to keep
+                    from the dataframe of one perflog (default is all rows).
+                categorical: bool, flag to store string columns with few distinct values
+                    (e.g. system, partition, test name, units) as pandas categoricals.
+                profiler: Profiler | None, profiler recording the time, rows, and memory of
+                    each reading stage (default is no profiling).
+                full_search: bool, flag to also search the subdirectories of <system>/<partition>
+                    directories that contain perflogs.
         """
 
         self.log_path = log_path
         self.debug = debug
-
-        self.get_log_files()
-        self.read_all_perflogs()
+        self.workers = workers
+        self.cache = PerflogCache(cache_path) if cache_path else None
+        # directory listings from previous perflog searches
+        self.manifest_path = os.path.join(cache_path, MANIFEST_FILE) if cache_path else None
+        self.manifest = load_manifest(self.manifest_path) if self.manifest_path else {}
+        self.columns = list(columns) if columns is not None else None
+        self.row_filter = row_filter
+        self.full_search = full_search
+        self.categorical = categorical
+        self.profiler = profiler or Profiler()
+        # read states of valid perflogs and file stats of discarded perflogs (for follow mode)
+        self.states = {}
+        self.discarded = {}
+
+        # read previously converted perflogs
+        if is_archive(self.log_path):
+            self.log_files = []
+            self.read_perflog_archive()
+        # find and read perflogs
+        else:
+            self.get_log_files()
+            self.read_all_perflogs()
 
     def get_df(self):
         """
@@ -37,29 +101,35 @@ class PerflogHandler:
             log file list.
         """
 
-        self.log_files = []
-        # one perflog supplied
-        if os.path.isfile(self.log_path):
-            # check correct log extension
-            if os.path.splitext(self.log_path)[1] != ".log":
-                raise RuntimeError("Perflog file name provided should have a .log extension.")
-            self.log_files = [self.log_path]
-
-        # look for perflogs in folder
-        elif os.path.isdir(self.log_path):
-            for file in [os.path.join(root, file) for root, _, files
-                         in os.walk(self.log_path) for file in files]:
-                # append files with correct log extension
-                if os.path.splitext(file)[1] == ".log":
-                    self.log_files.append(file)
-            # no perflogs in folder
-            if len(self.log_files) == 0:
-                raise RuntimeError(
-                    "No perflogs found in this path. Perflogs should have a .log extension.")
-
-        # invalid path
-        else:
-            raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), self.log_path)
+        with self.profiler.stage("discovery") as stage:
+            self.log_files = []
+            # one perflog supplied
+            if os.path.isfile(self.log_path):
+                # check correct log extension
+                if os.path.splitext(self.log_path)[1] != ".log":
+                    raise RuntimeError("Perflog file name provided should have a .log extension.")
+                self.log_files = [self.log_path]
+
+            # look for perflogs in folder
+            elif os.path.isdir(self.log_path):
+                self.log_files, manifest = find_perflogs(self.log_path, self.workers, self.manifest,
+                                                             self.full_search)
+                changed = any(self.manifest.get(d) != entry for d, entry in manifest.items())
+                # keep listings of directories outside the log path
+                self.manifest.update(manifest)
+                if self.manifest_path and changed:
+                    save_manifest(self.manifest_path, self.manifest)
+                # no perflogs in folder
+                if len(self.log_files) == 0:
+                    raise RuntimeError(
+                        "No perflogs found in this path. Perflogs should have a .log extension.")
+
+            # invalid path
+            else:
+                raise FileNotFoundError(errno.ENOENT, os.strerror(errno.ENOENT), self.log_path)
+
+            # number of perflogs found
+            stage["rows_out"] = len(self.log_files)
 
         if self.debug:
             print("Found log files:")
@@ -73,25 +143,224 @@ class PerflogHandler:
             in class log file list.
         """
 
-        self.df = pd.DataFrame()
-        # put all perflog information in one dataframe
+        start_time = time.perf_counter()
+        self.states, self.discarded = {}, {}
+        # time spent in each parsing stage and filtering rows (summed over all perflogs)
+        parse_times = dict.fromkeys(PARSE_STAGES + ["row filtering"], 0.0)
+        num_parsed_rows = 0
+
+        with self.profiler.stage("parsing") as stage:
+            # look up previously parsed perflog data
+            cached = ([self.cache.get(file) for file in self.log_files] if self.cache
+                      else [(None, None)] * len(self.log_files))
+            states = [state for state, _ in cached]
+
+            # parse perflogs in a process pool if requested
+            parallel = self.workers and self.workers > 1 and len(self.log_files) > 1
+            perflog_dfs = []
+            with (ProcessPoolExecutor(max_workers=min(self.workers, len(self.log_files)))
+                  if parallel else nullcontext()) as pool:
+                # NOTE: map returns results in the same order as the log file list
+                results = (pool.map(try_read_perflog, self.log_files, states, repeat(self.columns),
+                                    chunksize=max(1, len(self.log_files) // (4 * self.workers)))
+                           if parallel else map(try_read_perflog, self.log_files, states, repeat(self.columns)))
+
+                # gather individual perflog dataframes
+                for file, (cached_state, cached_df), (result, e, timings) in zip(self.log_files, cached, results):
+                    for name, elapsed in timings.items():
+                        parse_times[name] += elapsed
+                    if result is not None:
+                        df, state, appended = result
+                        # add newly parsed rows to previously parsed rows
+                        if appended:
+                            df = (cached_df if df is None
+                                  else pd.concat([cached_df, df], ignore_index=True))
+                        # update cache with newly parsed rows
+                        if self.cache and state != cached_state:
+                            self.cache.put(file, state, df)
+                        self.states[file] = state
+                        # discard unwanted rows as soon as each perflog is read
+                        if self.row_filter:
+                            filter_start_time = time.perf_counter()
+                            num_parsed_rows += len(df)
+                            df = df[self.row_filter(df)]
+                            parse_times["row filtering"] += time.perf_counter() - filter_start_time
+                        perflog_dfs.append(df)
+                    # discard invalid perflogs
+                    else:
+                        self.discarded[file] = get_file_stat(file)
+                        if self.debug:
+                            print("Discarding %s:" % os.path.basename(file),
+                                  type(e).__name__ + ":", *e.args)
+                            print("")
+
+            # no valid perflogs found
+            if not perflog_dfs:
+                raise FileNotFoundError(
+                    errno.ENOENT, "Could not find a valid perflog in path", self.log_path)
+
+            # put all perflog information in one dataframe
+            # NOTE: concatenating once avoids copying the accumulated data for every file
+            self.df = pd.concat(perflog_dfs, ignore_index=True)
+            stage["rows_out"] = len(self.df)
+
+        # NOTE: stages of perflogs parsed in worker processes are timed in each worker
+        for name in PARSE_STAGES:
+            self.profiler.record(name, parse_times[name])
+        if self.row_filter:
+            self.profiler.record("row filtering", parse_times["row filtering"], num_parsed_rows, len(self.df))
+
+        # compact repetitive string columns
+        if self.categorical:
+            with self.profiler.stage("categorical typing", len(self.df)) as stage:
+                self.df = to_categorical(self.df)
+                stage["rows_out"] = len(self.df)
+
+        if self.debug:
+            print_read_stats(len(perflog_dfs), len(self.df), time.perf_counter() - start_time)
+
+    def read_new_perflogs(self):
+        """
+            Add rows appended to the perflogs in class log path since they were last read
+            (including any new perflogs) to the class dataframe. Return the number of new rows,
+            or None if a perflog has been rewritten and all perflogs had to be read again.
+        """
+
+        if is_archive(self.log_path):
+            raise RuntimeError("Perflog archives cannot be followed. Use a perflog path instead.")
+
+        self.get_log_files()
+        new_dfs = []
         for file in self.log_files:
-            try:
-                self.df = pd.concat([self.df, read_perflog(file)], ignore_index=True)
-            # discard invalid perflogs
-            except KeyError as e:
-                if self.debug:
-                    print("Discarding %s:" % os.path.basename(file),
-                          type(e).__name__ + ":", e.args[0], e.args[1])
-                    print("")
+            # skip invalid perflogs that have not changed
+            if file in self.discarded and self.discarded[file] == get_file_stat(file):
+                continue
+            result, _, _ = try_read_perflog(file, self.states.get(file), self.columns)
+            if result is None:
+                self.discarded[file] = get_file_stat(file)
+                continue
+
+            df, state, appended = result
+            # previously read rows may have changed
+            if file in self.states and not appended:
+                self.read_all_perflogs()
+                return None
+            self.states[file] = state
+            self.discarded.pop(file, None)
+            if df is not None:
+                new_dfs.append(df[self.row_filter(df)] if self.row_filter else df)
+
+        new_df = pd.concat(new_dfs, ignore_index=True) if new_dfs else None
+        if new_df is not None and len(new_df):
+            self.df = append_rows(self.df, new_df)
+        return len(new_df) if new_df is not None else 0
+
+    def read_perflog_archive(self):
+        """
+            Return a pandas dataframe containing information from the perflog archive
+            in class log path.
+        """
+
+        start_time = time.perf_counter()
+        with self.profiler.stage("archive reading") as stage:
+            df = read_archive(self.log_path, self.columns)
+            stage["rows_out"] = len(df)
+        # discard unwanted rows
+        if self.row_filter:
+            with self.profiler.stage("row filtering", len(df)) as stage:
+                df = df[self.row_filter(df)].reset_index(drop=True)
+                stage["rows_out"] = len(df)
+        # compact repetitive string columns
+        if self.categorical:
+            with self.profiler.stage("categorical typing", len(df)) as stage:
+                df = to_categorical(df)
+                stage["rows_out"] = len(df)
+        self.df = df
+
+        if self.debug:
+            print_read_stats(1, len(self.df), time.perf_counter() - start_time)
+
+
+def is_archive(path: Path):
+    """
+        Return True if the given path is a perflog archive directory.
+
+        Args:
+            path: Path, path to check.
+    """
+    return os.path.isfile(os.path.join(path, ARCHIVE_MARKER))
+
+
+def write_archive(df: pd.DataFrame, archive_path: Path):
+    """
+        Write parsed perflog data to a Parquet dataset partitioned by system, partition,
+        and test name, and mark the directory as a perflog archive.
+
+        Args:
+            df: DataFrame, parsed perflog data (e.g. from PerflogHandler).
+            archive_path: Path, path to a new directory for storing the archive.
+    """
+
+    partition_cols = [c for c in ARCHIVE_PARTITION_COLS if c in df.columns]
+    to_archive_types(df).to_parquet(archive_path, partition_cols=partition_cols, index=False)
+    # record column order (partition columns are otherwise read back last)
+    with open(os.path.join(archive_path, ARCHIVE_MARKER), "w") as file:
+        json.dump({"columns": df.columns.tolist(), "partition_cols": partition_cols,
+                   "rows": len(df)}, file, indent=2)
+
+
+def to_archive_types(df: pd.DataFrame):
+    """
+        Return a dataframe with column types that can be stored in Parquet. Completion times
+        are stored as datetimes and columns of mixed python objects are stored as strings.
+
+        Args:
+            df: DataFrame, parsed perflog data.
+    """
 
-        # no valid perflogs found
-        if self.df.empty:
-            raise FileNotFoundError(
-                errno.ENOENT, "Could not find a valid perflog in path", self.log_path)
+    typed_cols = {}
+    if "job_completion_time" in df.columns:
+        try:
+            typed_cols["job_completion_time"] = pd.to_datetime(df["job_completion_time"])
+        # keep unrecognised time formats as strings
+        except (TypeError, ValueError):
+            pass
 
+    for col in df.columns:
+        if col in typed_cols or df[col].dtype != object:
+            continue
+        inferred_type = pd.api.types.infer_dtype(df[col], skipna=True)
+        if inferred_type == "boolean":
+            typed_cols[col] = df[col].astype("boolean")
+        elif inferred_type not in ["string", "empty", "integer", "floating"]:
+            typed_cols[col] = df[col].where(df[col].isnull(), df[col].astype(str))
 
-def read_perflog(path: Path):
+    return df.assign(**typed_cols) if typed_cols else df
+
+
+def read_archive(archive_path: Path, columns: 'list[str] | None' = None):
+    """
+        Return a pandas dataframe from a perflog archive.
+
+        Args:
+            archive_path: Path, path to perflog archive directory.
+            columns: list[str] | None, names of the only columns to read, matched ignoring case
+                (default is all columns).
+    """
+
+    with open(os.path.join(archive_path, ARCHIVE_MARKER), "r") as file:
+        archive_columns = json.load(file)["columns"]
+    if columns is not None:
+        # skip columns that are not in the archive
+        requested = get_requested_columns(columns)
+        archive_columns = [c for c in archive_columns if c.lower() in requested]
+
+    df = pd.read_parquet(archive_path, columns=archive_columns)
+    # restore original column order
+    return df[archive_columns]
+
+
+def read_perflog(path: Path, columns: 'list[str] | None' = None, timings: 'dict | None' = None):
     """
         Return a pandas dataframe from a reframe performance log. The dataframe will
         have columns for all fields in a performance log record except display name,
@@ -104,11 +373,18 @@ def read_perflog(path: Path):
 
         Args:
             path: Path, path to log file.
+            columns: list[str] | None, names of the only columns to keep, matched ignoring case
+                (default is all columns). Dictionary fields are not unpacked if no remaining
+                columns can come from them.
+            timings: dict | None, time spent in each parsing stage, added to if supplied.
     """
 
-    # read perflog into dataframe
-    df = pd.read_csv(path, delimiter="|")
-    REQUIRED_LOG_FIELDS = ["job_completion_time", r"\w+_value$", r"\w+_unit$", "display_name"]
+    requested = get_requested_columns(columns) if columns is not None else None
+    # read perflog into dataframe (skipping fields that cannot contain the requested columns)
+    start_time = time.perf_counter()
+    df = pd.read_csv(path, delimiter="|",
+                     usecols=(lambda c: is_perflog_col_needed(c, requested)) if columns is not None else None)
+    csv_time = time.perf_counter()
 
     # look for required column matches
     required_field_matches = [len(list(filter(re.compile(rexpr).match, df.columns))) > 0
@@ -117,27 +393,231 @@ def read_perflog(path: Path):
     if False in required_field_matches:
         raise KeyError("Perflog missing one or more required fields", REQUIRED_LOG_FIELDS)
 
-    # replace display name
-    results = df["display_name"].apply(get_display_name_info)
-    index = df.columns.get_loc("display_name")
-    # insert new columns and contents
-    insert_key_cols(df, index, [r[1] for r in results])
-    df.insert(index, "test_name", [r[0] for r in results])
-    # drop old column
-    df.drop("display_name", axis=1, inplace=True)
+    # replace display name with test name and parameter columns
+    display_name_cols = get_display_name_cols(df["display_name"])
+    # existing columns take precedence over parameters with the same name
+    df = replace_col(df, "display_name", display_name_cols[
+        [c for c in display_name_cols.columns if (c == "test_name" or c not in df.columns) and
+         (columns is None or c.lower() in requested)]])
+    display_name_time = time.perf_counter()
 
     # replace other columns with dictionary contents
-    dict_cols = [c for c in ["extra_resources", "env_vars", "spack_spec_dict"] if c in df.columns]
+    dict_cols = [c for c in DICT_LOG_FIELDS if c in df.columns]
     for col in dict_cols:
-        results = df[col].apply(lambda x: json.loads(x) if isinstance(x, str) else x)
-        # insert new columns and contents
-        insert_key_cols(df, df.columns.get_loc(col), results)
-        # drop old column
-        df.drop(col, axis=1, inplace=True)
-
+        # skip unpacking if all requested columns have already been found
+        if columns is not None and all(c in df.columns for c in columns):
+            df = df.drop(col, axis=1)
+            continue
+        key_cols = get_dict_cols(df[col])
+        # existing columns take precedence over keys with the same name
+        df = replace_col(df, col, key_cols[[c for c in key_cols.columns if c not in df.columns and
+                                            (columns is None or c.lower() in requested)]])
+
+    # drop required fields that were not requested
+    if columns is not None:
+        df = df[[c for c in df.columns if c.lower() in requested]]
+
+    if timings is not None:
+        for name, elapsed in zip(PARSE_STAGES, [csv_time - start_time, display_name_time - csv_time,
+                                                time.perf_counter() - display_name_time]):
+            timings[name] = timings.get(name, 0.0) + elapsed
     return df
 
 
+def to_categorical(df: pd.DataFrame):
+    """
+        Return a dataframe in which string columns with few distinct values relative to the
+        number of rows are stored as pandas categoricals. Each distinct string is then stored
+        only once and rows hold small integer codes, reducing memory use and speeding up
+        comparisons.
+
+        Args:
+            df: DataFrame, perflog data.
+    """
+
+    categorical_cols = {}
+    for col in df.columns:
+        # only consider columns of strings (and nulls)
+        if (df[col].dtype != object or
+                pd.api.types.infer_dtype(df[col], skipna=True) != "string"):
+            continue
+        if df[col].nunique() <= CATEGORICAL_MAX_UNIQUE_RATIO * len(df):
+            categorical_cols[col] = df[col].astype("category")
+
+    return df.assign(**categorical_cols) if categorical_cols else df
+
+
+def append_rows(df: pd.DataFrame, new_df: pd.DataFrame):
+    """
+        Return a dataframe with new rows appended, keeping categorical columns categorical.
+
+        Args:
+            df: DataFrame, existing perflog data.
+            new_df: DataFrame, new perflog data.
+    """
+
+    old_cols, new_cols = {}, {}
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and col in new_df.columns:
+            # keep categories sorted, as in a fresh read, so that sorting rows by the column
+            # still sorts them by value (existing rows are recoded if a category is inserted)
+            categories = df[col].cat.categories.union(
+                pd.Index(new_df[col].dropna().unique()), sort=None)
+            old_cols[col] = df[col].cat.set_categories(categories)
+            new_cols[col] = new_df[col].astype(pd.CategoricalDtype(categories))
+
+    return pd.concat([df.assign(**old_cols), new_df.assign(**new_cols)], ignore_index=True)
+
+
+def get_requested_columns(columns: 'list[str]'):
+    """
+        Return the set of lowercase names of requested columns. Column names are matched
+        ignoring case, as SQL identifiers are, so that loading only the columns that a
+        query refers to keeps the columns it resolves to.
+
+        Args:
+            columns: list[str], names of the requested columns.
+    """
+
+    return {c.lower() for c in columns}
+
+
+def is_perflog_col_needed(col: str, requested: 'set[str]'):
+    """
+        Return True if a perflog field must be read in order to find the requested columns.
+
+        Args:
+            col: str, name of perflog field.
+            requested: set[str], lowercase names of the requested columns.
+    """
+
+    return (col.lower() in requested or col in DICT_LOG_FIELDS or
+            any(re.match(rexpr, col) for rexpr in REQUIRED_LOG_FIELDS))
+
+
+def read_perflog_increment(path: Path, state: 'dict | None' = None, columns: 'list[str] | None' = None,
+                           timings: 'dict | None' = None):
+    """
+        Return a tuple containing a pandas dataframe of newly parsed perflog rows (or None
+        if there are no new rows), the updated read state of the perflog, and a flag that is
+        True if the new rows follow on from the rows parsed in the previous read state.
+
+        ReFrame perflogs are append-only, so a perflog that has only grown since its previous
+        read state is parsed from the previous byte offset onwards, up to its last complete line.
+        Perflogs that have been truncated or rewritten are parsed in full, including a last
+        line without a trailing newline.
+
+        Args:
+            path: Path, path to log file.
+            state: dict | None, file size, modification time, and byte offset of a previous read.
+            columns: list[str] | None, names of the only columns to keep (default is all columns).
+            timings: dict | None, time spent in each parsing stage, added to if supplied.
+    """
+
+    stat = os.stat(path)
+    # previous read is only reusable if it kept the same columns
+    if state and state.get("columns") != columns:
+        state = None
+    # perflog unchanged since previous read
+    if state and state["size"] == stat.st_size and state["mtime"] == stat.st_mtime_ns:
+        return None, state, True
+
+    with open(path, "rb") as file:
+        header = file.readline()
+        # a previous read that ended in an unterminated line cannot be resumed from its offset
+        appended = (bool(state) and state["header"] == header and state["tail"].endswith(b"\n")
+                    and is_appended(file, state, stat.st_size))
+        # skip previously parsed lines
+        offset = state["offset"] if appended else len(header)
+        file.seek(offset)
+        new_lines = file.read()
+
+    if appended:
+        # only parse complete lines (the last record may still be being written)
+        new_lines = new_lines[:new_lines.rfind(b"\n") + 1]
+    parsed_lines = (state["tail"] if appended else header) + new_lines
+    new_state = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "header": header,
+                 "offset": offset + len(new_lines), "tail": parsed_lines[-TAIL_SIZE:], "columns": columns}
+
+    if appended and not new_lines:
+        return None, new_state, True
+    return read_perflog(io.BytesIO(header + new_lines), columns, timings), new_state, appended
+
+
+def is_appended(file, state: dict, size: int):
+    """
+        Return True if an open perflog still contains the bytes parsed in a previous read state,
+        i.e. it has only been appended to since.
+
+        Args:
+            file: file, perflog opened in binary mode.
+            state: dict, file size, modification time, and byte offset of a previous read.
+            size: int, current size of the perflog.
+    """
+
+    if size < state["offset"]:
+        return False
+    file.seek(state["offset"] - len(state["tail"]))
+    return file.read(len(state["tail"])) == state["tail"]
+
+
+def get_file_stat(path: Path):
+    """
+        Return a tuple containing the size and modification time of a file, used to detect changes.
+
+        Args:
+            path: Path, path to file.
+    """
+
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def try_read_perflog(path: Path, state: 'dict | None' = None, columns: 'list[str] | None' = None):
+    """
+        Return a tuple containing the result of reading a reframe performance log and
+        None, or None and the error raised if the perflog is invalid, followed by the time
+        spent in each parsing stage. Errors and timings are returned rather than raised
+        or recorded so that perflogs can be parsed in worker processes.
+
+        Args:
+            path: Path, path to log file.
+            state: dict | None, file size, modification time, and byte offset of a previous read.
+            columns: list[str] | None, names of the only columns to keep (default is all columns).
+    """
+
+    timings = {}
+    try:
+        return read_perflog_increment(path, state, columns, timings), None, timings
+    except KeyError as e:
+        return None, e, timings
+
+
+def print_read_stats(num_files: int, num_rows: int, elapsed: float):
+    """
+        Print perflog ingestion throughput and the peak resident memory of the process.
+
+        Args:
+            num_files: int, number of perflogs read.
+            num_rows: int, number of rows read from all perflogs.
+            elapsed: float, time taken to read all perflogs (in seconds).
+    """
+
+    print("Read {0} rows from {1} perflogs in {2:.3f}s ({3:.0f} rows/s, peak RSS {4:.1f} MB)"
+          .format(num_rows, num_files, elapsed, num_rows / elapsed if elapsed else 0, get_peak_rss()))
+    print("")
+
+
+def is_lower_better(unit: str):
+    """
+        Return whether lower values of a performance variable are better, based on its unit.
+
+        Args:
+            unit: str, performance variable unit.
+    """
+    return isinstance(unit, str) and TIME_UNITS.match(unit.strip()) is not None
+
+
 def get_display_name_info(display_name: str):
     """
         Return a tuple containing the test name and a dictionary of parameter names
@@ -156,17 +636,92 @@ def get_display_name_info(display_name: str):
     return test_name, dict(params)
 
 
-def find_key_cols(row_info: 'dict | None', key_cols={}, col_name=None):
+def get_display_name_cols(display_names: pd.Series):
+    """
+        Return a dataframe with a test name column followed by one column per parameter
+        found in the given display names. Rows without a given parameter contain NaN.
+        Equivalent to applying get_display_name_info to every display name, but each
+        distinct display name is only parsed once and parsing is vectorised.
+
+        Args:
+            display_names: pd.Series, expecting a format of <test_name> followed by zero or more
+            %<param>=<value> pairs.
+    """
+
+    # parse each distinct display name only once
+    codes, unique_names = pd.factorize(display_names)
+    unique_names = pd.Series(unique_names, dtype=object)
+    # no display names to parse (e.g. a perflog without complete records)
+    if unique_names.empty:
+        return pd.DataFrame({"test_name": pd.Series(index=display_names.index, dtype=object)})
+
+    # test name is everything before the first parameter
+    cols = pd.DataFrame({"test_name": unique_names.str.partition(" %")[0]})
+    # extract all parameter name-value pairs
+    params = unique_names.str.extractall(DISPLAY_NAME_PARAM_REGEX)
+    if not params.empty:
+        # one column per parameter, in order of first appearance
+        param_cols = (params.droplevel("match").set_index("key", append=True)["value"]
+                      .groupby(level=[0, 1], sort=False).last().unstack("key"))
+        cols = cols.join(param_cols[pd.unique(params["key"])])
+
+    # broadcast parsed display names back to all rows
+    cols = cols.reindex(codes)
+    cols.index = display_names.index
+    return cols
+
+
+def replace_col(df: pd.DataFrame, col: str, new_cols: pd.DataFrame):
+    """
+        Return a dataframe with a given column replaced by new columns inserted at its position.
+
+        Args:
+            df: DataFrame, containing the column to replace.
+            col: str, name of the column to replace.
+            new_cols: DataFrame, columns to insert (indexed like df).
+    """
+
+    index = df.columns.get_loc(col)
+    return pd.concat([df.iloc[:, :index], new_cols, df.iloc[:, index + 1:]], axis=1)
+
+
+def get_dict_cols(dicts: pd.Series):
+    """
+        Return a dataframe with one column per key found in the given JSON dictionaries,
+        flattened by find_key_cols. Rows without a given key contain NaN. Each distinct
+        JSON string is only decoded and flattened once, as most rows repeat the same
+        contents (e.g. the same spack spec), and the results are broadcast to all rows.
+
+        Args:
+            dicts: pd.Series, JSON strings (or null values) containing key-value mapping information.
+    """
+
+    # decode and flatten each distinct JSON string only once
+    codes, unique_dicts = pd.factorize(dicts)
+    key_cols = pd.DataFrame(
+        [find_key_cols(json.loads(d) if isinstance(d, str) else d) for d in unique_dicts],
+        index=pd.RangeIndex(len(unique_dicts)))
+
+    # broadcast flattened dictionaries back to all rows
+    key_cols = key_cols.reindex(codes)
+    key_cols.index = dicts.index
+    return key_cols
+
+
+def find_key_cols(row_info: 'dict | None', key_cols: 'dict | None' = None, col_name=None):
     """
         Return key columns and their values by recursively finding the innermost
         dictionary contents of given row information.
 
         Args:
             row_info: dict | None, contains key-value mapping information from one row.
-            key_cols: dict, flattened dictionary contents from row_info.
+            key_cols: dict | None, flattened dictionary contents from row_info.
             col_name: str | None, the name of a previous column key to be used as a prefix for new column keys.
     """
 
+    if key_cols is None:
+        key_cols = {}
+
     if isinstance(row_info, dict):
         for k in row_info.keys():
             # determine new key column name
@@ -178,27 +733,3 @@ def find_key_cols(row_info: 'dict | None', key_cols={}, col_name=None):
             else:
                 key_cols[new_col_name] = row_info.get(k)
     return key_cols
-
-
-def insert_key_cols(df: pd.DataFrame, index: int, results: 'list[dict]'):
-    """
-    Modify a dataframe to include new columns (extracted from results) inserted at
-    a given index, with names optionally prefixed by the original column name and each key.
-
-    Args:
-        df: DataFrame, to be modified by this function.
-        index: int, index at which to insert new columns into the dataframe.
-        results: 'list[dict]', contains key-value mapping information from all rows.
-    """
-
-    # flatten results into key columns dicts
-    key_cols = [find_key_cols(r, key_cols={}) for r in results]
-    # get set of keys from all rows
-    keys = set(chain.from_iterable([k.keys() for k in key_cols]))
-
-    for k in keys:
-        if k not in df.columns:
-            # insert keys as new columns
-            df.insert(index, k, [c.get(k) if k in c else None for c in key_cols])
-            # increment index for next column insertion to maintain order
-            index += 1
@@ -0,0 +1,358 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import time
+import traceback
+from pathlib import Path
+
+import pandas as pd
+from perflog_handler import ARCHIVE_MARKER, PerflogHandler, is_archive, read_archive
+from plot_handler import plot_generic, plot_line_chart
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+# in-process SQL engines (duckdb is optional)
+ENGINES = ["sqlite", "duckdb"]
+# name of the table containing perflog data
+TABLE_NAME = "perflogs"
+# plot types that query results can be passed to
+PLOT_TYPES = ["generic", "line"]
+
+# identifiers that may refer to columns (plain, or quoted with "", [], or ``)
+IDENTIFIER_REGEX = re.compile(r'"((?:[^"]|"")+)"|\[([^\]]+)\]|`([^`]+)`|([A-Za-z_][A-Za-z0-9_]*)')
+# select-all wildcards (but not count(*))
+WILDCARD_REGEX = re.compile(r"(?:\bselect(?:\s+distinct|\s+all)?|,|\.)\s*\*", re.IGNORECASE)
+# string literals (which cannot refer to columns)
+STRING_LITERAL_REGEX = re.compile(r"'(?:[^']|'')*'")
+
+
+class PerflogQuery:
+
+    def __init__(self, df: 'pd.DataFrame | None' = None, engine="sqlite",
+                 archive_path: 'Path | None' = None, debug=False):
+        """
+            Initialise class.
+
+            Args:
+                df: pd.DataFrame | None, parsed perflog data registered as the perflogs table.
+                engine: str, in-process SQL engine. Options: ['sqlite', 'duckdb']
+                archive_path: Path | None, path to a perflog archive registered as the perflogs
+                    table instead of a dataframe (read directly by duckdb, so that filters and
+                    column selections are pushed down to the Parquet files).
+                debug: bool, flag to print additional information to console.
+        """
+
+        if engine not in ENGINES:
+            raise RuntimeError("SQL engine must be one of 'sqlite' or 'duckdb'.")
+        if engine == "duckdb" and duckdb is None:
+            raise ImportError("The duckdb engine requires the duckdb package (pip install duckdb)")
+        if (df is None) == (archive_path is None):
+            raise RuntimeError("Exactly one of a dataframe or a perflog archive path must be supplied.")
+
+        self.engine = engine
+        self.debug = debug
+        self.df = df
+        self.archive_path = archive_path
+        # all columns and columns currently loaded into the sqlite table
+        self.columns = df.columns.tolist() if df is not None else get_archive_columns(archive_path)
+        self.table_columns = []
+
+        if engine == "duckdb":
+            self.con = duckdb.connect()
+            if archive_path is not None:
+                self.con.execute("CREATE VIEW {0} AS SELECT * FROM read_parquet('{1}', hive_partitioning = true)"
+                                 .format(TABLE_NAME, os.path.join(archive_path, "**", "*.parquet")
+                                         .replace("'", "''")))
+            else:
+                # NOTE: duckdb scans the dataframe in place (no copy)
+                self.con.register(TABLE_NAME, df)
+        else:
+            self.con = sqlite3.connect(":memory:")
+
+    @classmethod
+    def from_path(cls, log_path: Path, engine="sqlite", debug=False, workers=1, cache_path=None,
+                  columns: 'list[str] | None' = None):
+        """
+            Return a query instance for the perflogs in a log path.
+
+            Args:
+                log_path: Path, path to performance log file or directory, or to a perflog archive.
+                engine: str, in-process SQL engine. Options: ['sqlite', 'duckdb']
+                debug: bool, flag to print additional information to console.
+                workers: int, number of processes used to parse perflogs in parallel.
+                cache_path: Path | None, path to a directory for caching parsed perflogs.
+                columns: list[str] | None, names of the only columns to load (default is all columns).
+        """
+
+        # archive columns are only read when a query needs them
+        if is_archive(log_path):
+            return cls(engine=engine, archive_path=log_path, debug=debug)
+        return cls(PerflogHandler(log_path, debug, workers, cache_path, columns=columns).get_df(),
+                   engine, debug=debug)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """
+            Close the connection to the SQL engine.
+        """
+        self.con.close()
+
+    def query(self, sql: str, params=None):
+        """
+            Return the result of an SQL query over the perflogs table as a pandas dataframe.
+
+            Args:
+                sql: str, SQL query (e.g. "SELECT tasks, AVG(flops_value) FROM perflogs GROUP BY tasks").
+                params: tuple | dict | None, values of query placeholders.
+        """
+
+        start_time = time.perf_counter()
+        if self.engine == "duckdb":
+            result = self.con.execute(sql, params or []).df()
+        else:
+            self.load_columns(get_query_columns(sql, self.columns))
+            result = pd.read_sql_query(sql, self.con, params=params)
+
+        if self.debug:
+            print("Query returned {0} rows in {1:.3f}s".format(len(result), time.perf_counter() - start_time))
+        return result
+
+    def load_columns(self, columns: 'list[str]'):
+        """
+            Ensure the sqlite perflogs table contains the given columns. The table is only
+            (re)built when a query needs columns that have not been loaded yet, as inserting
+            every perflog column is much slower than running most queries.
+
+            Args:
+                columns: list[str], names of perflog columns used by a query.
+        """
+
+        if self.table_columns and all(c in self.table_columns for c in columns):
+            return
+        # keep previously loaded columns, in perflog column order
+        # (tables need at least one column, e.g. for counting rows)
+        columns = ([c for c in self.columns if c in columns or c in self.table_columns] or
+                   self.columns[:1])
+
+        start_time = time.perf_counter()
+        df = self.df[columns] if self.df is not None else read_archive(self.archive_path, columns)
+        # categoricals are stored as their values
+        df = df.assign(**{c: df[c].astype(object) for c in columns
+                          if isinstance(df[c].dtype, pd.CategoricalDtype)})
+        df.to_sql(TABLE_NAME, self.con, index=False, if_exists="replace")
+        self.table_columns = columns
+
+        if self.debug:
+            print("Loaded {0} columns of {1} rows into sqlite in {2:.3f}s".format(
+                len(columns), len(df), time.perf_counter() - start_time))
+
+
+def get_archive_columns(archive_path: Path):
+    """
+        Return the names of all columns of a perflog archive.
+
+        Args:
+            archive_path: Path, path to perflog archive directory.
+    """
+
+    with open(os.path.join(archive_path, ARCHIVE_MARKER), "r") as file:
+        return json.load(file)["columns"]
+
+
+def get_identifiers(sql: str):
+    """
+        Return the set of identifiers in an SQL query that may refer to columns,
+        or None if the query selects all columns.
+
+        Args:
+            sql: str, SQL query.
+    """
+
+    sql = STRING_LITERAL_REGEX.sub("''", sql)
+    if WILDCARD_REGEX.search(sql):
+        return None
+
+    identifiers = set()
+    for match in IDENTIFIER_REGEX.finditer(sql):
+        quoted, bracketed, backticked, plain = match.groups()
+        identifiers.add(quoted.replace('""', '"') if quoted else bracketed or backticked or plain)
+    return identifiers
+
+
+def get_query_columns(sql: str, columns: 'list[str]'):
+    """
+        Return the names of the columns that an SQL query may refer to (all columns for
+        select-all queries). Any identifier matching a column name is included, so this may
+        include columns that are not used (e.g. when a column name is also used as an alias).
+
+        Args:
+            sql: str, SQL query.
+            columns: list[str], names of all columns of the queried table.
+    """
+
+    identifiers = get_identifiers(sql)
+    if identifiers is None:
+        return list(columns)
+    # plain identifiers are case insensitive
+    lower_identifiers = {i.lower() for i in identifiers}
+    return [c for c in columns if c in identifiers or c.lower() in lower_identifiers]
+
+
+def to_axis(axis: 'str | dict'):
+    """
+        Return plot axis information from a column name or axis dictionary.
+
+        Args:
+            axis: str | dict, column name, or axis column, units, and range (as in a config).
+    """
+
+    if isinstance(axis, dict):
+        return axis
+    return {"value": axis, "units": {"custom": None}, "range": {"min": None, "max": None}}
+
+
+def find_result_column(df: pd.DataFrame, col: str):
+    """
+        Return the name of a query result column. Names are matched ignoring case if there
+        is no exact match, as SQL identifiers are (so result column names may differ in case
+        from the names used to refer to them).
+
+        Args:
+            df: pd.DataFrame, query result.
+            col: str, column name.
+    """
+
+    if col in df.columns:
+        return col
+    matches = [c for c in df.columns if c.lower() == col.lower()]
+    if len(matches) != 1:
+        raise KeyError("Column not found in query result", col)
+    return matches[0]
+
+
+def plot_query(df: pd.DataFrame, title: str, x_axis: 'str | dict', y_axis: 'str | dict',
+               series_column: 'str | None' = None, plot_type="generic",
+               output_path=Path(__file__).parent, save_plot=True):
+    """
+        Plot the result of a query with one row per x-axis value per series.
+
+        Args:
+            df: pd.DataFrame, query result.
+            title: str, plot title.
+            x_axis: str | dict, x-axis column name, or x-axis column, units, and range.
+                Column names are matched ignoring case.
+            y_axis: str | dict, y-axis column name, or y-axis column, units, and range.
+            series_column: str | None, name of a column with one series per distinct value.
+            plot_type: str, type of plot. Options: ['generic', 'line']
+            output_path: Path, path to a directory for storing the generated plot.
+            save_plot: bool, flag to signify that a plot should be saved after production.
+    """
+
+    if plot_type not in PLOT_TYPES:
+        raise RuntimeError("Plot type must be one of 'generic' or 'line'.")
+    x_axis, y_axis = to_axis(x_axis), to_axis(y_axis)
+    # refer to columns by their names in the query result
+    x_axis = dict(x_axis, value=find_result_column(df, x_axis["value"]))
+    y_axis = dict(y_axis, value=find_result_column(df, y_axis["value"]))
+    if series_column:
+        series_column = find_result_column(df, series_column)
+
+    series_filters = ([[series_column, "==", s] for s in df[series_column].dropna().unique()]
+                      if series_column else [])
+    # plotting modifies the dataframe
+    df = df.copy()
+    if plot_type == "line":
+        return plot_line_chart(title, df, x_axis, y_axis, series_filters, output_path, save_plot)
+    return plot_generic(title, df, x_axis, y_axis, series_filters, output_path, save_plot)
+
+
+def read_args():
+    """
+        Return parsed command line arguments.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Run an SQL query over perflog data (available as the perflogs table) and \
+            print, save, or plot the result.")
+
+    # required positional arguments
+    parser.add_argument("log_path", type=Path,
+                        help="path to a perflog file or a directory containing perflog files, \
+                            or to a perflog archive")
+    parser.add_argument("sql", type=str,
+                        help="SQL query, or @ followed by a path to a file containing an SQL query")
+
+    # optional arguments
+    parser.add_argument("-e", "--engine", type=str, default="sqlite", choices=ENGINES,
+                        help="in-process SQL engine (default is sqlite)")
+    parser.add_argument("-s", "--save_csv", type=Path,
+                        help="path to a csv file for storing the query result (default is printing it)")
+    parser.add_argument("-p", "--plot_type", type=str, choices=PLOT_TYPES,
+                        help="plot the query result (requires x-axis and y-axis columns)")
+    parser.add_argument("-x", "--x_axis", type=str,
+                        help="name of the x-axis column of the plot")
+    parser.add_argument("-y", "--y_axis", type=str,
+                        help="name of the y-axis column of the plot")
+    parser.add_argument("--series", type=str,
+                        help="name of a column with one plot series per distinct value")
+    parser.add_argument("-t", "--title", type=str, default="Query",
+                        help="plot title (default is Query)")
+    parser.add_argument("-o", "--output_path", type=Path, default=Path(__file__).parent,
+                        help="path to a directory for storing the plot (default is current directory)")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of processes used to parse perflogs in parallel (default is 1)")
+    parser.add_argument("-c", "--cache_path", type=Path,
+                        help="path to a directory for caching parsed perflogs between runs \
+                            (default is no caching)")
+    parser.add_argument("-d", "--debug", action="store_true",
+                        help="debug flag for printing additional information")
+
+    return parser.parse_args()
+
+
+def main():
+
+    args = read_args()
+
+    try:
+        sql = args.sql
+        if sql.startswith("@"):
+            with open(sql[1:], "r") as file:
+                sql = file.read()
+        if args.plot_type and not (args.x_axis and args.y_axis):
+            raise RuntimeError("Plotting a query result requires x-axis and y-axis columns.")
+
+        # only parse perflog fields that the query may refer to
+        identifiers = get_identifiers(sql)
+        columns = list(identifiers) if identifiers is not None else None
+        with PerflogQuery.from_path(args.log_path, args.engine, args.debug, args.jobs,
+                                    args.cache_path, columns) as perflog_query:
+            result = perflog_query.query(sql)
+
+        if args.save_csv:
+            result.to_csv(args.save_csv, index=False)
+        else:
+            print(result.to_string(index=False))
+        if args.plot_type:
+            plot_query(result, args.title, args.x_axis, args.y_axis, args.series, args.plot_type,
+                       args.output_path)
+
+    except Exception as e:
+        print(type(e).__name__ + ":", e)
+        print("Query stopped")
+        if args.debug:
+            print(traceback.format_exc())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import hashlib
+import os
+import threading
+from pathlib import Path
+
+from perflog_discovery import find_perflogs
+from perflog_handler import PerflogHandler, get_file_stat, is_archive
+from profiler import Profiler
+
+
+class PerflogStore:
+
+    def __init__(self, log_path: Path, workers=1, cache_path=None, categorical=True):
+        """
+            Initialise class. Perflogs are read once and the resulting dataframe is shared
+            (read-only) by all users of the store, e.g. all sessions of a Streamlit app.
+            The data is only read again when the fingerprint of the perflogs changes.
+
+            Args:
+                log_path: Path, path to performance log file or directory, or to a perflog archive.
+                workers: int, number of processes used to parse perflogs in parallel.
+                cache_path: Path | None, path to a directory for caching parsed perflogs.
+                categorical: bool, flag to store repetitive string columns as pandas categoricals.
+        """
+
+        self.log_path = log_path
+        # users may refresh the store from several threads
+        self.lock = threading.Lock()
+        self.profiler = Profiler(enabled=True)
+        # directory listings from previous fingerprints
+        self.manifest = {}
+        # NOTE: the fingerprint is taken before reading, so changes made while reading are picked up later
+        self.fingerprint = self.get_fingerprint()
+        self.perflogs = PerflogHandler(log_path, workers=workers, cache_path=cache_path,
+                                       categorical=categorical, profiler=self.profiler)
+        # incremented whenever the shared data changes
+        self.version = 0
+        # version of the latest data that was read again in full (e.g. after a perflog was rewritten)
+        self.reload_version = 0
+
+    def get_fingerprint(self):
+        """
+            Return a hash of the paths, sizes, and modification times of the perflogs in the
+            class log path (or of the files of a perflog archive), which changes whenever
+            a perflog is added, removed, or modified.
+        """
+
+        if is_archive(self.log_path):
+            files = sorted(os.path.join(d, f) for d, _, names in os.walk(self.log_path) for f in names)
+        elif os.path.isdir(self.log_path):
+            # only directories modified since the previous fingerprint are listed again
+            files, manifest = find_perflogs(self.log_path, manifest=self.manifest)
+            self.manifest.update(manifest)
+        else:
+            files = [self.log_path]
+
+        digest = hashlib.sha1()
+        for file in files:
+            try:
+                size, mtime = get_file_stat(file)
+            except FileNotFoundError:
+                # removed since the directory was listed
+                continue
+            digest.update("{0}|{1}|{2}\n".format(file, size, mtime).encode())
+        return digest.hexdigest()
+
+    def get_data(self):
+        """
+            Return a tuple containing the shared perflog dataframe (which must not be modified)
+            and its version.
+        """
+
+        with self.lock:
+            return self.perflogs.get_df(), self.version
+
+    def refresh(self):
+        """
+            Read perflog changes if the fingerprint of the perflogs has changed since they were
+            last read. Only rows appended to perflogs are read, unless a perflog has been rewritten.
+            Return the number of new rows, or None if all perflogs had to be read again.
+        """
+
+        with self.lock:
+            fingerprint = self.get_fingerprint()
+            if fingerprint == self.fingerprint:
+                return 0
+            if is_archive(self.log_path):
+                self.perflogs.read_perflog_archive()
+                new_rows = None
+            else:
+                new_rows = self.perflogs.read_new_perflogs()
+            self.fingerprint = fingerprint
+            if new_rows != 0:
+                self.version += 1
+            if new_rows is None:
+                self.reload_version = self.version
+            return new_rows
+
+    def is_reloaded_since(self, version):
+        """
+            Return True if the shared data has been read again in full since a given version,
+            rather than only having rows appended, e.g. because a perflog was rewritten
+            (even if the rewritten perflog has more rows than before).
+
+            Args:
+                version: int, version of previously used shared data.
+        """
+
+        with self.lock:
+            return self.reload_version > version
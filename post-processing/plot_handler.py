@@ -1,21 +1,49 @@
+import html
 import itertools
+import json
 import math
 import os
+import re
+from functools import reduce
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from bokeh.models import HoverTool, Legend
+from bokeh.embed import json_item
+from bokeh.models import FactorRange, HoverTool, Legend, Title, Whisker
 from bokeh.models.sources import ColumnDataSource
 from bokeh.palettes import viridis
-from bokeh.plotting import figure, output_file, save
+from bokeh.plotting import figure, save
+from bokeh.resources import CDN
 from bokeh.transform import factor_cmap
+from downsampling import downsample
 from pandas.api.types import is_datetime64_any_dtype as is_datetime
+from pandas.api.types import is_extension_array_dtype, is_numeric_dtype
 from titlecase import titlecase
 
+# page that loads a plot saved with its data in a separate JSON file
+# characters replaced in the element id of a sidecar plot (which is also used in the plot JSON)
+UNSAFE_ID_REGEX = re.compile(r"[^A-Za-z0-9_-]")
+SIDECAR_HTML = """<!DOCTYPE html>
+<html lang="en">
+  <head>
+    <meta charset="utf-8">
+    <title>{title}</title>
+    {resources}
+  </head>
+  <body>
+    <div id="{target}"></div>
+    <script>
+      fetch({data_file}).then((response) => response.json()).then((item) => Bokeh.embed.embed_item(item));
+    </script>
+  </body>
+</html>
+"""
+
 
 def plot_generic(title, df: pd.DataFrame, x_axis, y_axis, series_filters,
-                 output_path=Path(__file__).parent, save_plot=True, debug=False):
+                 output_path=Path(__file__).parent, save_plot=True, debug=False, error_columns=None,
+                 ideal_column=None, limit_column=None, webgl=False, sidecar=False):
     """
         Create a bar chart for the supplied data using bokeh.
 
@@ -30,6 +58,11 @@ def plot_generic(title, df: pd.DataFrame, x_axis, y_axis, series_filters,
             save_plot: bool, flag to signify that a plot should be saved after production.
                 Disable when running with Streamlit.
             debug: bool, flag to print additional information to console.
+            error_columns: list[str] | None, names of lower and upper error bar columns.
+            ideal_column: str | None, name of column containing ideal scaling values.
+            limit_column: str | None, name of column containing values of flagged (poorly scaling) runs.
+            webgl: bool, flag to draw the plot with WebGL (faster for dense plots).
+            sidecar: bool, flag to save the plot data to a JSON file loaded by the HTML file.
     """
 
     # get column names and labels for axes
@@ -37,87 +70,93 @@ def plot_generic(title, df: pd.DataFrame, x_axis, y_axis, series_filters,
     y_column, y_label = get_axis_labels(df, y_axis, series_filters, x_column)
 
     # find x-axis groups (series columns)
-    groups = [x_column]
-    for f in series_filters:
-        if f[0] not in groups:
-            groups.append(f[0])
-    # keep original x-axis dtype for sorting
-    x_col_dtype = df[x_column].dtype
-    last_group_dtype = df[groups[-1]].dtype
+    series_columns = [c for c in dict.fromkeys(f[0] for f in series_filters) if c != x_column]
+    groups = [x_column] + series_columns
+    # series are labelled by their series column values (or by x-axis value if there are none)
+    label_columns = series_columns or groups
+    # keep typed group keys for sorting (in order of first appearance, as grouped below)
+    group_keys = df[groups].drop_duplicates()
     # all x-axis data treated as categorical
     for g in groups:
         df[g] = df[g].astype(str)
     # combine group names for later plotting with groupby
     index_group_col = "_".join(groups)
-    # group by group names (or just x-axis if no other groups are present)
-    grouped_df = (df.groupby(x_column, sort=False) if len(groups) == 1
-                  else df.groupby(groups, sort=False))
+    # group by x-axis value and series (the values of several series columns form one factor level)
+    grouped_df = (df.groupby(x_column, sort=False) if not series_columns
+                  else df.groupby([df[x_column], join_columns(df, series_columns)], sort=False))
 
     if debug:
         print("")
         print("Plot x-axis groups:")
-        for key, _ in grouped_df:
-            print(grouped_df.get_group(key))
+        for _, group in grouped_df:
+            print(group)
 
-    # adjust y-axis range
-    min_y = (0 if np.nanmin(df[y_column]) >= 0
-             else math.floor(np.nanmin(df[y_column])*1.2))
-    max_y = (0 if np.nanmax(df[y_column]) <= 0
-             else math.ceil(np.nanmax(df[y_column])*1.2))
+    # adjust y-axis range (including error bars and ideal scaling)
+    y_values = df[[y_column] + (error_columns or []) + ([ideal_column] if ideal_column else [])
+                  ].to_numpy(dtype=float)
+    min_y = (0 if np.nanmin(y_values) >= 0
+             else math.floor(np.nanmin(y_values)*1.2))
+    max_y = (0 if np.nanmax(y_values) <= 0
+             else math.ceil(np.nanmax(y_values)*1.2))
 
-    # create html file to store plot in
-    if save_plot:
-        output_file(filename=os.path.join(
-            output_path, "{0}.html".format(title.replace(" ", "_"))), title=title)
+    # sort x-axis values in descending order (otherwise default sort is ascending)
+    reverse = False
+    if x_axis.get("sort"):
+        if x_axis["sort"] == "descending":
+            reverse = True
+
+    # sort x-axis groups by x-axis value and then by series values, keeping ties in order
+    # categoricals are sorted by value rather than by category order
+    sort_keys = group_keys.apply(
+        lambda col: col.astype(col.cat.categories.dtype) if isinstance(col.dtype, pd.CategoricalDtype) else col)
+    sorted_keys = group_keys.loc[sort_keys.sort_values(
+        groups, ascending=not reverse, kind="stable").index].astype(str)
+    x_factors = (sorted_keys[x_column].tolist() if not series_columns
+                 else list(zip(sorted_keys[x_column], join_columns(sorted_keys, series_columns))))
+    # series in ascending order (reused for colours and legend items)
+    series_keys = group_keys.loc[sort_keys[label_columns].drop_duplicates().sort_values(
+        label_columns, kind="stable").index, label_columns].astype(str)
+    series_values = join_columns(series_keys, label_columns).tolist()
+    series_labels = dict(zip(series_values, (get_series_label(label_columns, values) for values
+                                             in series_keys.itertuples(index=False, name=None))))
 
     # create plot
-    plot = figure(x_range=grouped_df, y_range=(min_y, max_y), title=title,
-                  width=800, toolbar_location="above")
+    plot = figure(x_range=FactorRange(factors=x_factors), y_range=(min_y, max_y), title=title,
+                  width=800, toolbar_location="above", output_backend="webgl" if webgl else "canvas")
     # configure tooltip
     plot.add_tools(HoverTool(tooltips=[(y_label, "@{0}_mean".format(y_column)
                                         + ("{%0.2f}" if pd.api.types.is_float_dtype(df[y_column].dtype)
                                            else ""))],
                              formatters={"@{0}_mean".format(y_column): "printf"}))
 
-    # sort x-axis values in descending order (otherwise default sort is ascending)
-    reverse = False
-    if x_axis.get("sort"):
-        if x_axis["sort"] == "descending":
-            reverse = True
-
-    # sort x-axis groups by series first
-    if len(groups) > 1:
-        # get series values with their original dtype
-        # NOTE: currently not accounting for more than one series column
-        series_values = [pd.Series(x[-1], dtype=last_group_dtype).iloc[0]
-                         for x in plot.x_range.factors]
-        sorted_x_items = [x[1] for x in sorted(zip(series_values, plot.x_range.factors),
-                                               reverse=reverse, key=lambda x: x[0])]
-        plot.x_range.factors = sorted_x_items
-
-    # sort by x-axis values
-    plot.x_range.factors = sorted(plot.x_range.factors, reverse=reverse,
-                                  key=lambda x: pd.Series(x[0] if len(groups) > 1 else x,
-                                                          dtype=x_col_dtype).iloc[0])
-
-    # automatically base bar colouring on last group column
-    colour_factors = [str(x) for x in sorted(pd.Series(df[groups[-1]].unique(),
-                                                       dtype=last_group_dtype))]
+    # automatically base bar colouring on series (last factor level)
+    colour_factors = series_values
     # divide and assign colours
-    index_cmap = factor_cmap(index_group_col, palette=viridis(len(colour_factors)),
-                             factors=colour_factors, start=len(groups)-1, end=len(groups))
+    series_level = 1 if series_columns else 0
+    index_cmap = factor_cmap(index_group_col, palette=get_palette(len(colour_factors)),
+                             factors=colour_factors, start=series_level, end=series_level + 1)
+    # only compute the plotted group means (rather than all group statistics)
+    mean_columns = list(dict.fromkeys([y_column] + (error_columns or []) +
+                                      [c for c in [ideal_column, limit_column] if c]))
+    means = grouped_df[mean_columns].mean()
+    group_index = means.index.tolist()
     # add legend labels to data source
-    data_source = ColumnDataSource(grouped_df).data
-    legend_labels = ["{0} = {1}".format(groups[-1].replace("_", " "),
-                                        group[-1] if len(groups) > 1 else group)
-                     for group in data_source[index_group_col]]
-    data_source["legend_labels"] = legend_labels
+    legend_labels = [series_labels[group[-1] if series_columns else group] for group in group_index]
+    # one source shared by all glyphs (means are stored as binary arrays)
+    data_source = ColumnDataSource({index_group_col: group_index, "legend_labels": legend_labels,
+                                    **{"{0}_mean".format(c): means[c].to_numpy(dtype=float)
+                                       for c in mean_columns}})
 
     # create legend outside plot
     plot.add_layout(Legend(), "right")
     # add bars
     plot.vbar(x=index_group_col, top="{0}_mean".format(y_column), width=0.9, source=data_source,
               line_color=index_cmap, fill_color=index_cmap, legend_group="legend_labels", hover_alpha=0.9)
+    # add error bars (each group contains a single aggregated row)
+    if error_columns:
+        plot.add_layout(Whisker(source=data_source, base=index_group_col,
+                                lower="{0}_mean".format(error_columns[0]),
+                                upper="{0}_mean".format(error_columns[1])))
     # add labels
     plot.xaxis.axis_label = x_label
     plot.yaxis.axis_label = y_label
@@ -130,21 +169,58 @@ def plot_generic(title, df: pd.DataFrame, x_axis, y_axis, series_filters,
     # adjust font size
     plot.title.text_font_size = "15pt"
 
-    # get label values with their original dtype
-    label_values = [pd.Series(x.label["value"].split("=")[1].strip(), dtype=last_group_dtype).iloc[0]
-                    for x in plot.legend[0].items]
-    # sort legend items (order determined by x-axis sort)
-    sorted_legend_items = [x[1] for x in sorted(zip(label_values, plot.legend[0].items),
-                                                reverse=reverse, key=lambda x: x[0])]
-    plot.legend[0].items = sorted_legend_items
+    # sort legend items by series value (order determined by x-axis sort)
+    legend_items = {x.label["value"]: x for x in plot.legend[0].items}
+    sorted_labels = [series_labels[value] for value in (series_values[::-1] if reverse else series_values)]
+    plot.legend[0].items = [legend_items[label] for label in sorted_labels if label in legend_items]
+
+    # add ideal scaling and flagged runs (after sorting series legend items)
+    if ideal_column:
+        plot.scatter(x=index_group_col, y="{0}_mean".format(ideal_column), source=data_source,
+                     marker="dash", size=30, line_width=2, color="black", legend_label="Ideal")
+    if limit_column:
+        plot.scatter(x=index_group_col, y="{0}_mean".format(limit_column), source=data_source,
+                     marker="x", size=15, line_width=3, color="red", legend_label="Below threshold")
 
     # save to file
     if save_plot:
-        save(plot)
+        save_plot_file(plot, title, output_path, sidecar)
 
     return plot
 
 
+def join_columns(df: pd.DataFrame, columns: 'list[str]'):
+    """
+        Return the values of string columns joined into one string per row (e.g. "2, gnu").
+
+        Args:
+            df: dataframe, data containing string columns.
+            columns: list[str], names of columns to join.
+    """
+    return reduce(lambda joined, col: joined + ", " + col, [df[c] for c in columns]).rename(None)
+
+
+def get_series_label(series_columns: 'list[str]', values: tuple):
+    """
+        Return the legend label of a series (e.g. "num nodes = 2, environ = gnu").
+
+        Args:
+            series_columns: list[str], names of series columns.
+            values: tuple, values of the series columns.
+    """
+    return ", ".join("{0} = {1}".format(c.replace("_", " "), v) for c, v in zip(series_columns, values))
+
+
+def get_palette(num_colours: int):
+    """
+        Return a list of colours for a number of series (colours are repeated for more than 256 series).
+
+        Args:
+            num_colours: int, number of colours.
+    """
+    return list(itertools.islice(itertools.cycle(viridis(min(num_colours, 256))), num_colours))
+
+
 def get_axis_labels(df: pd.DataFrame, axis, series_filters, x_column="x"):
     """
         Return the column name and label for a given axis. If a column name is supplied as
@@ -194,7 +270,8 @@ def get_axis_labels(df: pd.DataFrame, axis, series_filters, x_column="x"):
 
 
 def plot_line_chart(title, df: pd.DataFrame, x_axis, y_axis, series_filters,
-                    output_path=Path(__file__).parent, save_plot=True):
+                    output_path=Path(__file__).parent, save_plot=True, error_columns=None,
+                    ideal_column=None, limit_column=None, downsampling=None, webgl=False, sidecar=False):
     """
         Create a line chart for the supplied data using bokeh.
 
@@ -208,6 +285,12 @@ def plot_line_chart(title, df: pd.DataFrame, x_axis, y_axis, series_filters,
                 Default is current directory.
             save_plot: bool, flag to signify that a plot should be saved after production.
                 Disable when running with Streamlit.
+            error_columns: list[str] | None, names of lower and upper error bar columns.
+            ideal_column: str | None, name of column containing ideal scaling values.
+            limit_column: str | None, name of column containing values of flagged (poorly scaling) runs.
+            downsampling: dict | None, target number of points per series and downsampling method.
+            webgl: bool, flag to draw the plot with WebGL (faster for dense plots).
+            sidecar: bool, flag to save the plot data to a JSON file loaded by the HTML file.
     """
 
     # get column names and labels for axes
@@ -216,16 +299,11 @@ def plot_line_chart(title, df: pd.DataFrame, x_axis, y_axis, series_filters,
 
     # adjust axis ranges
     min_x, max_x = get_axis_min_max(df, x_axis)
-    min_y, max_y = get_axis_min_max(df, y_axis)
-
-    # create html file to store plot in
-    if save_plot:
-        output_file(filename=os.path.join(
-            output_path, "{0}.html".format(title.replace(" ", "_"))), title=title)
+    min_y, max_y = get_axis_min_max(df, y_axis, (error_columns or []) + ([ideal_column] if ideal_column else []))
 
     # create plot
     plot = figure(x_range=(min_x, max_x), y_range=(min_y, max_y), title=title,
-                  width=800, toolbar_location="above")
+                  width=800, toolbar_location="above", output_backend="webgl" if webgl else "canvas")
 
     # configure tooltip
     plot.add_tools(HoverTool(tooltips=[(y_label, "@{0}".format(y_column)
@@ -235,19 +313,49 @@ def plot_line_chart(title, df: pd.DataFrame, x_axis, y_axis, series_filters,
 
     # create legend outside plot
     plot.add_layout(Legend(), "right")
-    colours = itertools.cycle(viridis(len(series_filters)))
-
-    for f in series_filters:
-        filtered_df = df[df[f[0]] == int(f[2])]
-        legend_label = "{0} = {1}".format(f[0].replace("_", " "), str(f[-1]))
-        plot.line(x=x_column, y=y_column, source=filtered_df, legend_label=legend_label,
-                  line_width=2, color=next(colours))
+    # split data into series in a single pass (series are plotted in ascending order)
+    series_columns = list(dict.fromkeys(f[0] for f in series_filters))
+    series = list(df.groupby(series_columns, sort=True, observed=True)) if series_columns else [((), df)]
+    colours = iter(get_palette(len(series)))
+    downsampled = False
+
+    for values, filtered_df in series:
+        # reduce large series before they are written to the plot
+        if downsampling:
+            num_rows = len(filtered_df)
+            filtered_df = downsample(filtered_df, x_column, y_column, downsampling["points"],
+                                     downsampling.get("method", "lttb"),
+                                     [limit_column] if limit_column else None)
+            downsampled = downsampled or len(filtered_df) < num_rows
+        # one source per series shared by all glyphs
+        source = get_plot_source(filtered_df, [x_column, y_column] + (error_columns or []) +
+                                 [c for c in [ideal_column, limit_column] if c])
+        # a single series is not added to the legend
+        legend = {"legend_label": get_series_label(series_columns, values)} if series_columns else {}
+        colour = next(colours)
+        plot.line(x=x_column, y=y_column, source=source, line_width=2, color=colour, **legend)
+        # add error bars
+        if error_columns:
+            plot.add_layout(Whisker(source=source, base=x_column,
+                                    lower=error_columns[0], upper=error_columns[1],
+                                    line_color=colour))
+        # add ideal scaling and flagged runs
+        if ideal_column:
+            plot.line(x=x_column, y=ideal_column, source=source, legend_label="Ideal",
+                      line_width=2, line_dash="dashed", color=colour)
+        if limit_column:
+            plot.scatter(x=x_column, y=limit_column, source=source, legend_label="Below threshold",
+                         marker="x", size=15, line_width=3, color="red")
 
     # add labels
     plot.xaxis.axis_label = x_label
     plot.yaxis.axis_label = y_label
     # adjust font size
     plot.title.text_font_size = "15pt"
+    # note downsampled series in a subtitle
+    if downsampled:
+        plot.add_layout(Title(text="Downsampled to {0} points per series ({1})".format(
+            downsampling["points"], downsampling.get("method", "lttb")), text_font_style="italic"), "above")
 
     # flip x-axis if sort is descending
     if x_axis.get("sort"):
@@ -259,18 +367,74 @@ def plot_line_chart(title, df: pd.DataFrame, x_axis, y_axis, series_filters,
 
     # save to file
     if save_plot:
-        save(plot)
+        save_plot_file(plot, title, output_path, sidecar)
 
     return plot
 
 
-def get_axis_min_max(df, axis):
+def get_plot_source(df: pd.DataFrame, columns: 'list[str]'):
+    """
+        Return a column data source containing only the plotted columns of a dataframe.
+        Numeric and datetime columns are stored as NumPy arrays, which bokeh encodes as
+        binary data rather than JSON lists.
+
+        Args:
+            df: dataframe, data to plot.
+            columns: list[str], names of plotted columns.
+    """
+
+    data = {}
+    for col in dict.fromkeys(columns):
+        # nullable columns (e.g. Int64) are stored as floats with missing values as NaN
+        if is_extension_array_dtype(df[col].dtype) and is_numeric_dtype(df[col].dtype):
+            data[col] = df[col].to_numpy(dtype=float, na_value=np.nan)
+        # timezone-aware datetimes are stored in UTC
+        elif is_datetime(df[col]):
+            data[col] = df[col].to_numpy(dtype="datetime64[ns]")
+        else:
+            data[col] = df[col].to_numpy()
+    return ColumnDataSource(data)
+
+
+def save_plot_file(plot, title: str, output_path: Path, sidecar=False):
+    """
+        Save a plot to an HTML file named after its title. With a sidecar, the HTML file only
+        loads BokehJS and fetches the plot and its data from a JSON file with the same name
+        (which must be served over HTTP, as browsers block requests to local files).
+
+        Args:
+            plot: figure, plot to save.
+            title: str, plot title.
+            output_path: Path, path to a directory for storing the plot.
+            sidecar: bool, flag to save the plot data to a separate JSON file.
+    """
+
+    name = title.replace(" ", "_")
+    html_path = os.path.join(output_path, "{0}.html".format(name))
+    if not sidecar:
+        save(plot, filename=html_path, resources=CDN, title=title)
+        return
+
+    data_file = "{0}.json".format(name)
+    # the same id is used by the page element and the plot JSON, so it must not need escaping
+    target = "plot-" + UNSAFE_ID_REGEX.sub("_", name)
+    with open(os.path.join(output_path, data_file), "w") as file:
+        json.dump(json_item(plot, target), file)
+    with open(html_path, "w") as file:
+        # NOTE: "<" is escaped so that the file name cannot end the script element
+        file.write(SIDECAR_HTML.format(title=html.escape(title), resources=CDN.render_js(), target=target,
+                                       data_file=json.dumps(data_file).replace("<", "\\u003c")))
+
+
+def get_axis_min_max(df, axis, extra_columns=None):
     """
         Return the minimum and maximum numeric values for a given axis.
 
         Args:
             df: dataframe, data to plot.
             axis: dict, axis column, units, and values to scale by.
+            extra_columns: list[str] | None, names of other columns plotted on the axis
+                (e.g. error bars) to include in the default range.
     """
 
     # get column name of axis
@@ -280,8 +444,8 @@ def get_axis_min_max(df, axis):
     axis_max = axis.get("range").get("max") if axis.get("range") else None
 
     # FIXME: str types and user defined datetime ranges not currently supported
-    axis_min_element = np.nanmin(df[col_name])
-    axis_max_element = np.nanmax(df[col_name])
+    axis_min_element = min(np.nanmin(df[c]) for c in [col_name] + (extra_columns or []))
+    axis_max_element = max(np.nanmax(df[c]) for c in [col_name] + (extra_columns or []))
 
     # use defaults if type is datetime
     if (is_datetime(df[col_name])):
@@ -1,21 +1,29 @@
 import argparse
-import operator as op
 import os
+import time
 import traceback
-from functools import reduce
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
+from aggregation_handler import aggregate, get_error_columns, group_statistic
 from config_handler import ConfigHandler
-from perflog_handler import PerflogHandler
+from filter_handler import OPERATORS, MaskCache, compile_condition, compile_filters, eval_filters
+from perflog_handler import PerflogHandler, is_lower_better
 from plot_handler import plot_generic, plot_line_chart
+from profiler import Profiler
+from scaling_analysis import EFFICIENCY_THRESHOLD, analyse_scaling, find_resource_column
 
+# stages of post-processing recorded by the profiler (replaced on each run)
+PROCESSING_STAGES = ["typing", "sorting", "filtering", "scaling", "aggregation", "scaling analysis",
+                     "saving data", "plotting"]
 
 class PostProcessing:
 
     def __init__(self, log_path: Path, output_path=Path(__file__).parent,
-                 save_data=None, save_plot=True, debug=False):
+                 save_data=None, save_plot=True, debug=False, workers=1, cache_path=None,
+                 config: 'ConfigHandler | None' = None, categorical=True, df: 'pd.DataFrame | None' = None,
+                 profiler: 'Profiler | None' = None, webgl=False, sidecar=False, full_search=False):
         """
             Initialise class.
 
@@ -27,6 +35,20 @@ class PostProcessing:
                 save_plot: bool, flag to signify that a plot should be saved after production.
                     Disable when running with Streamlit.
                 debug: bool, flag to print additional information to console.
+                workers: int, number of processes used to parse perflogs in parallel.
+                cache_path: Path | None, path to a directory for caching parsed perflogs.
+                config: ConfigHandler | None, if supplied, only the columns used by the config and
+                    the rows that pass its filters are loaded from the perflogs.
+                categorical: bool, flag to store repetitive string columns as pandas categoricals.
+                df: pd.DataFrame | None, previously loaded perflog data to use instead of
+                    reading perflogs from the log path. The dataframe is never modified
+                    (it is re-indexed by row position if it has a different index).
+                profiler: Profiler | None, profiler recording the time, rows, and memory of
+                    each reading and post-processing stage (default is no profiling).
+                webgl: bool, flag to draw plots with WebGL (faster for dense plots).
+                sidecar: bool, flag to save plot data to a JSON file loaded by the plot HTML file.
+                full_search: bool, flag to also search the subdirectories of <system>/<partition>
+                    directories that contain perflogs.
         """
 
         # FIXME (issue #264): add proper logging
@@ -34,15 +56,62 @@ class PostProcessing:
         self.save_data = save_data
         self.save_plot = save_plot
         self.debug = debug
+        self.profiler = profiler or Profiler()
+        self.webgl = webgl
+        self.sidecar = sidecar
         # find and read perflogs
-        self.original_df = PerflogHandler(log_path, self.debug).get_df()
-        # copy original data for modification during post-processing
-        self.df = self.original_df.copy()
+        self.perflogs = PerflogHandler(
+            log_path, self.debug, workers, cache_path,
+            columns=config.all_columns + config.extra_columns if config else None,
+            row_filter=(lambda df: self.perflog_filter(df, config)) if config else None,
+            categorical=categorical, profiler=self.profiler, full_search=full_search) if df is None else None
+        self.original_df = self.perflogs.get_df() if df is None else with_position_index(df)
+        # original data for modification during post-processing
+        self.reset_df()
         # dataframe filters
         self.mask = pd.Series(self.df.index.notnull())
+        # masks of previously applied filter conditions (only valid for the current original data)
+        self.mask_cache = MaskCache()
+        self.df_version = 0
         # plot placeholder
         self.plot = None
 
+    def read_new_perflogs(self):
+        """
+            Add rows appended to the perflogs since they were last read to the original dataframe.
+            Return the number of new rows, or None if all perflogs had to be read again.
+            Post-processing must be re-run to include the new rows in the processed data.
+        """
+
+        if self.perflogs is None:
+            raise RuntimeError("New perflog rows can only be read when perflogs are read from a log path")
+        new_rows = self.perflogs.read_new_perflogs()
+        if new_rows != 0:
+            self.update_original_df(self.perflogs.get_df())
+        return new_rows
+
+    def update_original_df(self, df: pd.DataFrame):
+        """
+            Replace the original data with an updated version (e.g. including new perflog rows).
+            Post-processing must be re-run to include the changes in the processed data.
+
+            Args:
+                df: pd.DataFrame, updated perflog data. The dataframe is never modified.
+        """
+
+        self.original_df = with_position_index(df)
+        # masks of the previous data can no longer be reused
+        self.df_version += 1
+        self.mask_cache.clear()
+
+    def reset_df(self):
+        """
+            Reset the processed dataframe to the original data. With copy-on-write enabled,
+            no data is copied until a column is modified.
+        """
+        # without copy-on-write, modifying a shallow copy may also modify the original data
+        self.df = self.original_df.copy(deep=not is_copy_on_write())
+
     def run_post_processing(self, config: ConfigHandler):
         """
             Return a dataframe containing the information passed to a plotting script
@@ -55,71 +124,136 @@ class PostProcessing:
         # FIXME (issue #265): consider hiding typing + sorting from user
         # because these steps must happen every time at the start
 
+        # remove stages of previous runs (reading stages are kept)
+        self.profiler.clear(PROCESSING_STAGES)
+
         # apply column types
-        self.apply_df_types(config.all_columns, config.column_types)
+        with self.profiler.stage("typing", len(self.df)) as stage:
+            self.apply_df_types(config.all_columns, config.column_types)
+            # only process the columns used by the config
+            self.df = self.df[[c for c in dict.fromkeys(config.all_columns + config.extra_columns)
+                               if c in self.original_df.columns]]
+            stage["rows_out"] = len(self.df)
         # sort rows
-        # NOTE: sorting here is necessary to ensure correct filtering + scaling alignment
-        self.sort_df(config.x_axis, config.series_columns)
+        # NOTE: sorting here keeps plotted lines (and lists of custom scaling values) in x-axis order
+        with self.profiler.stage("sorting", len(self.df)) as stage:
+            self.sort_df(config.x_axis, config.series_columns)
+            stage["rows_out"] = len(self.df)
         # get data filter mask
-        self.mask = self.filter_df(*config.get_filters())
-        self.check_filtered_row_count(
-            config.x_axis["value"], [s[0] for s in config.series_filters], config.plot_columns)
+        with self.profiler.stage("filtering", len(self.df)) as stage:
+            self.mask = self.filter_df(*config.get_filters())
+            # NOTE: repeated runs are expected when they are aggregated
+            if not config.aggregation:
+                self.check_filtered_row_count(config.x_axis["value"], config.series_columns, config.plot_columns)
+            stage["rows_out"] = int(self.mask.sum())
+        # rows of the original dataframe that pass the filters
+        filtered_index = self.df.index[self.mask]
 
         # scale y-axis
-        self.transform_df_data(
-            config.x_axis["value"], config.y_axis["value"], *config.get_y_scaling(), config.series_filters)
+        statistic = config.aggregation.get("statistic") if config.aggregation else None
+        with self.profiler.stage("scaling", len(filtered_index)) as stage:
+            self.transform_df_data(
+                config.x_axis["value"], config.y_axis["value"], *config.get_y_scaling(), config.series_filters,
+                statistic)
+            stage["rows_out"] = int(self.mask.sum())
+        # aggregate repeated runs
+        stat_columns = []
+        if config.aggregation:
+            with self.profiler.stage("aggregation", int(self.mask.sum())) as stage:
+                stat_columns = self.aggregate_df(
+                    config.x_axis["value"], config.y_axis["value"], config.series_columns,
+                    config.plot_columns + config.extra_columns, config.aggregation)
+                stage["rows_out"] = int(self.mask.sum())
+        error_columns = get_error_columns(config.y_axis["value"], config.aggregation)
+        plot_columns = config.plot_columns + stat_columns
+        # analyse scaling (a scaling metric is plotted instead of the y-axis values)
+        y_axis, ideal_column, limit_column = config.y_axis, None, None
+        if config.scaling_analysis:
+            with self.profiler.stage("scaling analysis", int(self.mask.sum())) as stage:
+                y_axis, analysis_columns = self.analyse_df_scaling(
+                    config.x_axis["value"], config.y_axis, config.series_columns, config.scaling_analysis)
+                stage["rows_out"] = int(self.mask.sum())
+            ideal_column, limit_column = "ideal_" + y_axis["value"], y_axis["value"] + "_limit"
+            # NOTE: error bars of the y-axis values do not apply to scaling metrics
+            error_columns = []
+            plot_columns = plot_columns + analysis_columns
         # log axes
         if (config.x_axis.get("logarithmic") and
             pd.api.types.is_numeric_dtype(self.df[config.x_axis["value"]].dtype)):
             self.df[config.x_axis["value"]] = np.log10(self.df[config.x_axis["value"]])
-        if (config.y_axis.get("logarithmic") and
-            pd.api.types.is_numeric_dtype(self.df[config.y_axis["value"]].dtype)):
-            self.df[config.y_axis["value"]] = np.log10(self.df[config.y_axis["value"]])
+        if (y_axis.get("logarithmic") and
+            pd.api.types.is_numeric_dtype(self.df[y_axis["value"]].dtype)):
+            # NOTE: error bars and reference values are plotted on the same scale
+            # (other statistics are left unchanged)
+            for col in [y_axis["value"]] + error_columns + [c for c in [ideal_column, limit_column] if c]:
+                self.df[col] = np.log10(self.df[col])
         if self.debug:
             print("Selected dataframe:")
-            print(self.df[self.mask][config.plot_columns + config.extra_columns])
+            print(self.df[self.mask][plot_columns + config.extra_columns])
 
         # save dataframe as csv
         if self.save_data in ["original", "filtered", "transformed"]:
-            os.makedirs(self.output_path, exist_ok=True)
-            csv_path = os.path.join(self.output_path, "output.csv")
-            # save original dataframe with no filters or transformations applied
-            if self.save_data == "original":
-                self.original_df.to_csv(path_or_buf=csv_path, index=True)
-            # save original filtered dataframe with no transformations applied
-            elif self.save_data == "filtered":
-                self.original_df[self.mask][config.plot_columns + config.extra_columns].to_csv(
-                    path_or_buf=csv_path, index=True)
-            # save processed dataframe
-            elif self.save_data == "transformed":
-                # set index=False to exclude the dataframe index from the csv
-                self.df[self.mask][config.plot_columns + config.extra_columns].to_csv(
-                    path_or_buf=csv_path, index=True)
-            print("Saved {0} dataframe to {1}".format(self.save_data, self.output_path))
+            with self.profiler.stage("saving data"):
+                os.makedirs(self.output_path, exist_ok=True)
+                csv_path = os.path.join(self.output_path, "output.csv")
+                # save original dataframe with no filters or transformations applied
+                if self.save_data == "original":
+                    self.original_df.to_csv(path_or_buf=csv_path, index=True)
+                # save original filtered dataframe with no transformations applied
+                elif self.save_data == "filtered":
+                    self.original_df.loc[filtered_index, config.plot_columns + config.extra_columns].to_csv(
+                        path_or_buf=csv_path, index=True)
+                # save processed dataframe (including statistics of aggregated runs)
+                elif self.save_data == "transformed":
+                    # set index=False to exclude the dataframe index from the csv
+                    self.df[self.mask][plot_columns + config.extra_columns].to_csv(
+                        path_or_buf=csv_path, index=True)
+                print("Saved {0} dataframe to {1}".format(self.save_data, self.output_path))
         elif self.save_data:
             print("Save data option '{0}' not one of ['original', 'filtered', 'transformed']".format(self.save_data))
 
         # call a plotting script
         if config.plot_type in ["generic", "line"]:
-            os.makedirs(self.output_path, exist_ok=True)
-            if config.plot_type == "generic":
-                self.plot = plot_generic(
-                    config.title, self.df[self.mask][config.plot_columns], config.x_axis, config.y_axis,
-                    config.series_filters, self.output_path, self.save_plot, self.debug)
-            elif config.plot_type == "line":
-                self.plot = plot_line_chart(
-                    config.title, self.df[self.mask][config.plot_columns], config.x_axis, config.y_axis,
-                    config.series_filters, self.output_path, self.save_plot)
+            with self.profiler.stage("plotting", int(self.mask.sum())) as stage:
+                os.makedirs(self.output_path, exist_ok=True)
+                if config.plot_type == "generic":
+                    self.plot = plot_generic(
+                        config.title, self.df[self.mask][plot_columns], config.x_axis, y_axis,
+                        config.series_filters, self.output_path, self.save_plot, self.debug, error_columns,
+                        ideal_column, limit_column, self.webgl, self.sidecar)
+                elif config.plot_type == "line":
+                    self.plot = plot_line_chart(
+                        config.title, self.df[self.mask][plot_columns], config.x_axis, y_axis,
+                        config.series_filters, self.output_path, self.save_plot, error_columns,
+                        ideal_column, limit_column, config.downsampling, self.webgl, self.sidecar)
+                stage["rows_out"] = int(self.mask.sum())
             if self.save_plot:
                 print("Saved {0} plot to {1}".format(config.plot_type, self.output_path))
         elif config.plot_type:
             print("Plot type option '{0}' not one of ['generic', 'line']".format(config.plot_type))
 
-        return self.df[self.mask][config.plot_columns]
+        return self.df[self.mask][plot_columns]
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, output_path=Path(__file__).parent,
+                       save_data=None, save_plot=True, debug=False):
+        """
+            Return a post-processing instance for previously loaded perflog data, so that
+            several configs can be processed without reading the perflogs again.
+
+            Args:
+                df: pd.DataFrame, perflog data (e.g. the original dataframe of another instance).
+                output_path: Path, path to a directory for storing outputs. Default is current directory.
+                save_data: str, state of dataframe to save to csv file.
+                    Options: ['original', 'filtered', 'transformed']
+                save_plot: bool, flag to signify that a plot should be saved after production.
+                debug: bool, flag to print additional information to console.
+        """
+        return cls(None, output_path, save_data, save_plot, debug, df=df)
 
     def check_df_columns(self, all_columns: 'list[str]'):
         """
-            Check that all columns listed in the config exist in the dataframe.
+            Check that all columns listed in the config exist in the original dataframe.
 
             Args:
                 all_columns: list[str], names of all columns mentioned in the config.
@@ -128,7 +262,7 @@ class PostProcessing:
         invalid_columns = []
         # check for invalid columns
         for col in all_columns:
-            if col not in self.df.columns:
+            if col not in self.original_df.columns:
                 invalid_columns.append(col)
         if invalid_columns:
             raise KeyError("Could not find columns", invalid_columns)
@@ -149,11 +283,15 @@ class PostProcessing:
             if column_types.get(col):
 
                 conversion_type = self.convert_type_to_dtype(column_types[col], col)
+                # keep strings stored as categoricals
+                if (conversion_type == "object" and
+                        isinstance(self.original_df[col].dtype, pd.CategoricalDtype)):
+                    conversion_type = self.original_df[col].dtype
                 # skip type conversion if column is already the desired type
-                if conversion_type == self.df[col].dtype:
+                if col in self.df.columns and conversion_type == self.df[col].dtype:
                     continue
-                # otherwise apply type to column
-                self.df[col] = self.original_df[col].copy().astype(conversion_type)
+                # otherwise apply type to column (adding it if it is not being processed)
+                self.df[col] = self.original_df[col].astype(conversion_type)
 
             else:
                 raise KeyError("Could not find user-specified type for column", col)
@@ -201,11 +339,9 @@ class PostProcessing:
                 series_columns: list[str], names of series columns.
         """
 
-        sorting_columns = [x_axis["value"]]
-        if series_columns:
-            # NOTE: currently assuming there can only be one unique series column
-            sorting_columns.append(series_columns[0])
-        self.df.sort_values(sorting_columns, inplace=True, ignore_index=True)
+        sorting_columns = list(dict.fromkeys([x_axis["value"]] + series_columns))
+        # NOTE: the original row index is kept so that masks stay aligned with the original data
+        self.df.sort_values(sorting_columns, inplace=True)
 
     def filter_df(self, and_filters: 'list[list[str]]', or_filters: 'list[list[str]]',
                   series_filters: 'list[list[str]]'):
@@ -218,21 +354,62 @@ class PostProcessing:
                 series_filters: list[list[str]], function like or_filters but use series to select x-axis groups.
         """
 
-        mask = pd.Series(self.df.index.notnull())
-        # filter rows
-        if and_filters:
-            mask = reduce(op.and_, (self.row_filter(f, self.df) for f in and_filters))
-        if or_filters:
-            mask &= reduce(op.or_, (self.row_filter(f, self.df) for f in or_filters))
-        # apply series filters
-        if series_filters:
-            mask &= reduce(op.or_, (self.row_filter(f, self.df) for f in series_filters))
+        # reuse masks of unchanged conditions from previous runs
+        mask = self.filter_mask(self.df, and_filters, or_filters, series_filters, cache=self.mask_cache)
         # ensure not all rows are filtered away
         if self.df[mask].empty:
             raise pd.errors.EmptyDataError("Filtered dataframe is empty", self.df[mask].index)
 
         return mask
 
+    def filter_mask(self, df: pd.DataFrame, and_filters: 'list[list[str]]', or_filters: 'list[list[str]]',
+                    series_filters: 'list[list[str]]', cache: 'MaskCache | None' = None):
+        """
+            Return a mask for a given dataframe based on user-specified filter conditions.
+
+            Args:
+                df: pd.DataFrame, used to create a mask by having the filter conditions applied to it.
+                and_filters: list[list[str]], filter conditions to be concatenated together with logical AND.
+                or_filters: list[list[str]], filter conditions to be concatenated together with logical OR.
+                series_filters: list[list[str]], function like or_filters but use series to select x-axis groups.
+                cache: MaskCache | None, cache of condition masks for the (typed) original data.
+        """
+
+        start_time = time.perf_counter()
+        # interpret comparison values as column dtypes once for all conditions
+        conditions = compile_filters(df, and_filters, or_filters, series_filters)
+        mask = eval_filters(df, conditions, cache, self.df_version if cache is not None else None)
+
+        if self.debug:
+            elapsed = time.perf_counter() - start_time
+            print("Applied {0} filter conditions to {1} rows in {2:.3f}s ({3:.0f} rows/s)".format(
+                sum(len(c) for c in conditions), len(df), elapsed, len(df) / elapsed if elapsed else 0))
+            print("")
+
+        return mask
+
+    def perflog_filter(self, df: pd.DataFrame, config: ConfigHandler):
+        """
+            Return a mask for the dataframe of a single perflog based on the config filters.
+            Filter columns are interpreted as their user-specified types, and filter columns
+            missing from the perflog are treated as null.
+
+            Args:
+                df: pd.DataFrame, data read from one perflog.
+                config: ConfigHandler, class containing configuration information for plotting.
+        """
+
+        filters = config.get_filters()
+        filter_columns = list(dict.fromkeys(f[0] for filter_list in filters for f in filter_list))
+        typed_df = pd.DataFrame(index=df.index)
+        for col in filter_columns:
+            if not config.column_types.get(col):
+                raise KeyError("Could not find user-specified type for column", col)
+            typed_df[col] = (df[col] if col in df.columns else pd.Series(None, index=df.index, dtype=object)
+                             ).astype(self.convert_type_to_dtype(config.column_types[col], col))
+
+        return self.filter_mask(typed_df, *filters)
+
     def check_filtered_row_count(self, x_column: str, series_columns: 'list[str]', plot_columns: 'list[str]'):
         """
             Check that the filtered dataframe does not have an incompatible number of rows.
@@ -240,16 +417,14 @@ class PostProcessing:
 
             Args:
                 x_column: str, name of x-axis column.
-                series_columns: list[str], all names of series columns (including duplicates).
+                series_columns: list[str], names of series columns.
                 plot_columns: list[str], names of all columns needed for plotting.
         """
 
-        # get number of occurrences of each column
-        series_col_count = {c: series_columns.count(c) for c in series_columns}
-        # get number of column combinations
-        series_combinations = reduce(op.mul, list(series_col_count.values()), 1)
-        num_filtered_rows = len(self.df[self.mask])
-        num_x_data_points = series_combinations * len(set(self.df[self.mask][x_column]))
+        num_filtered_rows = int(self.mask.sum())
+        # count distinct x-axis values of all series in one pass
+        num_x_data_points = len(self.df.loc[self.mask, list(dict.fromkeys([x_column] + series_columns))]
+                                .drop_duplicates())
         # check expected number of rows
         if num_filtered_rows > num_x_data_points:
             raise RuntimeError(
@@ -257,7 +432,8 @@ class PostProcessing:
                 .format(num_filtered_rows, num_x_data_points), self.df[self.mask][plot_columns])
 
     def transform_df_data(self, x_column: str, y_column: str, scaling_column: dict,
-                          scaling_custom: 'float | list[float]', series_filters: 'list[list[str]]'):
+                          scaling_custom: 'float | list[float]', series_filters: 'list[list[str]]',
+                          statistic: 'str | None' = None):
         """
             Transform dataframe y-axis based on scaling settings.
 
@@ -267,13 +443,9 @@ class PostProcessing:
                 scaling_column: dict, name of scaling column, series index, and x-value information.
                 scaling_custom: float | list[float], custom value to scale by.
                 series_filters: list[list[str]], x-axis group filters.
+                statistic: str | None, aggregation statistic used to combine repeated scaling values.
         """
 
-        scaling_column_name = None
-        scaling_value = None
-        scaling_series_mask = None
-        scaling_x_value_mask = None
-
         if scaling_column or scaling_custom:
             # pre-convert numeric scaled column to float to avoid type issues
             if pd.api.types.is_numeric_dtype(self.df[y_column].dtype):
@@ -287,33 +459,24 @@ class PostProcessing:
             except ValueError as e:
                 e.args = (e.args[0] + " as a scaling value for column '{0}'".format(y_column),)
                 raise
+            # NOTE: a list of custom values is divided into each series by position
+            if len(scaling_value) > 1 and series_filters:
+                series_columns = list(dict.fromkeys(f[0] for f in series_filters))
+                # positions of the filtered rows of each series (found in one pass)
+                series_positions = self.df[self.mask].groupby(
+                    series_columns, sort=False, observed=True).indices.values()
+                row_values = np.full(int(self.mask.sum()), np.nan)
+                for positions in series_positions:
+                    row_values[positions] = scaling_value.values
+                self.transform_axis(self.mask, y_column, row_values)
+            else:
+                self.transform_axis(self.mask, y_column, (scaling_value.iloc[0] if len(scaling_value) == 1
+                                                          else scaling_value.values))
 
         # scale by column
         elif scaling_column:
-            # copy scaling column (prevents issues when scaling a column by itself)
-            scaling_column_name = scaling_column.get("name")
-            scaling_value = self.df[scaling_column_name].copy()
-            # get mask of scaling series
-            if scaling_column.get("series") is not None:
-                scaling_series_mask = self.row_filter(series_filters[scaling_column.get("series")], self.df)
-            # get mask of scaling x-value
-            if scaling_column.get("x_value"):
-                scaling_x_value_mask = (self.df[x_column] == scaling_column.get("x_value"))
-
-        # apply scaling
-        if scaling_value is not None:
-            # apply data transformation per series
-            if series_filters:
-                for f in series_filters:
-                    s = self.row_filter(f, self.df)
-                    self.transform_axis(
-                        self.mask & s, y_column, scaling_value, scaling_series_mask,
-                        scaling_x_value_mask, scaling_column_name, scaling_custom)
-            # apply data transformation to all data
-            else:
-                self.transform_axis(
-                    self.mask, y_column, scaling_value, scaling_series_mask,
-                    scaling_x_value_mask, scaling_column_name, scaling_custom)
+            scaling_value = self.get_scaling_values(x_column, y_column, scaling_column, series_filters, statistic)
+            self.transform_axis(self.mask, y_column, scaling_value.values)
 
         # FIXME (issue #253): add this as a config option at some point
         # if y_axis.get("drop_nan"):
@@ -321,6 +484,71 @@ class PostProcessing:
             # reset index
         #    df.index = range(len(df.index))
 
+    def aggregate_df(self, x_column: str, y_column: str, series_columns: 'list[str]',
+                     columns: 'list[str]', aggregation: dict):
+        """
+            Replace the filtered dataframe with one row per x-axis value per series, containing
+            statistics of the y-axis values of repeated runs. Return the names of the added
+            statistic and error bar columns.
+
+            Args:
+                x_column: str, name of x-axis column.
+                y_column: str, name of y-axis column.
+                series_columns: list[str], names of series columns.
+                columns: list[str], names of other columns to keep (the first value of each group).
+                aggregation: dict, aggregation statistic and error bar information.
+        """
+
+        df = self.df[self.mask]
+        self.df, stat_columns = aggregate(
+            df, [x_column] + series_columns, y_column, aggregation["statistic"],
+            aggregation.get("error"), [c for c in columns if c in df.columns])
+        self.mask = pd.Series(True, index=self.df.index)
+        if self.debug:
+            print("Aggregated {0} filtered rows to {1} rows".format(len(df), len(self.df)))
+        return stat_columns
+
+    def analyse_df_scaling(self, x_column: str, y_axis: dict, series_columns: 'list[str]',
+                           scaling_analysis: dict):
+        """
+            Add the speed-up, parallel efficiency, and serial fraction of each filtered run
+            (with their ideal values and the runs flagged for low efficiency) to the dataframe.
+            Return a tuple containing the y-axis information of the plotted scaling metric
+            and the names of the added columns.
+
+            Args:
+                x_column: str, name of x-axis column.
+                y_axis: dict, y-axis column and units.
+                series_columns: list[str], names of series columns.
+                scaling_analysis: dict, scaling analysis type, plotted metric, and other settings.
+        """
+
+        df = self.df[self.mask]
+        resource_column = find_resource_column(df, x_column, scaling_analysis.get("resource_column"))
+        # check whether y-axis values are times or rates
+        lower_is_better = scaling_analysis.get("lower_is_better")
+        if lower_is_better is None:
+            units = (y_axis["units"].get("custom") if not y_axis["units"].get("column")
+                     else next(iter(df[y_axis["units"]["column"]].dropna()), None))
+            lower_is_better = is_lower_better(units)
+
+        analysis_df = analyse_scaling(
+            df, resource_column, y_axis["value"], series_columns, scaling_analysis["type"] == "weak",
+            lower_is_better, scaling_analysis.get("efficiency_threshold", EFFICIENCY_THRESHOLD))
+        for col in analysis_df.columns:
+            self.df[col] = analysis_df[col]
+
+        if self.debug:
+            print("Scaling analysis of {0} by {1} ({2} is better):".format(
+                y_axis["value"], resource_column, "lower" if lower_is_better else "higher"))
+            print(analysis_df)
+
+        metric = scaling_analysis.get("metric", "efficiency")
+        # plot scaling metric on the same scale as the y-axis values
+        return ({"value": metric, "units": {"custom": None}, "range": {"min": None, "max": None},
+                 "logarithmic": y_axis.get("logarithmic")},
+                analysis_df.columns.tolist())
+
     def val_as_col_dtype(self, value, column: str):
         """
             Return a pandas series that interprets a given value as the dtype of a specified column.
@@ -342,14 +570,7 @@ class PostProcessing:
         return pd.Series(value, dtype=dtype)
 
     # operator lookup dictionary
-    op_lookup = {
-        "==":   op.eq,
-        "!=":   op.ne,
-        "<":    op.lt,
-        ">":    op.gt,
-        "<=":   op.le,
-        ">=":   op.ge
-    }
+    op_lookup = OPERATORS
 
     def row_filter(self, filter: 'list[str]', df: pd.DataFrame):
         """
@@ -361,26 +582,10 @@ class PostProcessing:
                 df: pd.DataFrame, used to create a mask by having the filter condition applied to it.
         """
 
-        column, str_op, value = filter
         if self.debug:
-            print("Applying row filter condition:", column, str_op, value)
+            print("Applying row filter condition:", *filter)
 
-        # check operator validity
-        operator = self.op_lookup.get(str_op)
-        if operator is None:
-            raise KeyError("Unknown comparison operator", str_op)
-
-        # evaluate expression and extract dataframe mask
-        if value is None:
-            mask = df[column].isnull() if operator == op.eq else df[column].notnull()
-        else:
-            try:
-                # interpret comparison value as column dtype
-                value = self.val_as_col_dtype(value, column).iloc[0]
-                mask = operator(df[column], value)
-            except TypeError or ValueError as e:
-                e.args = (e.args[0] + " for column '{0}' and value '{1}'".format(column, value),)
-                raise
+        mask = eval_filters(df, compile_filters(df, [filter], [], []))
 
         if self.debug:
             print(mask)
@@ -388,52 +593,75 @@ class PostProcessing:
 
         return mask
 
-    def transform_axis(self, mask: 'pd.Series[bool]', axis_column: str, scaling_value: pd.Series,
-                       scaling_series_mask: 'pd.Series[bool]', scaling_x_value_mask: 'pd.Series[bool]',
-                       scaling_column_name: str, scaling_custom: 'float | list[float]'):
+    def get_scaling_values(self, x_column: str, y_column: str, scaling_column: dict,
+                           series_filters: 'list[list[str]]', statistic: 'str | None' = None):
+        """
+            Return the values to scale each filtered row of the y-axis by, found with a join on
+            series and x-axis values. Each row is scaled by the scaling column value in its own
+            series (or the selected scaling series) at its own x-axis value (or the selected x-axis value).
+
+            Args:
+                x_column: str, name of x-axis column.
+                y_column: str, name of y-axis column.
+                scaling_column: dict, name of scaling column, series index, and x-value information.
+                series_filters: list[list[str]], x-axis group filters.
+                statistic: str | None, aggregation statistic used to combine the scaling values
+                    of repeated runs (scaling values must otherwise be unique).
+        """
+
+        df = self.df[self.mask]
+        scaling_column_name = scaling_column.get("name")
+        series_index = scaling_column.get("series")
+        x_value = scaling_column.get("x_value")
+
+        # check types
+        if (not pd.api.types.is_float_dtype(df[y_column].dtype) or
+            not pd.api.types.is_numeric_dtype(df[scaling_column_name].dtype)):
+            # scaled column must be float to avoid casting issues and scaling column must be numeric
+            raise TypeError("{0} {1}".format(
+                "Cannot scale column '{0}' of type {1} by column '{2}' of type {3}."
+                .format(y_column, df[y_column].dtype, scaling_column_name, df[scaling_column_name].dtype),
+                "Scaled and scaling column must both be numeric."))
+
+        # scale each row by its own scaling value
+        if series_index is None and x_value is None:
+            return df[scaling_column_name]
+
+        key_columns = list(dict.fromkeys([f[0] for f in series_filters] + [x_column]))
+        # look-up table of scaling values by series and x-axis value
+        baseline = df.set_index(key_columns)[scaling_column_name]
+        if not baseline.index.is_unique and statistic:
+            # scale repeated runs by the aggregated scaling value
+            baseline = group_statistic(
+                baseline.groupby(level=list(range(len(key_columns))), sort=False, dropna=False), statistic)
+        elif not baseline.index.is_unique:
+            raise RuntimeError("Scaling values are not unique for each x-axis value per series",
+                               df[key_columns + [scaling_column_name]])
+
+        # find the series and x-axis value of the scaling value of each row
+        keys = df[key_columns].copy()
+        if series_index is not None:
+            _, _, series_value = compile_condition(series_filters[series_index], df)
+            keys[series_filters[series_index][0]] = series_value
+        if x_value is not None:
+            _, _, x_value = compile_condition([x_column, "==", x_value], df)
+            keys[x_column] = x_value
+
+        keys = (pd.MultiIndex.from_frame(keys) if len(key_columns) > 1
+                else pd.Index(keys[x_column]))
+        return pd.Series(baseline.reindex(keys).values, index=df.index)
+
+    def transform_axis(self, mask: 'pd.Series[bool]', axis_column: str, scaling_value):
         """
             Divide axis values by specified values and reflect this change in the dataframe.
 
             Args:
                 mask: pd.Series[bool], dataframe filters.
                 axis_column: str, name of axis column to scale.
-                scaling_value: pd.Series, copy of column containing values to scale by.
-                scaling_series_mask: pd.Series[bool], a series mask to be applied to the scaling column.
-                scaling_x_value_mask: pd.Series[bool], an x-axis value mask to be applied to the scaling column.
-                scaling_column_name: str, name of scaling column.
-                scaling_custom: float | list[float], custom value to scale by.
+                scaling_value: a value or an array of values (one per masked row) to scale by.
         """
 
-        # prepare custom values
-        if scaling_custom:
-            scaling_value = scaling_value.iloc[0] if len(scaling_value) == 1 else scaling_value.values
-
-        # prepare column values
-        elif scaling_column_name:
-
-            # check types
-            if (not pd.api.types.is_float_dtype(self.df[mask][axis_column].dtype) or
-                not pd.api.types.is_numeric_dtype(scaling_value.dtype)):
-                # scaled column must be float to avoid casting issues and scaling column must be numeric
-                raise TypeError("{0} {1}".format(
-                    "Cannot scale column '{0}' of type {1} by column '{2}' of type {3}."
-                    .format(axis_column, self.df[mask][axis_column].dtype,
-                            scaling_column_name, scaling_value.dtype),
-                    "Scaled and scaling column must both be numeric."))
-
-            # get mask of scaling values
-            scaling_mask = mask.copy()
-            if scaling_series_mask is not None:
-                scaling_mask = scaling_series_mask
-            if scaling_x_value_mask is not None:
-                scaling_mask &= scaling_x_value_mask
-
-            scaling_value = (scaling_value[scaling_mask].iloc[0]
-                             if len(scaling_value[scaling_mask]) == 1
-                             else scaling_value[scaling_mask].values)
-
-        # apply scaling
-        self.df.loc[mask, axis_column] = self.df[mask][axis_column].values / scaling_value
+        self.df.loc[mask, axis_column] = self.df.loc[mask, axis_column].values / scaling_value
         # FIXME (issue #253): add this as a config option at some point in conjunction with dropping NaNs
         # df[axis_column].replace(to_replace=1, value=np.NaN, inplace=True)
 
@@ -458,21 +686,90 @@ def read_args():
     parser.add_argument("-s", "--save_data", type=str,
                         help="state in which to save perflog data to a csv file (default is no data saved); \
                             options: ['original', 'filtered', 'transformed']")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of processes used to parse perflogs in parallel (default is 1)")
+    parser.add_argument("-c", "--cache_path", type=Path,
+                        help="path to a directory for caching parsed perflogs between runs \
+                            (default is no caching)")
+    parser.add_argument("-p", "--project", action="store_true",
+                        help="only load the columns used in the config and the rows that pass its filters")
+    parser.add_argument("--full_search", action="store_true",
+                        help="also search for perflogs below <system>/<partition> directories that contain perflogs")
+    parser.add_argument("--no_categorical", action="store_true",
+                        help="store all string columns as python objects rather than pandas categoricals")
+    parser.add_argument("--profile", type=str, nargs="?", const="",
+                        help="print the time, rows, and peak memory of each stage, \
+                            and optionally save them to a JSON file at the given path")
+    parser.add_argument("--profile_memory", action="store_true",
+                        help="also trace the peak memory allocated during each stage when profiling \
+                            (slows down most stages)")
+    parser.add_argument("--webgl", action="store_true",
+                        help="draw the plot with WebGL, which keeps dense plots interactive")
+    parser.add_argument("--sidecar", action="store_true",
+                        help="save the plot data to a JSON file next to the plot HTML file, \
+                            which loads it when opened (the files must be served over HTTP)")
     parser.add_argument("-d", "--debug", action="store_true",
                         help="debug flag for printing additional information")
 
     return parser.parse_args()
 
 
+def with_position_index(df: pd.DataFrame):
+    """
+        Return a dataframe indexed by row position (0 to n-1), as cached filter masks are
+        stored and looked up by row position. Dataframes already indexed by row position
+        (e.g. read by PerflogHandler) are returned unchanged.
+
+        Args:
+            df: pd.DataFrame, perflog data.
+    """
+
+    if df.index.equals(pd.RangeIndex(len(df))):
+        return df
+    return df.reset_index(drop=True)
+
+
+def enable_copy_on_write():
+    """
+        Enable pandas copy-on-write (the default from pandas 3.0), so that processed dataframes
+        share the columns of the original data until they are modified. The option applies to
+        all pandas code in the process, so it is only enabled by command line entry points.
+    """
+
+    if int(pd.__version__.split(".")[0]) < 3:
+        pd.set_option("mode.copy_on_write", True)
+
+
+def is_copy_on_write():
+    """
+        Return True if pandas copy-on-write is enabled.
+    """
+
+    return int(pd.__version__.split(".")[0]) >= 3 or pd.get_option("mode.copy_on_write") is True
+
+
 def main():
 
     args = read_args()
+    # share unmodified columns between the original and processed data
+    enable_copy_on_write()
 
     try:
-        post = PostProcessing(args.log_path, args.output_path, args.save_data, args.debug)
         config = ConfigHandler.from_path(args.config_path)
+        profiler = Profiler(args.profile is not None, args.profile_memory)
+        post = PostProcessing(args.log_path, args.output_path, args.save_data, save_plot=True,
+                              debug=args.debug, workers=args.jobs, cache_path=args.cache_path,
+                              config=config if args.project else None,
+                              categorical=not args.no_categorical, profiler=profiler,
+                              webgl=args.webgl, sidecar=args.sidecar, full_search=args.full_search)
         post.run_post_processing(config)
 
+        if args.profile is not None:
+            profiler.print_table()
+            if args.profile:
+                profiler.save_json(args.profile)
+                print("Saved profile to {0}".format(args.profile))
+
     except Exception as e:
         print(type(e).__name__ + ":", e)
         print("Post-processing stopped")
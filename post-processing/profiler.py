@@ -0,0 +1,135 @@
+import json
+import resource
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import pandas as pd
+
+# profile table columns (stage name, wall time, rows in and out, and peak memory)
+PROFILE_COLUMNS = ["stage", "time", "rows_in", "rows_out", "peak_rss_mb", "peak_alloc_mb"]
+
+
+class Profiler:
+
+    def __init__(self, enabled=False, trace_memory=False):
+        """
+            Initialise class.
+
+            Args:
+                enabled: bool, flag to record stages (stages are not recorded if disabled).
+                trace_memory: bool, flag to trace the peak memory allocated during each stage
+                    with tracemalloc (slows down most stages).
+        """
+
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        # one record per stage, in order of first run
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name: str, rows_in: 'int | None' = None):
+        """
+            Record the wall time, number of rows, and peak memory of a stage. Yield a dictionary
+            in which the number of rows output by the stage can be set (as "rows_out").
+            Stages must not be nested.
+
+            Args:
+                name: str, stage name. Records of previous runs of the stage are replaced.
+                rows_in: int | None, number of rows input to the stage.
+        """
+
+        record = {"rows_out": None}
+        if not self.enabled:
+            yield record
+            return
+
+        # only trace allocations during the stage (tracing slows down everything else)
+        started_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start_time = time.perf_counter()
+
+        try:
+            yield record
+            elapsed = time.perf_counter() - start_time
+            # allocated memory above the memory in use at the start of the stage
+            peak_alloc_mb = (tracemalloc.get_traced_memory()[1] - start_memory) / 2**20 if self.trace_memory else None
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+
+        self.record(name, elapsed, rows_in, record["rows_out"], peak_alloc_mb)
+
+    def record(self, name: str, elapsed: float, rows_in: 'int | None' = None, rows_out: 'int | None' = None,
+               peak_alloc_mb: 'float | None' = None):
+        """
+            Record a stage timed elsewhere (e.g. summed over perflogs parsed in worker processes).
+
+            Args:
+                name: str, stage name. Records of previous runs of the stage are replaced.
+                elapsed: float, time taken by the stage (in seconds).
+                rows_in: int | None, number of rows input to the stage.
+                rows_out: int | None, number of rows output by the stage.
+                peak_alloc_mb: float | None, peak memory allocated during the stage (in MB).
+        """
+
+        if not self.enabled:
+            return
+        record = {"stage": name, "time": elapsed, "rows_in": rows_in, "rows_out": rows_out,
+                  "peak_rss_mb": get_peak_rss(), "peak_alloc_mb": peak_alloc_mb}
+        for i, r in enumerate(self.stages):
+            if r["stage"] == name:
+                self.stages[i] = record
+                return
+        self.stages.append(record)
+
+    def clear(self, names: 'list[str] | None' = None):
+        """
+            Remove stage records.
+
+            Args:
+                names: list[str] | None, names of stages to remove (default is all stages).
+        """
+        self.stages = [r for r in self.stages if names is not None and r["stage"] not in names]
+
+    def to_df(self):
+        """
+            Return a dataframe with one row per recorded stage.
+        """
+        return pd.DataFrame(self.stages, columns=PROFILE_COLUMNS)
+
+    def print_table(self):
+        """
+            Print the recorded stages as a table.
+        """
+
+        df = self.to_df()
+        if not self.trace_memory:
+            df = df.drop(columns="peak_alloc_mb")
+        # rows are counted for most stages only
+        for col in ["rows_in", "rows_out"]:
+            df[col] = df[col].map(lambda v: "-" if v is None or pd.isna(v) else str(int(v)))
+        print(df.to_string(index=False, na_rep="-", float_format="{0:.3f}".format))
+
+    def save_json(self, path):
+        """
+            Save the recorded stages to a JSON file.
+
+            Args:
+                path: Path, path to JSON file.
+        """
+
+        with open(path, "w") as file:
+            json.dump({"stages": self.stages}, file, indent=2)
+
+
+def get_peak_rss():
+    """
+        Return the peak resident memory of the process so far (in MB).
+    """
+    # NOTE: ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
@@ -0,0 +1,265 @@
+import argparse
+import json
+import sys
+import traceback
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from perflog_handler import DISPLAY_NAME_PARAM_REGEX, PerflogHandler, is_lower_better
+
+# columns identifying the runs of the same benchmark (in addition to test parameters)
+KEY_COLUMNS = ["system", "partition", "environ", "spack_spec"]
+# scale factor making the median absolute deviation a consistent estimator of the standard deviation
+MAD_SCALE = 1.4826
+# exit codes of the regressions command
+EXIT_REGRESSIONS = 1
+EXIT_ERROR = 2
+
+
+def get_param_columns(df: pd.DataFrame):
+    """
+        Return the names of the test parameter columns of a perflog dataframe. Parameters
+        are recovered from the check info field (display name, hash, system, partition,
+        and environment), as the display name is replaced by parameter columns when read.
+
+        Args:
+            df: pd.DataFrame, perflog data.
+    """
+
+    if "info" not in df.columns:
+        return []
+    # parse each distinct check info only once
+    info = pd.Series(df["info"].dropna().unique(), dtype=object)
+    keys = info.str.extractall(DISPLAY_NAME_PARAM_REGEX)["key"] if len(info) else []
+    return [k for k in pd.unique(pd.Series(keys, dtype=object)) if k in df.columns]
+
+
+def get_metrics(df: pd.DataFrame):
+    """
+        Return the names of all performance variables in a perflog dataframe.
+
+        Args:
+            df: pd.DataFrame, perflog data.
+    """
+    return [c[:-len("_value")] for c in df.columns if c.endswith("_value")]
+
+
+def find_regressions(df: pd.DataFrame, metrics: 'list[str] | None' = None, baseline_runs=10,
+                     latest_runs=1, min_baseline_runs=3, threshold=3.0, min_change=0.05,
+                     lower_is_better: 'list[str] | None' = None, higher_is_better: 'list[str] | None' = None):
+    """
+        Return a tuple containing a list of regressions and the number of checked series.
+        A series contains the runs of one performance variable of one test with the same
+        parameters, system, partition, environment, and spack spec.
+
+        The median of the latest runs of a series is compared with the median of the runs
+        before them (the baseline window). A series has regressed if the latest median is worse
+        by more than a threshold number of robust standard deviations (the scaled median absolute
+        deviation of the baseline window) and by more than a minimum relative change.
+
+        Args:
+            df: pd.DataFrame, perflog data.
+            metrics: list[str] | None, names of performance variables to check (default is all).
+            baseline_runs: int, maximum number of runs in the baseline window.
+            latest_runs: int, number of latest runs compared with the baseline window.
+            min_baseline_runs: int, minimum number of baseline runs needed to check a series.
+            threshold: float, minimum number of robust standard deviations of a regression.
+            min_change: float, minimum relative change of a regression (e.g. 0.05 for 5%).
+            lower_is_better: list[str] | None, performance variables for which lower values are better.
+            higher_is_better: list[str] | None, performance variables for which higher values are better.
+                By default, lower values are only better for variables with time units.
+    """
+
+    param_columns = get_param_columns(df)
+    key_columns = ["test_name"] + param_columns + [c for c in KEY_COLUMNS if c in df.columns]
+    times = df["job_completion_time"]
+    if isinstance(times.dtype, pd.CategoricalDtype):
+        times = times.astype(object)
+    times = pd.to_datetime(times, utc=True, errors="coerce", format="ISO8601")
+
+    regressions = []
+    num_series = 0
+    for metric in metrics or get_metrics(df):
+        value_column = "{0}_value".format(metric)
+        unit_column = "{0}_unit".format(metric)
+        if value_column not in df.columns:
+            raise KeyError("Performance variable not found in perflogs", metric)
+
+        data = df[key_columns + ([unit_column] if unit_column in df.columns else [])].copy()
+        data["time"] = times
+        data["value"] = pd.to_numeric(df[value_column], errors="coerce")
+        data = data.dropna(subset=["time", "value"]).sort_values("time", kind="stable")
+
+        # number the runs of each series from the latest (runs in different units are not compared)
+        series = data.groupby(data.columns[:-2].tolist(), sort=False, observed=True, dropna=False)
+        data["series"] = series.ngroup()
+        data["run"] = series.cumcount(ascending=False)
+        num_series += series.ngroups
+
+        latest = data[data["run"] < latest_runs].groupby("series")
+        baseline_data = data[(data["run"] >= latest_runs) & (data["run"] < latest_runs + baseline_runs)]
+        baseline = baseline_data.groupby("series")["value"]
+        baseline_median = baseline.median()
+        # median absolute deviation from the baseline median
+        mad = ((baseline_data["value"] - baseline_data["series"].map(baseline_median)).abs()
+               .groupby(baseline_data["series"]).median())
+
+        stats = pd.DataFrame({"baseline_runs": baseline.count(), "baseline_median": baseline_median,
+                              "baseline_mad": mad})
+        stats = stats[stats["baseline_runs"] >= min_baseline_runs].join(
+            latest.agg(latest_runs=("value", "count"), latest_median=("value", "median"),
+                       latest_time=("time", "max")), how="inner")
+        if stats.empty:
+            continue
+        # key values of each series
+        stats = stats.join(latest.first()[data.columns[:-4]])
+
+        # worse values are higher when lower values are better
+        lower = (np.full(len(stats), True) if metric in (lower_is_better or [])
+                 else np.full(len(stats), False) if metric in (higher_is_better or [])
+                 else stats[unit_column].map(is_lower_better).to_numpy(dtype=bool) if unit_column in stats
+                 else np.full(len(stats), False))
+        sign = np.where(lower, 1.0, -1.0)
+        difference = sign * (stats["latest_median"] - stats["baseline_median"])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            stats["change"] = difference / stats["baseline_median"].abs()
+            stats["score"] = difference / (MAD_SCALE * stats["baseline_mad"])
+        # any worse value is significant if the baseline does not vary
+        stats.loc[(stats["baseline_mad"] == 0) & (difference > 0), "score"] = np.inf
+        stats.loc[(stats["baseline_mad"] == 0) & (difference <= 0), "score"] = 0.0
+        stats["lower_is_better"] = lower
+
+        regressed = stats[(stats["score"] >= threshold) & (stats["change"] >= min_change)]
+        regressions.extend(to_report(regressed, metric, key_columns, param_columns, unit_column))
+
+    # most severe regressions first
+    regressions.sort(key=lambda r: r["change"], reverse=True)
+    return regressions, num_series
+
+
+def to_report(stats: pd.DataFrame, metric: str, key_columns: 'list[str]', param_columns: 'list[str]',
+              unit_column: str):
+    """
+        Return a list of JSON serialisable regression dictionaries.
+
+        Args:
+            stats: pd.DataFrame, key values and statistics of regressed series.
+            metric: str, name of performance variable.
+            key_columns: list[str], names of columns identifying a series.
+            param_columns: list[str], names of test parameter columns (reported together).
+            unit_column: str, name of performance variable unit column.
+    """
+
+    def to_json(value):
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return None
+        if isinstance(value, pd.Timestamp):
+            return value.isoformat()
+        return value.item() if isinstance(value, np.generic) else value
+
+    report = []
+    for _, row in stats.iterrows():
+        report.append({
+            **{c: to_json(row[c]) for c in key_columns if c not in param_columns},
+            # parameters that a test does not have are left out
+            "params": {c: to_json(row[c]) for c in param_columns if to_json(row[c]) is not None},
+            "metric": metric,
+            "unit": to_json(row[unit_column]) if unit_column in row else None,
+            "lower_is_better": bool(row["lower_is_better"]),
+            "baseline_runs": int(row["baseline_runs"]),
+            "baseline_median": to_json(row["baseline_median"]),
+            "baseline_mad": to_json(row["baseline_mad"]),
+            "latest_runs": int(row["latest_runs"]),
+            "latest_median": to_json(row["latest_median"]),
+            "latest_time": to_json(row["latest_time"]),
+            "change": to_json(row["change"]),
+            # infinite scores (constant baselines) are not valid JSON
+            "score": to_json(row["score"]) if np.isfinite(row["score"]) else None})
+    return report
+
+
+def read_args():
+    """
+        Return parsed command line arguments.
+    """
+
+    parser = argparse.ArgumentParser(
+        description="Find benchmarks whose latest results are worse than their previous results. \
+            Exits with status 1 if regressions are found (and 2 if the check fails).")
+
+    # required positional arguments
+    parser.add_argument("log_path", type=Path,
+                        help="path to a perflog file or a directory containing perflog files")
+
+    # optional arguments
+    parser.add_argument("-o", "--output_path", type=Path,
+                        help="path to a JSON file for storing the regression report \
+                            (use - to print the report instead of a summary)")
+    parser.add_argument("-m", "--metrics", nargs="+",
+                        help="names of performance variables to check (default is all)")
+    parser.add_argument("-b", "--baseline_runs", type=int, default=10,
+                        help="maximum number of runs before the latest runs in the baseline window \
+                            (default is 10)")
+    parser.add_argument("-l", "--latest_runs", type=int, default=1,
+                        help="number of latest runs compared with the baseline window (default is 1)")
+    parser.add_argument("--min_baseline_runs", type=int, default=3,
+                        help="minimum number of baseline runs needed to check a benchmark (default is 3)")
+    parser.add_argument("-t", "--threshold", type=float, default=3.0,
+                        help="minimum number of robust standard deviations of a regression (default is 3)")
+    parser.add_argument("--min_change", type=float, default=0.05,
+                        help="minimum relative change of a regression (default is 0.05)")
+    parser.add_argument("--lower_is_better", nargs="+",
+                        help="performance variables for which lower values are better \
+                            (default is variables with time units)")
+    parser.add_argument("--higher_is_better", nargs="+",
+                        help="performance variables for which higher values are better")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="number of processes used to parse perflogs in parallel (default is 1)")
+    parser.add_argument("-c", "--cache_path", type=Path,
+                        help="path to a directory for caching parsed perflogs between runs \
+                            (default is no caching)")
+    parser.add_argument("-d", "--debug", action="store_true",
+                        help="debug flag for printing additional information")
+
+    return parser.parse_args()
+
+
+def main():
+
+    args = read_args()
+
+    try:
+        df = PerflogHandler(args.log_path, args.debug, args.jobs, args.cache_path).get_df()
+        regressions, num_series = find_regressions(
+            df, args.metrics, args.baseline_runs, args.latest_runs, args.min_baseline_runs,
+            args.threshold, args.min_change, args.lower_is_better, args.higher_is_better)
+
+        report = json.dumps({"series_checked": num_series, "regressions": regressions}, indent=2)
+        if str(args.output_path) == "-":
+            print(report)
+        else:
+            if args.output_path:
+                with open(args.output_path, "w") as file:
+                    file.write(report)
+            for r in regressions:
+                print("Regression in {0} {1} on {2}:{3}: {4:.4g} -> {5:.4g} {6}({7:.1%} worse)".format(
+                    "".join([r["test_name"]] + [" %{0}={1}".format(k, v) for k, v in r["params"].items()]),
+                    r["metric"], r.get("system"), r.get("partition"),
+                    r["baseline_median"], r["latest_median"], r["unit"] + " " if r["unit"] else "",
+                    r["change"]))
+            print("Checked {0} series, found {1} regressions".format(num_series, len(regressions)))
+
+    except Exception as e:
+        print(type(e).__name__ + ":", e)
+        print("Regression check stopped")
+        if args.debug:
+            print(traceback.format_exc())
+        sys.exit(EXIT_ERROR)
+
+    if regressions:
+        sys.exit(EXIT_REGRESSIONS)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# scaling metrics that can be plotted
+SCALING_METRICS = ["speedup", "efficiency", "serial_fraction"]
+# scaling analysis types
+SCALING_TYPES = ["strong", "weak"]
+# columns searched (in order) for resources if the x-axis is not numeric
+RESOURCE_COLUMNS = ["num_nodes", "nodes", "num_tasks", "tasks"]
+# default parallel efficiency below which scaling is flagged
+EFFICIENCY_THRESHOLD = 0.8
+
+
+def find_resource_column(df: pd.DataFrame, x_column: str, resource_column: 'str | None' = None):
+    """
+        Return the name of the column containing the resources (e.g. nodes or tasks) of each run.
+        Unless specified, this is the x-axis column if it is numeric, or otherwise the first
+        numeric column out of num_nodes, nodes, num_tasks, and tasks.
+
+        Args:
+            df: pd.DataFrame, data to analyse.
+            x_column: str, name of x-axis column.
+            resource_column: str | None, name of resource column (detected if None).
+    """
+
+    if resource_column:
+        return resource_column
+    for col in [x_column] + RESOURCE_COLUMNS:
+        # resources may be stored as strings (e.g. test parameters)
+        if col in df.columns and pd.to_numeric(df[col], errors="coerce").notnull().all():
+            return col
+    raise RuntimeError("Could not detect a numeric resource column for scaling analysis "
+                       "(specify a resource_column)", [x_column] + RESOURCE_COLUMNS)
+
+
+def analyse_scaling(df: pd.DataFrame, resource_column: str, y_column: str, series_columns: 'list[str]',
+                    weak=False, lower_is_better=True, efficiency_threshold=EFFICIENCY_THRESHOLD):
+    """
+        Return a dataframe containing the speed-up, parallel efficiency, and Karp-Flatt serial
+        fraction of each run relative to the run with the fewest resources in its series,
+        the ideal value of each metric, and the metric values of the first run of each series
+        with an efficiency below a threshold (NaN for all other runs). Series without any
+        resource values have no reference run, so their metrics are NaN (with a warning).
+
+        Args:
+            df: pd.DataFrame, data to analyse (one run per resource count per series).
+            resource_column: str, name of column containing resources (e.g. nodes or tasks).
+            y_column: str, name of column containing performance (a time or a rate).
+            series_columns: list[str], names of series columns.
+            weak: bool, flag to analyse weak scaling (the problem size grows with the resources)
+                rather than strong scaling (the problem size is fixed).
+            lower_is_better: bool, flag to signify that performance is a time (lower is better)
+                rather than a total rate (higher is better).
+            efficiency_threshold: float, efficiency below which scaling is flagged.
+    """
+
+    resources = pd.to_numeric(df[resource_column], errors="coerce").astype(float)
+    values = pd.to_numeric(df[y_column], errors="coerce").astype(float)
+    groups = [df[c] for c in dict.fromkeys(series_columns)] or np.zeros(len(df))
+
+    # series without resource values have no reference run
+    valid = resources.groupby(groups, sort=False, observed=True, dropna=False).transform("count") > 0
+    if not valid.all():
+        warnings.warn("Skipped scaling analysis of {0} rows in series without '{1}' values."
+                      .format((~valid).sum(), resource_column))
+    valid_groups = [g[valid] for g in groups] if series_columns else np.zeros(valid.sum())
+
+    # reference run of each series (fewest resources)
+    base_index = resources[valid].groupby(valid_groups, sort=False, observed=True,
+                                          dropna=False).transform("idxmin")
+    base_values = pd.Series(values.loc[base_index].to_numpy(), index=base_index.index).reindex(df.index)
+    base_resources = pd.Series(resources.loc[base_index].to_numpy(), index=base_index.index).reindex(df.index)
+    relative_resources = resources / base_resources
+    relative_performance = base_values / values if lower_is_better else values / base_values
+
+    # weak scaling keeps the work per resource fixed, so ideal times do not change
+    # NOTE: rates are assumed to be totals, so ideal rates grow with the resources in both cases
+    efficiency = (relative_performance if weak and lower_is_better
+                  else relative_performance / relative_resources)
+    speedup = efficiency * relative_resources
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Karp-Flatt metric (undefined for the reference run)
+        serial_fraction = (1 / speedup - 1 / relative_resources) / (1 - 1 / relative_resources)
+    serial_fraction[relative_resources == 1] = np.nan
+
+    result = pd.DataFrame({"speedup": speedup, "efficiency": efficiency, "serial_fraction": serial_fraction,
+                           "ideal_speedup": relative_resources, "ideal_efficiency": 1.0,
+                           "ideal_serial_fraction": 0.0}, index=df.index)
+
+    # first run of each series (in resource order) with an efficiency below the threshold
+    below = result.index[(efficiency < efficiency_threshold).to_numpy()]
+    first_below = resources.loc[below].groupby(
+        [g.loc[below] for g in groups] if series_columns else np.zeros(len(below)),
+        sort=False, observed=True, dropna=False).idxmin()
+    for metric in SCALING_METRICS:
+        result["{0}_limit".format(metric)] = result[metric].where(result.index.isin(first_below.values))
+
+    return result
@@ -5,7 +5,9 @@ from pathlib import Path
 
 import streamlit as st
 from config_handler import ConfigHandler, load_config, read_config
-from post_processing import PostProcessing
+from perflog_store import PerflogStore
+from post_processing import PostProcessing, enable_copy_on_write
+from profiler import Profiler
 from streamlit_bokeh import streamlit_bokeh
 
 # drop-down lists
@@ -19,7 +21,8 @@ type_lookup = {"datetime64[ns]": "datetime",
                "Float64": "float",
                "int64": "int",
                "Int64": "int",
-               "object": "str"}
+               "object": "str",
+               "category": "str"}
 # user to pandas type mapping
 dtype_lookup = {"datetime": "datetime64[ns]",
                 "float": "float64",
@@ -27,7 +30,8 @@ dtype_lookup = {"datetime": "datetime64[ns]",
                 "str": "object"}
 
 
-def update_ui(post: PostProcessing, config: ConfigHandler, e: 'Exception | None' = None):
+def update_ui(post: PostProcessing, config: ConfigHandler, e: 'Exception | None' = None,
+              follow=False, follow_interval=5.0):
     """
         Create an interactive user interface for post-processing using Streamlit.
 
@@ -35,6 +39,8 @@ def update_ui(post: PostProcessing, config: ConfigHandler, e: 'Exception | None'
             post: PostProcessing, class containing performance log data and filter information.
             config: ConfigHandler, class containing configuration information for plotting.
             e: Exception | None, a potential config validation error (only used for user information).
+            follow: bool, initial state of the flag to follow perflogs for new rows.
+            follow_interval: float, number of seconds between checks for new perflog rows.
     """
 
     # stop the session state from resetting each time this function is run
@@ -42,9 +48,9 @@ def update_ui(post: PostProcessing, config: ConfigHandler, e: 'Exception | None'
     if state.get("post") is None:
         state.post = post
         state.config = config
-        # display initial config validation error, if present, and clear upon page reload
-        if e:
-            st.exception(e)
+    # display config validation error, if present, until the config is replaced or runs successfully
+    if e:
+        st.exception(e)
 
     post = state.post
     config = state.config
@@ -58,7 +64,8 @@ def update_ui(post: PostProcessing, config: ConfigHandler, e: 'Exception | None'
     if show_df:
         try:
             if len(config.plot_columns + config.extra_columns) > 0:
-                st.dataframe(post.df[post.mask][config.plot_columns + config.extra_columns],
+                st.dataframe(post.df[post.mask][[c for c in config.plot_columns + config.extra_columns
+                                                 if c in post.df.columns]],
                              hide_index=True, use_container_width=True)
             else:
                 st.dataframe(post.df[post.mask], hide_index=True, use_container_width=True)
@@ -70,6 +77,23 @@ def update_ui(post: PostProcessing, config: ConfigHandler, e: 'Exception | None'
     if show_config:
         st.write(config.to_dict())
 
+    # display time, rows, and peak memory of each reading and post-processing stage
+    with st.expander("Profile"):
+        st.dataframe(post.profiler.to_df().drop(columns="peak_alloc_mb"),
+                     hide_index=True, use_container_width=True)
+
+    # periodically check perflogs for new rows
+    if "follow" not in state:
+        state["follow"] = follow
+    follow = st.toggle("Follow Perflogs", key="follow",
+                       help="Check perflogs for new rows every {0} seconds and update the plot."
+                       .format(follow_interval))
+    if follow:
+        st.fragment(follow_perflogs, run_every=follow_interval)()
+    # read perflog changes on demand
+    st.button("Reload Perflogs", on_click=reload_perflogs,
+              help="Read perflog changes (the data is shared by all sessions).")
+
     # display config information
     with st.sidebar:
 
@@ -126,6 +150,19 @@ def update_ui(post: PostProcessing, config: ConfigHandler, e: 'Exception | None'
                 st.button("Download Config", disabled=True, use_container_width=True)
 
 
+def get_df_column(column: str):
+    """
+        Return a column of the processed dataframe (with user-selected types applied), or of
+        the original dataframe if the column has not been processed.
+
+        Args:
+            column: str, column name.
+    """
+
+    post = st.session_state.post
+    return post.df[column] if column in post.df.columns else post.original_df[column]
+
+
 def update_config():
     """
         Change session state config to uploaded config file.
@@ -133,13 +170,15 @@ def update_config():
 
     state = st.session_state
     uploaded_config = state.uploaded_config
-    df = state.post.df
+    df = state.post.original_df
 
     if uploaded_config:
         try:
             config_dict = load_config(uploaded_config)
             state.config = ConfigHandler(config_dict)
             config = state.config
+            # the config file validation error no longer applies
+            state.config_error = None
 
             # inputs that may have a default None value should be changed here
             state.title = config.title
@@ -251,12 +290,12 @@ def axis_select(label: str, axis: dict):
     """
 
     state = st.session_state
-    df = state.post.df
+    df = state.post.original_df
     # default drop-down selections
     type_index = 0
     column_index = None
     if axis.get("value") in df.columns:
-        type_index = column_types.index(type_lookup.get(str(df[axis["value"]].dtype)))
+        type_index = column_types.index(type_lookup.get(str(get_df_column(axis["value"]).dtype)))
         column_index = list(df.columns).index(axis["value"])
 
     # axis information drop-downs
@@ -392,7 +431,7 @@ def units_select(label: str, axis: dict):
     """
 
     state = st.session_state
-    df = state.post.df
+    df = state.post.original_df
     # default drop-down selection
     units_index = None
     if axis.get("units"):
@@ -427,11 +466,11 @@ def scaling_select(axis: dict):
     """
 
     state = st.session_state
-    df = state.post.df
+    df = state.post.original_df
 
     # scaling value selection columns
     series_col = state.config.series_filters
-    x_col = (list(df[state.post.mask][state.x_axis_column].drop_duplicates().sort_values())
+    x_col = (list(get_df_column(state.x_axis_column)[state.post.mask].drop_duplicates().sort_values())
              if state.x_axis_column else [])
 
     # default drop-down selections
@@ -442,7 +481,7 @@ def scaling_select(axis: dict):
     if axis.get("scaling"):
         if axis["scaling"].get("column"):
             if axis["scaling"]["column"].get("name") in df.columns:
-                type_index = column_types.index(type_lookup.get(str(df[axis["scaling"]["column"]["name"]].dtype)))
+                type_index = column_types.index(type_lookup.get(str(get_df_column(axis["scaling"]["column"]["name"]).dtype)))
                 scaling_index = list(df.columns).index(axis["scaling"]["column"]["name"])
             if isinstance(axis["scaling"]["column"].get("series"), int):
                 if 0 <= axis["scaling"]["column"].get("series") < len(series_col):
@@ -561,7 +600,7 @@ def update_types():
 
     post = st.session_state.post
     config = st.session_state.config
-    df = st.session_state.post.df
+    df = st.session_state.post.original_df
 
     # re-parse column names
     config.parse_columns()
@@ -649,7 +688,7 @@ def new_filter_options():
 
         c1, c2 = st.columns(2)
         with c1:
-            st.selectbox("filter column", post.df.columns, key="filter_col")
+            st.selectbox("filter column", post.original_df.columns, key="filter_col")
         with c2:
             if state.filter_type == "series":
                 st.selectbox("operator", ["=="], key="filter_op")
@@ -659,7 +698,7 @@ def new_filter_options():
         c1, c2 = st.columns(2)
         with c1:
             # display contents of currently selected filter column
-            filter_col = post.df[state.filter_col].drop_duplicates()
+            filter_col = get_df_column(state.filter_col).drop_duplicates()
             st.selectbox("column filter value", filter_col.sort_values(), placeholder="None",
                          key="filter_val", index=None)
         with c2:
@@ -775,7 +814,7 @@ def new_extra_column_options():
     post = state.post
     with st.expander("Add New Extra Column"):
 
-        st.selectbox("extra column", post.df.columns, key="extra_col",
+        st.selectbox("extra column", post.original_df.columns, key="extra_col",
                      help="{0} {1}".format(
                          "Optional columns to display in the filtered DataFrame (in addition to plot columns).",
                          "Extra columns do not affect plotting."))
@@ -825,15 +864,86 @@ def rerun_post_processing():
         # validate config
         read_config(config.to_dict())
         # reset processed df to original state
-        post.df = post.original_df.copy()
+        post.reset_df()
         # run post-processing again
         post.run_post_processing(config)
+        # the config file validation error no longer applies
+        st.session_state.config_error = None
 
     except Exception as e:
         st.exception(e)
         post.plot = None
 
 
+def sync_perflogs():
+    """
+        Replace the session state data with the shared perflog data if the perflogs have changed.
+        Return the number of new rows, or None if the perflogs have been rewritten.
+    """
+
+    state = st.session_state
+    post = state.post
+    store = state.perflog_store
+
+    store.refresh()
+    df, version = store.get_data()
+    # the shared data may have been updated by another session
+    if version == state.perflog_version:
+        return 0
+    # rewritten perflogs are read again in full, so the row count difference is meaningless
+    reloaded = store.is_reloaded_since(state.perflog_version)
+    new_rows = len(df) - len(post.original_df)
+    post.update_original_df(df)
+    state.perflog_version = version
+    return None if reloaded else new_rows
+
+
+def show_perflog_changes(new_rows: 'int | None'):
+    """
+        Notify the user of perflog changes and update the plot if there are any.
+
+        Args:
+            new_rows: int | None, number of new rows, or None if the perflogs have been rewritten.
+    """
+
+    if new_rows == 0:
+        return
+    st.toast("Read {0} new perflog rows.".format(new_rows) if new_rows
+             else "Perflogs have been rewritten and were read again.")
+    # only update a valid plot
+    if st.session_state.post.plot:
+        rerun_post_processing()
+
+
+def follow_perflogs():
+    """
+        Add new perflog rows to the session state data and update the plot if there are any.
+        Runs periodically while following perflogs.
+    """
+
+    try:
+        new_rows = sync_perflogs()
+    except Exception as e:
+        st.exception(e)
+        return
+
+    show_perflog_changes(new_rows)
+    # redraw the page with the new data
+    if new_rows != 0:
+        st.rerun()
+
+
+def reload_perflogs():
+    """
+        Add perflog changes to the session state data and update the plot if there are any.
+    """
+
+    try:
+        show_perflog_changes(sync_perflogs())
+    except Exception as e:
+        st.exception(e)
+
+
 def validate_download_config():
     """
         Warn the user if the current session state config is invalid before download.
@@ -862,35 +972,69 @@ def read_args():
     # optional argument (config path)
     parser.add_argument("-c", "--config_path", type=Path, default=None,
                         help="path to a configuration file specifying what to plot")
+    parser.add_argument("--cache_path", type=Path, default=None,
+                        help="path to a directory for caching parsed perflogs between runs")
+    parser.add_argument("--follow", action="store_true",
+                        help="follow perflogs for new rows and update the plot as they are added")
+    parser.add_argument("--follow_interval", type=float, default=5.0,
+                        help="number of seconds between checks for new perflog rows (default is 5)")
 
     return parser.parse_args()
 
 
+@st.cache_resource(show_spinner="Reading perflogs...")
+def get_perflog_store(log_path: Path, cache_path: 'Path | None' = None):
+    """
+        Return the perflog store of a log path, shared by all sessions of the app process,
+        so that perflogs are only read by the first session.
+
+        Args:
+            log_path: Path, path to performance log file or directory, or to a perflog archive.
+            cache_path: Path | None, path to a directory for caching parsed perflogs.
+    """
+    return PerflogStore(log_path, cache_path=cache_path)
+
+
 def main():
 
     args = read_args()
+    state = st.session_state
+    # share unmodified columns between the shared perflog data and the data processed in each session
+    enable_copy_on_write()
 
     try:
-        post = PostProcessing(args.log_path, save_plot=False)
-        # set up empty template config
-        config, err = ConfigHandler.from_template(), None
-        # optionally load config from file path
-        if args.config_path:
-            try:
-                config = ConfigHandler.from_path(args.config_path)
-                # only run post-processing with a valid config
-                post.run_post_processing(config)
-            except Exception as e:
-                err = e
-                # autofill some information from invalid config
+        post, config = state.get("post"), state.get("config")
+        # only set up post-processing at the start of a session (this function runs on every rerun)
+        if post is None:
+            store = get_perflog_store(args.log_path, args.cache_path)
+            # include perflog changes made since the shared data was read
+            store.refresh()
+            df, state.perflog_version = store.get_data()
+            state.perflog_store = store
+            post = PostProcessing(None, save_plot=False, df=df, profiler=Profiler(enabled=True))
+            # show the stages of the shared perflog read
+            post.profiler.stages = [dict(r) for r in store.profiler.stages]
+            # set up empty template config
+            config = ConfigHandler.from_template()
+            # optionally load config from file path
+            if args.config_path:
                 try:
-                    config = ConfigHandler.from_path(args.config_path, template=True)
+                    config = ConfigHandler.from_path(args.config_path)
+                    # only run post-processing with a valid config
+                    post.run_post_processing(config)
                 except Exception as e:
-                    print(type(e).__name__ + ":", e)
-                    print(traceback.format_exc())
+                    # keep the error for later reruns of the session
+                    state.config_error = e
+                    # autofill some information from invalid config
+                    try:
+                        config = ConfigHandler.from_path(args.config_path, template=True)
+                    except Exception as e:
+                        print(type(e).__name__ + ":", e)
+                        print(traceback.format_exc())
 
         # display ui
-        update_ui(post, config, e=err)
+        update_ui(post, config, e=state.get("config_error"), follow=args.follow,
+                  follow_interval=args.follow_interval)
 
     except Exception as e:
         st.exception(e)
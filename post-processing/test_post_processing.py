@@ -1,14 +1,33 @@
+import copy
+import json
+import operator as op
 import os
+import pickle
 import shutil
 import subprocess as sp
+import sys
+from functools import reduce
 from pathlib import Path
 
 import pandas as pd
 import perflog_handler as log_hand
 import pytest
+from aggregation_handler import aggregate
+from batch_post_processing import find_configs, run_batch
+from bokeh.models import Whisker
 from config_handler import ConfigHandler
-from perflog_handler import PerflogHandler
+from downsampling import downsample
+from perflog_archive import convert_perflogs
+from perflog_cache import PerflogCache
+from perflog_discovery import find_perflogs
+from perflog_handler import PerflogHandler, write_archive
+from perflog_query import PerflogQuery, get_identifiers, get_query_columns, plot_query
+from perflog_store import PerflogStore
+from plot_handler import plot_generic, plot_line_chart
 from post_processing import PostProcessing
+from profiler import Profiler
+from regressions import find_regressions
+from scaling_analysis import analyse_scaling
 
 
 # Run given benchmark with reframe using subprocess
@@ -61,6 +80,25 @@ def test_display_name_parsing():
     # no params expected
     assert len(params) == 0
 
+    # check vectorised parsing of a column of display names
+    display_names = pd.Series(["TestName %param1=one %param2=two", "TestName",
+                               "OtherName %param2=three", "TestName %param1=one %param2=two"])
+    cols = log_hand.get_display_name_cols(display_names)
+
+    # check column layout and contents
+    assert cols.columns.tolist() == ["test_name", "param1", "param2"]
+    assert cols["test_name"].tolist() == ["TestName", "TestName", "OtherName", "TestName"]
+    assert cols["param1"].tolist()[::3] == ["one", "one"]
+    assert cols["param1"][1:3].isnull().all()
+    assert cols["param2"].tolist()[2:] == ["three", "two"]
+
+    # check empty and null display names only give an empty test name column
+    for display_names in [pd.Series([], dtype=object), pd.Series([None, None])]:
+        cols = log_hand.get_display_name_cols(display_names)
+        assert cols.columns.tolist() == ["test_name"]
+        assert cols.index.equals(display_names.index)
+        assert cols["test_name"].isnull().all()
+
 
 # Test that recursive unpacking of key columns works as expected
 def test_key_col_unpacking():
@@ -78,6 +116,15 @@ def test_key_col_unpacking():
         {"benchmark": "bench2", "compiler_name": "compiler2", "compiler_version": 12.1,
          "variants_cuda": True, "mpi": ""}]
 
+    # check bulk flattening of a column of JSON strings (with repeated and missing rows)
+    key_cols = log_hand.get_dict_cols(pd.Series([json.dumps(test_dict1), json.dumps(test_dict2),
+                                                 None, json.dumps(test_dict1)]))
+    assert key_cols.columns.tolist() == ["benchmark", "bench1_compiler_name", "bench1_compiler_version",
+                                         "compiler_name", "compiler_version", "variants_cuda", "mpi"]
+    assert key_cols["benchmark"].tolist()[::3] == ["bench1", "bench1"]
+    assert key_cols["compiler_version"][1] == 12.1
+    assert key_cols.iloc[2].isnull().all()
+
 
 @pytest.fixture(scope="module")
 # Fixture to run sombrero benchmark example, generate perflogs, and clean up after test
@@ -193,6 +240,1043 @@ def test_read_perflog(run_sombrero):
     assert df["tags"][0] == "example"
 
 
+# Test that parallel perflog parsing matches serial parsing
+def test_parallel_read(run_sombrero):
+
+    sombrero_log_path, _, _ = run_sombrero
+    perflog_dir = Path(sombrero_log_path).parent
+
+    serial_df = PerflogHandler(perflog_dir).get_df()
+    parallel_df = PerflogHandler(perflog_dir, workers=2).get_df()
+
+    # check rows and columns are identical (including order)
+    assert parallel_df.equals(serial_df)
+    assert parallel_df.columns.tolist() == serial_df.columns.tolist()
+
+
+# Test that repetitive string columns are stored as categoricals and filter like strings
+def test_categorical_columns(run_sombrero):
+
+    sombrero_log_path, _, _ = run_sombrero
+    perflog_dir = Path(sombrero_log_path).parent
+
+    categorical_df = PerflogHandler(perflog_dir).get_df()
+    object_df = PerflogHandler(perflog_dir, categorical=False).get_df()
+
+    # check repetitive string columns are categorical
+    for col in ["system", "partition", "test_name", "flops_unit"]:
+        assert isinstance(categorical_df[col].dtype, pd.CategoricalDtype)
+        assert object_df[col].dtype == object
+    # check contents are unchanged
+    assert categorical_df.astype(object).equals(object_df.astype(object))
+
+    # check filters give the same masks for both representations
+    post = PostProcessing(sombrero_log_path, save_plot=False)
+    for f in [["test_name", "==", "SombreroBenchmark"], ["flops_unit", "!=", "Gflops/seconds"],
+              ["system", "<", "z"], ["partition", "==", "nonexistent"]]:
+        assert post.row_filter(f, categorical_df).equals(post.row_filter(f, object_df))
+
+
+# Test that appending rows to categorical columns gives the same categories as a fresh read
+def test_append_categorical_rows():
+
+    df = pd.DataFrame({"system": ["b", "d", "b", "d", "b", "d"],
+                       "flops_value": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]})
+    new_df = pd.DataFrame({"system": ["a", "c", None, "c"], "flops_value": [7.0, 8.0, 9.0, 10.0]})
+
+    appended_df = log_hand.append_rows(log_hand.to_categorical(df), new_df)
+    fresh_df = log_hand.to_categorical(pd.concat([df, new_df], ignore_index=True))
+
+    # check category order and contents match
+    assert appended_df["system"].cat.categories.tolist() == ["a", "b", "c", "d"]
+    assert appended_df["system"].dtype == fresh_df["system"].dtype
+    assert appended_df.equals(fresh_df)
+
+    # check sorting and filters give the same rows
+    assert (appended_df.sort_values(["system", "flops_value"]).index.tolist() ==
+            fresh_df.sort_values(["system", "flops_value"]).index.tolist())
+    post = PostProcessing.from_dataframe(appended_df, save_plot=False)
+    for f in [["system", "<", "c"], ["system", ">", "b"], ["system", "==", "c"]]:
+        assert post.row_filter(f, appended_df).equals(post.row_filter(f, fresh_df))
+
+
+# Test that compiled filter conditions give the same mask as individual conditions
+def test_compiled_filters():
+
+    df = pd.DataFrame({"tasks": pd.array([1, 2, None, 4, 2], dtype="Int64"),
+                       "flops_value": [0.5, None, 1.1, 2.0, 0.9],
+                       "system": pd.Series(["a", "b", None, "a", "c"], dtype="category"),
+                       "environ": ["gnu", None, "intel", "gnu", "intel"]})
+    and_filters = [["tasks", "!=", 4], ["flops_value", "<", 2], ["flops_value", "<", 2], ["environ", "!=", None]]
+    or_filters = [["system", "==", "a"], ["system", "==", "c"], ["tasks", ">=", "2"]]
+    series_filters = [["tasks", "==", 1], ["tasks", "==", 2]]
+
+    post = PostProcessing.from_dataframe(df, save_plot=False)
+    mask = post.filter_mask(df, and_filters, or_filters, series_filters)
+    # combine individual condition masks (comparisons with missing values are False)
+    expected_mask = (reduce(op.and_, (post.row_filter(f, df) for f in and_filters)) &
+                     reduce(op.or_, (post.row_filter(f, df) for f in or_filters)) &
+                     reduce(op.or_, (post.row_filter(f, df) for f in series_filters)))
+    assert mask.equals(expected_mask)
+    assert mask.tolist() == [True, False, False, False, True]
+
+    # check comparisons with missing values do not depend on the column dtype
+    float_df = df.assign(tasks=df["tasks"].astype(float))
+    object_df = df.assign(tasks=df["tasks"].astype(object))
+    for f in [["tasks", "!=", 2], ["tasks", "==", 2], ["tasks", "<", 4], ["tasks", ">=", 2]]:
+        assert post.row_filter(f, df).equals(post.row_filter(f, float_df))
+        assert post.row_filter(f, df).equals(post.row_filter(f, object_df))
+    assert post.row_filter(["tasks", "!=", 2], df).tolist() == [True, False, True, True, False]
+
+
+# Test that filter masks of unchanged conditions are reused between runs
+def test_mask_cache(run_sombrero):
+
+    sombrero_log_path, _, _ = run_sombrero
+    config_dict = {"title": "Title",
+                   "plot_type": "generic",
+                   "x_axis": {"value": "tasks",
+                              "units": {"custom": None},
+                              "range": {"min": None, "max": None}},
+                   "y_axis": {"value": "flops_value",
+                              "units": {"column": "flops_unit"},
+                              "range": {"min": None, "max": None}},
+                   "filters": {"and": [["flops_value", ">", 0.6]], "or": []},
+                   "series": [["cpus_per_task", 1], ["cpus_per_task", 2]],
+                   "column_types": {"tasks": "int",
+                                    "flops_value": "float",
+                                    "flops_unit": "str",
+                                    "cpus_per_task": "int"}}
+
+    post = PostProcessing(sombrero_log_path, save_plot=False)
+    df = post.run_post_processing(ConfigHandler(config_dict))
+    cached_masks = dict(post.mask_cache.masks)
+    assert len(cached_masks) == 3
+
+    # check re-running with a changed title and x-axis sort reuses all masks
+    config_dict["title"] = "New Title"
+    config_dict["x_axis"]["sort"] = "descending"
+    post.df = post.original_df.copy()
+    assert post.run_post_processing(ConfigHandler(config_dict)).equals(df)
+    assert all(post.mask_cache.masks[key] is mask for key, mask in cached_masks.items())
+
+    # check only changed conditions are evaluated again
+    config_dict["filters"]["and"] = [["flops_value", ">", 1.0]]
+    post.df = post.original_df.copy()
+    df = post.run_post_processing(ConfigHandler(config_dict))
+    assert len(post.mask_cache.masks) == 4
+    assert df.equals(PostProcessing(sombrero_log_path, save_plot=False).run_post_processing(
+        ConfigHandler(config_dict)))
+    # check filtered rows are aligned with the original data
+    assert (post.original_df.loc[df.index, "flops_value"].astype(float) > 1.0).all()
+
+    # check masks are aligned with rows of supplied data that is not indexed by row position
+    original_df = PerflogHandler(sombrero_log_path).get_df()
+    shuffled_df = original_df.iloc[::-1].set_axis([30, 10, 40, 20])
+    post = PostProcessing(None, save_plot=False, df=shuffled_df)
+    for _ in range(2):
+        post.reset_df()
+        df = post.run_post_processing(ConfigHandler(config_dict))
+        assert (df["flops_value"] > 1.0).all()
+        assert len(df) == (original_df["flops_value"] > 1.0).sum()
+    assert shuffled_df.index.tolist() == [30, 10, 40, 20]
+
+
+# Test that post-processing only processes config columns and leaves the original data unchanged
+def test_processed_columns(run_sombrero):
+
+    sombrero_log_path, _, _ = run_sombrero
+    config = ConfigHandler(
+        {"title": "Title",
+         "plot_type": "generic",
+         "x_axis": {"value": "tasks",
+                    "units": {"custom": None},
+                    "range": {"min": None, "max": None}},
+         "y_axis": {"value": "flops_value",
+                    "units": {"column": "flops_unit"},
+                    "scaling": {"custom": 2},
+                    "logarithmic": True,
+                    "range": {"min": None, "max": None}},
+         "filters": {"and": [], "or": []},
+         "series": [["cpus_per_task", 1], ["cpus_per_task", 2]],
+         "column_types": {"tasks": "int",
+                          "flops_value": "float",
+                          "flops_unit": "str",
+                          "cpus_per_task": "int"},
+         "extra_columns_to_csv": ["spack_spec"]})
+
+    post = PostProcessing(sombrero_log_path, save_plot=False)
+    post.run_post_processing(config)
+    # check only config columns are processed
+    assert post.df.columns.tolist() == config.all_columns + config.extra_columns
+    # check transformations are not applied to the original data
+    assert post.original_df.equals(PerflogHandler(sombrero_log_path).get_df())
+
+    # check re-running after a reset gives the same results
+    df = post.df.copy()
+    post.reset_df()
+    post.run_post_processing(config)
+    assert post.df.equals(df)
+
+    # check the same holds with copy-on-write, where processed columns share the original data
+    with pd.option_context("mode.copy_on_write", True):
+        post = PostProcessing(sombrero_log_path, save_plot=False)
+        post.run_post_processing(config)
+        assert post.original_df.equals(PerflogHandler(sombrero_log_path).get_df())
+        assert post.df.equals(df)
+
+
+# Test that column + series scaling does not depend on row order
+def test_scaling_row_order():
+
+    df = pd.DataFrame({"tasks": [1, 2, 4, 1, 2, 4],
+                       "cpus_per_task": [1, 1, 1, 2, 2, 2],
+                       "flops_value": [1.0, 2.0, 4.0, 3.0, 8.0, 20.0]})
+    series_filters = [["cpus_per_task", "==", 1], ["cpus_per_task", "==", 2]]
+
+    post = PostProcessing.from_dataframe(df, save_plot=False)
+    scaled = []
+    for order in [[0, 1, 2, 3, 4, 5], [5, 0, 3, 2, 4, 1]]:
+        post.df = df.iloc[order].copy()
+        post.mask = pd.Series(True, index=post.df.index)
+        post.transform_df_data("tasks", "flops_value", {"name": "flops_value", "series": 0},
+                               None, series_filters)
+        scaled.append(post.df.sort_index()["flops_value"].tolist())
+
+    # check each series is scaled by the first series at the same x-axis value
+    assert scaled[0] == scaled[1] == [1.0, 1.0, 1.0, 3.0, 4.0, 5.0]
+
+
+# Test that repeated runs are aggregated with error bars
+def test_aggregation(tmp_path):
+
+    # three runs of each task count and cpus per task combination
+    df = pd.DataFrame({"tasks": [1, 2] * 6,
+                       "cpus_per_task": [1, 1, 2, 2] * 3,
+                       "flops_value": [1.0, 2.0, 4.0, 8.0, 2.0, 4.0, 6.0, 10.0, 3.0, 6.0, 8.0, 12.0],
+                       "flops_unit": "Gflops/s"})
+    config_dict = {"title": "Title",
+                   "plot_type": "generic",
+                   "x_axis": {"value": "tasks",
+                              "units": {"custom": None},
+                              "range": {"min": None, "max": None}},
+                   "y_axis": {"value": "flops_value",
+                              "units": {"column": "flops_unit"},
+                              "range": {"min": None, "max": None}},
+                   "filters": {"and": [], "or": []},
+                   "series": [["cpus_per_task", 1], ["cpus_per_task", 2]],
+                   "column_types": {"tasks": "int",
+                                    "flops_value": "float",
+                                    "flops_unit": "str",
+                                    "cpus_per_task": "int"}}
+
+    # check repeated runs are not accepted without aggregation
+    with pytest.raises(RuntimeError):
+        PostProcessing.from_dataframe(df, save_plot=False).run_post_processing(ConfigHandler(config_dict))
+
+    config_dict["aggregation"] = {"statistic": "mean", "error": "ci95"}
+    post = PostProcessing.from_dataframe(df, tmp_path, save_data="transformed", save_plot=False)
+    plot_df = post.run_post_processing(ConfigHandler(config_dict))
+    # check one row per x-axis value per series
+    assert plot_df[["tasks", "cpus_per_task"]].values.tolist() == [[1, 1], [1, 2], [2, 1], [2, 2]]
+    assert plot_df["flops_value"].tolist() == [2.0, 6.0, 4.0, 10.0]
+    assert plot_df["flops_value_count"].tolist() == [3] * 4
+    # check 95% confidence interval of the mean (t = 4.303 for 2 degrees of freedom)
+    half_width = 4.303 * plot_df["flops_value_std"] / 3**0.5
+    assert (plot_df["flops_value_upper"] - plot_df["flops_value"]).round(9).equals(half_width.round(9))
+    assert (plot_df["flops_value"] - plot_df["flops_value_lower"]).round(9).equals(half_width.round(9))
+    # check statistics are exported
+    csv_df = pd.read_csv(tmp_path / "output.csv", index_col=0)
+    assert csv_df["flops_value_median"].tolist() == [2.0, 6.0, 4.0, 10.0]
+    # check error bars are plotted
+    assert any(isinstance(r, Whisker) for r in post.plot.center)
+
+    # check percentile statistics and line chart error bars
+    config_dict["plot_type"] = "line"
+    config_dict["aggregation"] = {"statistic": "p100", "error": "p0_p50"}
+    post = PostProcessing.from_dataframe(df, save_plot=False)
+    plot_df = post.run_post_processing(ConfigHandler(config_dict))
+    assert plot_df["flops_value"].tolist() == [3.0, 8.0, 6.0, 12.0]
+    assert plot_df["flops_value_lower"].tolist() == [1.0, 4.0, 2.0, 8.0]
+    assert plot_df["flops_value_upper"].tolist() == [2.0, 6.0, 4.0, 10.0]
+    assert sum(isinstance(r, Whisker) for r in post.plot.center) == 2
+
+    # check repeated scaling values are aggregated with the same statistic
+    config_dict["y_axis"]["scaling"] = {"column": {"name": "flops_value", "series": 0}}
+    config_dict["aggregation"] = {"statistic": "median"}
+    plot_df = PostProcessing.from_dataframe(df, save_plot=False).run_post_processing(ConfigHandler(config_dict))
+    assert plot_df["flops_value"].tolist() == [1.0, 3.0, 1.0, 2.5]
+
+    # check invalid aggregation options are rejected
+    config_dict["aggregation"] = {"statistic": "mode"}
+    with pytest.raises(RuntimeError):
+        ConfigHandler(config_dict)
+    # check confidence intervals of the mean are only drawn around the mean
+    config_dict["aggregation"] = {"statistic": "median", "error": "ci95"}
+    with pytest.raises(RuntimeError):
+        ConfigHandler(config_dict)
+    with pytest.raises(RuntimeError):
+        aggregate(df, ["tasks"], "flops_value", "median", "ci95")
+
+
+# Test that speed-up, efficiency, and serial fraction are computed against the smallest run
+def test_scaling_analysis():
+
+    df = pd.DataFrame({"tasks": [8, 4, 2, 1, 1, 2, 4, 8],
+                       "cpus_per_task": [1, 1, 1, 1, 2, 2, 2, 2],
+                       "time_value": [2.0, 2.5, 4.0, 8.0, 4.0, 2.0, 1.0, 0.5],
+                       "time_unit": "s"})
+    config_dict = {"title": "Title",
+                   "plot_type": "line",
+                   "x_axis": {"value": "tasks",
+                              "units": {"custom": None},
+                              "range": {"min": None, "max": None}},
+                   "y_axis": {"value": "time_value",
+                              "units": {"column": "time_unit"},
+                              "range": {"min": None, "max": None}},
+                   "filters": {"and": [], "or": []},
+                   "series": [["cpus_per_task", 1], ["cpus_per_task", 2]],
+                   "column_types": {"tasks": "int",
+                                    "time_value": "float",
+                                    "time_unit": "str",
+                                    "cpus_per_task": "int"},
+                   "scaling_analysis": {"type": "strong", "metric": "speedup"}}
+
+    post = PostProcessing.from_dataframe(df, save_plot=False)
+    plot_df = post.run_post_processing(ConfigHandler(config_dict)).sort_values(["cpus_per_task", "tasks"])
+    # check times are compared with the run with the fewest tasks of each series
+    assert plot_df["speedup"].tolist() == [1.0, 2.0, 3.2, 4.0, 1.0, 2.0, 4.0, 8.0]
+    assert plot_df["efficiency"].tolist() == [1.0, 1.0, 0.8, 0.5, 1.0, 1.0, 1.0, 1.0]
+    assert plot_df["ideal_speedup"].tolist() == [1.0, 2.0, 4.0, 8.0] * 2
+    # check Karp-Flatt serial fraction (undefined for the smallest run)
+    assert plot_df["serial_fraction"].tolist()[1:4] == pytest.approx([0.0, 1 / 12, 1 / 7])
+    assert plot_df["serial_fraction"].isnull().tolist() == [True, False, False, False] * 2
+    # check only the first run with an efficiency below the threshold is flagged
+    assert plot_df["speedup_limit"].notnull().tolist() == [False, False, False, True] + [False] * 4
+    # check ideal scaling line and flagged run are plotted
+    assert {r.glyph.y for r in post.plot.renderers} >= {"speedup", "ideal_speedup", "speedup_limit"}
+
+    # check series without resource values are skipped
+    missing_df = pd.concat([df, pd.DataFrame({"tasks": [None, None], "cpus_per_task": [4, 4],
+                                              "time_value": [1.0, 2.0]})], ignore_index=True)
+    with pytest.warns(UserWarning, match="Skipped scaling analysis of 2 rows"):
+        analysis_df = analyse_scaling(missing_df, "tasks", "time_value", ["cpus_per_task"])
+    assert analysis_df["speedup"].isnull().tolist() == [False] * 8 + [True] * 2
+    assert analysis_df["speedup"][:8].equals(analyse_scaling(df, "tasks", "time_value", ["cpus_per_task"])["speedup"])
+
+    # check weak scaling of (total) rates with a bar chart
+    config_dict["plot_type"] = "generic"
+    config_dict["y_axis"]["units"] = {"custom": "Gflops/s"}
+    config_dict["scaling_analysis"] = {"type": "weak", "efficiency_threshold": 0.9}
+    df["time_value"] = [4.0, 3.0, 2.0, 1.0, 1.0, 2.0, 4.0, 8.0]
+    plot_df = PostProcessing.from_dataframe(df, save_plot=False).run_post_processing(
+        ConfigHandler(config_dict)).sort_values(["cpus_per_task", "tasks"])
+    assert plot_df["efficiency"].tolist() == [1.0, 1.0, 0.75, 0.5, 1.0, 1.0, 1.0, 1.0]
+    assert plot_df["efficiency_limit"].notnull().tolist() == [False, False, True, False] + [False] * 4
+
+    # check invalid scaling analysis options are rejected
+    config_dict["scaling_analysis"] = {"type": "strong", "metric": "throughput"}
+    with pytest.raises(RuntimeError):
+        ConfigHandler(config_dict)
+
+
+# Test that the time, rows, and memory of each reading and post-processing stage are recorded
+def test_profiler(run_sombrero, tmp_path):
+
+    sombrero_log_path, _, _ = run_sombrero
+    config_dict = {"title": "Title",
+                   "plot_type": "generic",
+                   "x_axis": {"value": "tasks",
+                              "units": {"custom": None},
+                              "range": {"min": None, "max": None}},
+                   "y_axis": {"value": "flops_value",
+                              "units": {"column": "flops_unit"},
+                              "range": {"min": None, "max": None}},
+                   "filters": {"and": [["cpus_per_task", "==", 2]], "or": []},
+                   "series": [],
+                   "column_types": {"tasks": "int",
+                                    "flops_value": "float",
+                                    "flops_unit": "str",
+                                    "cpus_per_task": "int"}}
+
+    profiler = Profiler(enabled=True, trace_memory=True)
+    post = PostProcessing(sombrero_log_path, save_plot=False, profiler=profiler)
+    df = post.run_post_processing(ConfigHandler(config_dict))
+    stages = {r["stage"]: r for r in profiler.stages}
+    assert list(stages) == ["discovery", "parsing", "csv parsing", "display name parsing", "json flattening",
+                            "categorical typing", "typing", "sorting", "filtering", "scaling", "plotting"]
+    assert all(r["time"] >= 0 and r["peak_rss_mb"] > 0 for r in profiler.stages)
+    # check rows in and out of stages
+    assert stages["parsing"]["rows_out"] == len(post.original_df)
+    assert stages["filtering"]["rows_in"] == len(post.original_df)
+    assert stages["filtering"]["rows_out"] == stages["plotting"]["rows_in"] == len(df)
+    assert stages["plotting"]["peak_alloc_mb"] > 0
+
+    # check re-running replaces post-processing stages and keeps reading stages
+    config_dict["aggregation"] = {"statistic": "mean"}
+    post.run_post_processing(ConfigHandler(config_dict))
+    assert [r["stage"] for r in profiler.stages][-3:] == ["scaling", "aggregation", "plotting"]
+    assert profiler.stages[0] is stages["discovery"]
+
+    # check the profile is saved as JSON
+    profiler.save_json(tmp_path / "profile.json")
+    with open(tmp_path / "profile.json") as file:
+        assert json.load(file)["stages"] == profiler.stages
+
+    # check nothing is recorded without profiling
+    assert PostProcessing(sombrero_log_path, save_plot=False).profiler.stages == []
+
+
+# Test that cached perflogs are parsed incrementally and match a full parse
+def test_perflog_cache(run_sombrero, tmp_path):
+
+    sombrero_log_path, _, _ = run_sombrero
+    log_path = tmp_path / "SombreroBenchmark.log"
+    cache_path = tmp_path / "cache"
+
+    with open(sombrero_log_path, "r") as file:
+        lines = file.readlines()
+
+    # cache a perflog with only its first record
+    with open(log_path, "w") as file:
+        file.writelines(lines[:2])
+    assert len(PerflogHandler(log_path, cache_path=cache_path).get_df()) == 1
+
+    # append the remaining records (the last one incomplete)
+    with open(log_path, "a") as file:
+        file.writelines(lines[2:-1])
+        file.write(lines[-1][:10])
+    df = PerflogHandler(log_path, cache_path=cache_path).get_df()
+    assert len(df) == len(lines) - 2
+
+    # complete the last record
+    with open(log_path, "a") as file:
+        file.write(lines[-1][10:])
+    df = PerflogHandler(log_path, cache_path=cache_path).get_df()
+    assert df.equals(PerflogHandler(log_path).get_df())
+
+    # rewrite the perflog with fewer records
+    with open(log_path, "w") as file:
+        file.writelines(lines[:3])
+    df = PerflogHandler(log_path, cache_path=cache_path).get_df()
+    assert df.equals(PerflogHandler(log_path).get_df())
+
+    # check cache entries that cannot be loaded (e.g. pickled with other library versions) are ignored
+    cache = PerflogCache(cache_path)
+    for contents in [b"\x80\x04cnonexistent_module\nDataFrame\n.", b"\x80\x04cpandas\nNonexistent\n.",
+                     pickle.dumps(["not", "an", "entry"]), b"truncated"]:
+        with open(cache.entry_path(log_path), "wb") as file:
+            file.write(contents)
+        assert cache.get(log_path) == (None, None)
+        assert PerflogHandler(log_path, cache_path=cache_path).get_df().equals(df)
+
+
+# Test that the last record of a perflog is read even without a trailing newline
+def test_unterminated_perflog(run_sombrero, tmp_path):
+
+    sombrero_log_path, _, _ = run_sombrero
+    log_path = tmp_path / "SombreroBenchmark.log"
+    cache_path = tmp_path / "cache"
+
+    with open(sombrero_log_path, "r") as file:
+        lines = file.readlines()
+
+    # write a perflog whose last record has no trailing newline
+    with open(log_path, "w") as file:
+        file.writelines(lines[:-1])
+        file.write(lines[-1].rstrip("\n"))
+    assert len(PerflogHandler(log_path).get_df()) == len(lines) - 1
+    assert len(PerflogHandler(log_path, cache_path=cache_path).get_df()) == len(lines) - 1
+
+    # check the cached perflog is read again in full when its last record is extended
+    with open(log_path, "a") as file:
+        file.write("\n")
+        file.writelines(lines[1:2])
+    df = PerflogHandler(log_path, cache_path=cache_path).get_df()
+    assert df.equals(PerflogHandler(log_path).get_df())
+    assert len(df) == len(lines)
+
+
+# Test that perflogs without records are read as empty and invalid perflogs are reported
+def test_empty_perflog(run_sombrero, tmp_path, monkeypatch, capsys):
+
+    sombrero_log_path, _, _ = run_sombrero
+    shutil.copy(sombrero_log_path, tmp_path)
+
+    with open(sombrero_log_path, "r") as file:
+        header = file.readline()
+    with open(tmp_path / "Empty.log", "w") as file:
+        file.write(header)
+
+    # check a perflog with only a header has no rows but the usual columns
+    empty_df = log_hand.read_perflog(tmp_path / "Empty.log")
+    assert empty_df.empty
+    assert "test_name" in empty_df.columns
+    assert "display_name" not in empty_df.columns
+    assert len(PerflogHandler(tmp_path).get_df()) == len(PerflogHandler(sombrero_log_path).get_df())
+
+    # check debug output of perflogs discarded with single-argument errors
+    read_perflog_increment = log_hand.read_perflog_increment
+
+    def fail_empty_perflog(path, *args):
+        if os.path.basename(path) == "Empty.log":
+            raise KeyError("test error")
+        return read_perflog_increment(path, *args)
+
+    monkeypatch.setattr(log_hand, "read_perflog_increment", fail_empty_perflog)
+    PerflogHandler(tmp_path, debug=True)
+    assert "Discarding Empty.log: KeyError: test error" in capsys.readouterr().out
+
+
+# Test that rows appended to perflogs after they were first read are picked up
+def test_follow_perflogs(run_sombrero, tmp_path):
+
+    sombrero_log_path, _, _ = run_sombrero
+    log_path = tmp_path / "SombreroBenchmark.log"
+
+    with open(sombrero_log_path, "r") as file:
+        lines = file.readlines()
+
+    # read a perflog with only its first record
+    with open(log_path, "w") as file:
+        file.writelines(lines[:2])
+    post = PostProcessing(tmp_path, save_plot=False)
+    assert len(post.original_df) == 1
+    # check unchanged perflogs have no new rows
+    assert post.read_new_perflogs() == 0
+
+    # append the remaining records and add an invalid perflog
+    with open(log_path, "a") as file:
+        file.writelines(lines[2:])
+    with open(tmp_path / "Invalid.log", "w") as file:
+        file.write("job_completion_time|display_name\n")
+    assert post.read_new_perflogs() == len(lines) - 2
+    # check new rows match a full read (categorical columns depend on the initial rows)
+    assert post.original_df.astype(object).equals(PerflogHandler(log_path).get_df().astype(object))
+
+    # check rewritten perflogs are read again in full
+    with open(log_path, "w") as file:
+        file.writelines(lines[:3])
+    assert post.read_new_perflogs() is None
+    assert post.original_df.equals(PerflogHandler(log_path).get_df())
+
+
+# Test that perflog data is shared until the perflog fingerprint changes
+def test_perflog_store(run_sombrero, tmp_path):
+
+    sombrero_log_path, _, _ = run_sombrero
+    log_path = tmp_path / "SombreroBenchmark.log"
+
+    with open(sombrero_log_path, "r") as file:
+        lines = file.readlines()
+    with open(log_path, "w") as file:
+        file.writelines(lines[:2])
+
+    store = PerflogStore(tmp_path)
+    df, version = store.get_data()
+    assert len(df) == 1
+    # check unchanged perflogs are not read again
+    assert store.refresh() == 0
+    assert store.get_data()[0] is df
+
+    # check sessions share the data and pick up appended rows
+    post = PostProcessing(None, save_plot=False, df=df)
+    with open(log_path, "a") as file:
+        file.writelines(lines[2:])
+    assert store.refresh() == len(lines) - 2
+    new_df, new_version = store.get_data()
+    assert new_version == version + 1
+    post.update_original_df(new_df)
+    assert post.original_df is new_df
+    # check the previously shared data is not modified
+    assert len(df) == 1
+    assert not store.is_reloaded_since(version)
+
+    # check rewritten perflogs are reported as read again in full, even if they have grown
+    with open(log_path, "w") as file:
+        file.writelines(lines[:1] + lines[:0:-1] + lines[1:2])
+    assert store.refresh() is None
+    assert len(store.get_data()[0]) == len(lines)
+    assert store.is_reloaded_since(new_version)
+    assert not store.is_reloaded_since(store.get_data()[1])
+
+
+# Test that loading only config columns and rows gives the same results as a full load
+def test_config_projection(run_sombrero):
+
+    sombrero_log_path, _, _ = run_sombrero
+    perflog_dir = Path(sombrero_log_path).parent
+
+    config = ConfigHandler(
+        {"title": "Title",
+         "plot_type": "generic",
+         "x_axis": {"value": "tasks",
+                    "units": {"custom": None},
+                    "range": {"min": None, "max": None}},
+         "y_axis": {"value": "flops_value",
+                    "units": {"column": "flops_unit"},
+                    "range": {"min": None, "max": None}},
+         "filters": {"and": [["test_name", "==", "SombreroBenchmark"], ["OMP_NUM_THREADS", "<=", 2],
+                             ["job_completion_time", ">", "2010-01-01T00:00:00"]],
+                     "or": []},
+         "series": [["cpus_per_task", 1], ["cpus_per_task", 2]],
+         "column_types": {"tasks": "int",
+                          "flops_value": "float",
+                          "flops_unit": "str",
+                          "test_name": "str",
+                          "OMP_NUM_THREADS": "int",
+                          "job_completion_time": "datetime",
+                          "cpus_per_task": "int"},
+         "extra_columns_to_csv": ["spack_spec"]})
+
+    post = PostProcessing(perflog_dir, save_plot=False, config=config)
+    # check only config columns and matching rows are loaded
+    assert sorted(post.original_df.columns) == sorted(config.all_columns + config.extra_columns)
+    assert (post.original_df["test_name"] == "SombreroBenchmark").all()
+    # check rows from the changed log (completed in 2000) are not loaded
+    assert len(post.original_df) == 4
+
+    # check plotted data is unchanged
+    projected_df = post.run_post_processing(config)
+    df = PostProcessing(perflog_dir, save_plot=False).run_post_processing(config)
+    assert projected_df.reset_index(drop=True).equals(df.reset_index(drop=True))
+
+
+# Test that perflogs are found in the <system>/<partition> layout and listings are reused
+def test_perflog_discovery(tmp_path):
+
+    partition_dir = tmp_path / "system" / "partition"
+    os.makedirs(partition_dir / "subdir")
+    os.makedirs(tmp_path / "stage" / "system")
+    for path in [partition_dir / "A.log", partition_dir / "B.log", partition_dir / "subdir" / "C.log",
+                 partition_dir / "notes.txt", tmp_path / "stage" / "system" / "D.log"]:
+        path.touch()
+
+    # check partition directories containing perflogs are not searched further by default
+    log_files, manifest = find_perflogs(tmp_path, workers=2)
+    assert log_files == [str(tmp_path / "stage" / "system" / "D.log"),
+                         str(partition_dir / "A.log"), str(partition_dir / "B.log")]
+    assert find_perflogs(tmp_path)[0] == log_files
+    assert (find_perflogs(tmp_path, full_search=True)[0] ==
+            sorted(log_files + [str(partition_dir / "subdir" / "C.log")]))
+
+    # check perflogs above partition directories do not hide the perflogs below them
+    stray_logs = [tmp_path / "reframe.log", tmp_path / "system" / "reframe.log"]
+    for path in stray_logs:
+        path.touch()
+    assert find_perflogs(tmp_path)[0] == sorted(log_files + [str(path) for path in stray_logs])
+    for path in stray_logs:
+        path.unlink()
+
+    # check unreadable directories are skipped
+    assert find_perflogs(tmp_path / "missing")[0] == []
+
+    # check unmodified directories are not scanned again
+    manifest[os.path.abspath(partition_dir)]["mtime"] = os.stat(partition_dir).st_mtime_ns
+    manifest[os.path.abspath(partition_dir)]["logs"].append("Cached.log")
+    assert str(partition_dir / "Cached.log") in find_perflogs(tmp_path, manifest=manifest)[0]
+    # check modified directories are scanned again
+    (partition_dir / "E.log").touch()
+    os.utime(partition_dir, ns=(0, 0))
+    log_files, _ = find_perflogs(tmp_path, manifest=manifest)
+    assert str(partition_dir / "E.log") in log_files
+    assert str(partition_dir / "Cached.log") not in log_files
+
+
+# Test that perflog archives can be used in place of perflogs
+def test_perflog_archive(run_sombrero, tmp_path):
+
+    pytest.importorskip("pyarrow")
+
+    sombrero_log_path, _, _ = run_sombrero
+    perflog_dir = Path(sombrero_log_path).parent
+    archive_path = tmp_path / "archive"
+
+    convert_perflogs(perflog_dir, archive_path)
+    assert log_hand.is_archive(archive_path)
+    # check converting again replaces the previous archive
+    convert_perflogs(perflog_dir, archive_path)
+
+    df = PerflogHandler(perflog_dir).get_df()
+    archive_df = PerflogHandler(archive_path).get_df()
+    # check all columns and rows are archived
+    assert archive_df.columns.tolist() == df.columns.tolist()
+    assert len(archive_df) == len(df)
+    assert sorted(archive_df["jobid"].astype(str)) == sorted(df["jobid"].astype(str))
+
+    # check only requested columns are read
+    projected_df = PerflogHandler(archive_path, columns=["tasks", "flops_value", "nonexistent"]).get_df()
+    assert sorted(projected_df.columns) == ["flops_value", "tasks"]
+
+    # check non-archive directories are not overwritten
+    with pytest.raises(FileExistsError):
+        convert_perflogs(perflog_dir, perflog_dir)
+
+    # check plotted data is unchanged
+    config = ConfigHandler(
+        {"title": "Title",
+         "plot_type": "generic",
+         "x_axis": {"value": "tasks",
+                    "units": {"custom": None},
+                    "range": {"min": None, "max": None}},
+         "y_axis": {"value": "flops_value",
+                    "units": {"column": "flops_unit"},
+                    "range": {"min": None, "max": None}},
+         "filters": {"and": [["job_completion_time", ">", "2010-01-01T00:00:00"]], "or": []},
+         "series": [["cpus_per_task", 1], ["cpus_per_task", 2]],
+         "column_types": {"tasks": "int",
+                          "flops_value": "float",
+                          "flops_unit": "str",
+                          "job_completion_time": "datetime",
+                          "cpus_per_task": "int"}})
+    archive_plot_df = PostProcessing(archive_path, save_plot=False).run_post_processing(config)
+    plot_df = PostProcessing(perflog_dir, save_plot=False).run_post_processing(config)
+    assert archive_plot_df.reset_index(drop=True).equals(plot_df.reset_index(drop=True))
+
+
+# Test that batch post-processing gives the same results as processing each config separately
+def test_batch_post_processing(run_sombrero, tmp_path):
+
+    sombrero_log_path, _, _ = run_sombrero
+    config_dict = {"title": "Title",
+                   "plot_type": "generic",
+                   "x_axis": {"value": "tasks",
+                              "units": {"custom": None},
+                              "range": {"min": None, "max": None}},
+                   "y_axis": {"value": "flops_value",
+                              "units": {"column": "flops_unit"},
+                              "range": {"min": None, "max": None}},
+                   "filters": {"and": [], "or": []},
+                   "series": [["cpus_per_task", 1], ["cpus_per_task", 2]],
+                   "column_types": {"tasks": "int",
+                                    "flops_value": "float",
+                                    "flops_unit": "str",
+                                    "cpus_per_task": "int"}}
+    configs = [ConfigHandler(copy.deepcopy(config_dict))]
+    config_dict["series"] = []
+    config_dict["filters"]["and"] = [["cpus_per_task", "==", 2]]
+    config_dict["y_axis"]["scaling"] = {"custom": 2}
+    configs.append(ConfigHandler(config_dict))
+    for i, config in enumerate(configs):
+        with open(tmp_path / "config_{0}.yaml".format(i), "w") as file:
+            file.write(config.to_yaml())
+    # invalid config (column not in perflogs)
+    with open(tmp_path / "config_2.yml", "w") as file:
+        file.write(configs[0].to_yaml().replace("flops_value", "nonexistent"))
+
+    # check configs are found in a directory and with a glob pattern
+    config_files = find_configs(str(tmp_path))
+    assert [Path(f).name for f in config_files] == ["config_0.yaml", "config_1.yaml", "config_2.yml"]
+    assert find_configs(str(tmp_path / "*.yaml")) == config_files[:2]
+    with pytest.raises(FileNotFoundError):
+        find_configs(str(tmp_path / "*.txt"))
+
+    expected_rows = [len(PostProcessing(sombrero_log_path, save_plot=False).run_post_processing(config))
+                     for config in configs]
+    for workers in [1, 2]:
+        results = run_batch(sombrero_log_path, config_files, tmp_path / "output", workers=workers)
+        # check results are returned in config order and a failed config does not stop the batch
+        assert [r["config"] for r in results] == config_files
+        assert [r["rows"] for r in results] == expected_rows + [None]
+        assert results[0]["error"] is None and results[1]["error"] is None
+        assert results[2]["error"] is not None
+        # check outputs of each config are stored separately
+        assert os.path.isfile(tmp_path / "output" / "config_0" / "Title.html")
+        assert os.path.isfile(tmp_path / "output" / "config_1" / "Title.html")
+
+
+# Test that regressions are found in the latest runs of each test
+def test_regressions():
+
+    rows = []
+    for day in range(12):
+        for test_name, unit in [("Flops", "Gflops/s"), ("Time", "s")]:
+            for cpus in [1, 2]:
+                # small run-to-run variation
+                value = 10.0 * (1 + (day % 3 - 1) * 0.01)
+                if day == 11 and cpus == 2:
+                    # worse flops (lower) and worse time (higher)
+                    value = 8.0 if test_name == "Flops" else 13.0
+                if day == 11 and cpus == 1 and test_name == "Time":
+                    # better time is not a regression
+                    value = 7.0
+                rows.append({"job_completion_time": "2024-01-{0:02d}T12:00:00+00:00".format(day + 1),
+                             "info": "{0} %cpus_per_task={1} /abcd @s:p+e".format(test_name, cpus),
+                             "test_name": test_name, "cpus_per_task": cpus, "system": "s", "partition": "p",
+                             "environ": "e", "spack_spec": "bench@1.0", "perf_value": value, "perf_unit": unit})
+    df = pd.DataFrame(rows)
+
+    regressions, num_series = find_regressions(df)
+    assert num_series == 4
+    # check only worse results are reported, most severe first
+    assert [(r["test_name"], r["params"]) for r in regressions] == [("Time", {"cpus_per_task": 2}),
+                                                                     ("Flops", {"cpus_per_task": 2})]
+    assert regressions[0]["lower_is_better"] and not regressions[1]["lower_is_better"]
+    assert regressions[1]["baseline_runs"] == 10 and regressions[1]["latest_median"] == 8.0
+    assert regressions[1]["change"] == pytest.approx(0.2)
+    # check the report is JSON serialisable
+    assert json.loads(json.dumps(regressions)) == regressions
+
+    # check performance direction can be overridden and thresholds are applied
+    regressions, _ = find_regressions(df, lower_is_better=["perf"])
+    assert [r["test_name"] for r in regressions] == ["Time"]
+    assert find_regressions(df, min_change=0.5)[0] == []
+    assert find_regressions(df, min_baseline_runs=11)[0] == []
+
+
+# Test that SQL queries over perflog data only load the columns they use
+def test_perflog_query(run_sombrero, tmp_path):
+
+    df = pd.DataFrame({"test_name": ["Stream", "Stream", "HPL", "HPL"],
+                       "system": "s",
+                       "tasks": ["1", "2", "1", "2"],
+                       "bandwidth_value": [10.0, 20.0, None, None],
+                       "flops_value": [None, None, 5.0, 9.0],
+                       "unused": "x"})
+    df["system"] = df["system"].astype("category")
+
+    # check identifiers in string literals and aliases are handled and wildcards select all columns
+    assert get_query_columns("SELECT tasks AS unused FROM perflogs WHERE test_name = 'system'",
+                             df.columns) == ["test_name", "tasks", "unused"]
+    assert get_query_columns("SELECT count(*) FROM perflogs", df.columns) == []
+    assert get_query_columns("SELECT p.* FROM perflogs p", df.columns) == df.columns.tolist()
+
+    # check a join between two tests
+    sql = ("SELECT CAST(s.tasks AS INTEGER) AS tasks, h.flops_value / s.bandwidth_value AS intensity "
+           "FROM perflogs s JOIN perflogs h ON s.tasks = h.tasks AND s.system = h.system "
+           "WHERE s.test_name = ? AND h.test_name = ? ORDER BY tasks")
+    with PerflogQuery(df) as perflog_query:
+        result = perflog_query.query(sql, ("Stream", "HPL"))
+        assert result.values.tolist() == [[1, 0.5], [2, 0.45]]
+        assert perflog_query.table_columns == ["test_name", "system", "tasks", "bandwidth_value", "flops_value"]
+        # check the table is only rebuilt for new columns
+        assert perflog_query.query("SELECT count(*) AS n FROM perflogs WHERE unused = 'x'")["n"][0] == 4
+        assert perflog_query.table_columns[-1] == "unused"
+
+    # check archive columns are read as needed
+    write_archive(df, tmp_path / "archive")
+    with PerflogQuery.from_path(tmp_path / "archive") as perflog_query:
+        result = perflog_query.query("SELECT test_name, max(flops_value) AS flops FROM perflogs "
+                                     "GROUP BY test_name ORDER BY test_name")
+        assert result["flops"].tolist()[0] == 9.0
+        assert perflog_query.table_columns == ["test_name", "flops_value"]
+
+    # check query results can be plotted (with column names matched ignoring case)
+    plot = plot_query(result, "Title", "test_name", "flops", save_plot=False)
+    assert plot.title.text == "Title"
+    other_plot = plot_query(result, "Title", "TEST_NAME", {"value": "Flops", "units": {"custom": None}},
+                            save_plot=False)
+    assert other_plot.yaxis[0].axis_label == plot.yaxis[0].axis_label
+    with pytest.raises(KeyError):
+        plot_query(result, "Title", "test_name", "flops_value", save_plot=False)
+
+    # check perflog columns referred to with a different case are loaded
+    sombrero_log_path, _, _ = run_sombrero
+    sql = "SELECT CAST(TASKS AS INTEGER) AS tasks, Flops_Value FROM perflogs ORDER BY Flops_Value"
+    with PerflogQuery.from_path(sombrero_log_path, columns=list(get_identifiers(sql))) as perflog_query:
+        assert perflog_query.columns == ["flops_value", "tasks"]
+        result = perflog_query.query(sql)
+        assert result["flops_value"].tolist() == [0.5, 0.9, 1.1, 2.0]
+
+
+# Test that series can be defined by combinations of values of several columns
+def test_multi_column_series():
+
+    df = pd.DataFrame({"tasks": [1, 2, 1, 2, 1, 2, 1, 2, 1],
+                       "cpus_per_task": [1, 1, 2, 2, 1, 1, 2, 2, 1],
+                       "environ": ["gnu"] * 4 + ["cray"] * 4 + ["intel"],
+                       "flops_value": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0],
+                       "flops_unit": "Gflop/s"})
+    config_dict = {"title": "Title",
+                   "plot_type": "line",
+                   "x_axis": {"value": "tasks",
+                              "units": {"custom": None},
+                              "range": {"min": None, "max": None}},
+                   "y_axis": {"value": "flops_value",
+                              "units": {"column": "flops_unit"},
+                              "range": {"min": None, "max": None}},
+                   "filters": {"and": [], "or": []},
+                   "series": [["cpus_per_task", 1], ["cpus_per_task", 2], ["environ", "gnu"], ["environ", "cray"]],
+                   "column_types": {"tasks": "int",
+                                    "cpus_per_task": "int",
+                                    "environ": "str",
+                                    "flops_value": "float",
+                                    "flops_unit": "str"}}
+
+    # check rows must match a series value of each series column
+    post = PostProcessing.from_dataframe(df, save_plot=False)
+    plot_df = post.run_post_processing(ConfigHandler(config_dict))
+    assert len(plot_df) == 8
+    # check one line per combination of series values (with string series values)
+    colours = [r.glyph.line_color for r in post.plot.renderers]
+    assert len(set(colours)) == 4
+    assert [item.label.value for item in post.plot.legend[0].items] == [
+        "cpus per task = 1, environ = cray", "cpus per task = 1, environ = gnu",
+        "cpus per task = 2, environ = cray", "cpus per task = 2, environ = gnu"]
+
+    # check bars are grouped by x-axis value and series
+    config_dict["plot_type"] = "generic"
+    post.reset_df()
+    post.run_post_processing(ConfigHandler(config_dict))
+    assert post.plot.x_range.factors[:2] == [("1", "1, cray"), ("1", "1, gnu")]
+
+    # check series are scaled by the selected series with the same values of other series columns
+    config_dict["y_axis"]["scaling"] = {"column": {"name": "flops_value", "series": 0}}
+    post.reset_df()
+    plot_df = post.run_post_processing(ConfigHandler(config_dict))
+    assert plot_df.sort_index()["flops_value"].tolist() == [1.0, 1.0, 3.0, 2.0, 1.0, 1.0, 1.4, 8 / 6]
+
+    # check repeated runs of a series are rejected
+    post = PostProcessing.from_dataframe(pd.concat([df, df.iloc[:1]], ignore_index=True), save_plot=False)
+    with pytest.raises(RuntimeError):
+        post.run_post_processing(ConfigHandler(config_dict))
+
+
+# Test that generic plot axis factors and legend items follow the typed sort order
+def test_plot_generic_sorting():
+
+    df = pd.DataFrame({"size": pd.array([10, 2, 10, 2, 1, 1], dtype="Int64"),
+                       "nodes": pd.array([2, 10, 10, 2, 2, 10], dtype="Int64"),
+                       "bw_value": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+                       "bw_unit": "GB/s"})
+    x_axis = {"value": "size", "units": {"custom": None}, "range": {"min": None, "max": None}}
+    y_axis = {"value": "bw_value", "units": {"column": "bw_unit"}, "range": {"min": None, "max": None}}
+    series_filters = [["nodes", "==", 2], ["nodes", "==", 10]]
+
+    # check numbers are sorted numerically rather than as strings
+    plot = plot_generic("Title", df.copy(), x_axis, y_axis, series_filters, save_plot=False)
+    assert plot.x_range.factors == [("1", "2"), ("1", "10"), ("2", "2"), ("2", "10"),
+                                    ("10", "2"), ("10", "10")]
+    assert [item.label.value for item in plot.legend[0].items] == ["nodes = 2", "nodes = 10"]
+    # check plotted means are paired with their factors
+    data = plot.renderers[0].data_source.data
+    assert dict(zip(data["size_nodes"], data["bw_value_mean"]))[("10", "10")] == 3.0
+
+    # check descending order is applied to both
+    x_axis["sort"] = "descending"
+    plot = plot_generic("Title", df.copy(), x_axis, y_axis, series_filters, save_plot=False)
+    assert plot.x_range.factors[0] == ("10", "10")
+    assert [item.label.value for item in plot.legend[0].items] == ["nodes = 10", "nodes = 2"]
+
+
+# Test that large line chart series are downsampled without losing peaks
+def test_downsampling():
+
+    df = pd.DataFrame({"time": pd.date_range("2024-01-01", periods=1000, freq="h"),
+                       "flops_value": [float(i % 10) for i in range(1000)],
+                       "flops_unit": "Gflop/s",
+                       "tasks": 1,
+                       "flagged": None})
+    df.loc[500, "flops_value"] = 100.0
+    df.loc[250, "flops_value"] = -100.0
+    df.loc[750, "flagged"] = 1.0
+
+    # check the first, last, and extreme points are kept by both methods
+    for method in ["lttb", "min_max"]:
+        result = downsample(df, "time", "flops_value", 50, method)
+        assert len(result) <= 50
+        assert {0, 250, 500, 999} <= set(result.index)
+        assert result["time"].is_monotonic_increasing
+    # check rows of kept columns are added to the target points
+    assert 750 in downsample(df, "time", "flops_value", 50, keep_columns=["flagged"]).index
+
+    # check downsampling is configured and noted in the plot
+    config_dict = {"title": "Title",
+                   "plot_type": "line",
+                   "x_axis": {"value": "time",
+                              "units": {"custom": None},
+                              "range": {"min": None, "max": None}},
+                   "y_axis": {"value": "flops_value",
+                              "units": {"column": "flops_unit"},
+                              "range": {"min": None, "max": None}},
+                   "filters": {"and": [], "or": []},
+                   "series": [["tasks", 1]],
+                   "column_types": {"time": "datetime",
+                                    "flops_value": "float",
+                                    "flops_unit": "str",
+                                    "tasks": "int"},
+                   "downsampling": {"points": 100, "method": "min_max"}}
+    post_process = PostProcessing.from_dataframe(df.drop(columns="flagged"), save_plot=False)
+    post_process.run_post_processing(ConfigHandler(config_dict))
+    assert len(post_process.plot.renderers[0].data_source.data["flops_value"]) <= 100
+    assert any("Downsampled to 100 points" in t.text for t in post_process.plot.above
+               if hasattr(t, "text"))
+
+    # check invalid downsampling options are rejected
+    config_dict["downsampling"] = {"points": 2}
+    with pytest.raises(RuntimeError):
+        ConfigHandler(config_dict)
+
+
+# Test that the command line script saves plots with its plot options and profiles plotting
+def test_command_line_plot_output(run_sombrero, tmp_path):
+
+    sombrero_log_path, _, _ = run_sombrero
+    config = ConfigHandler(
+        {"title": "Command Line",
+         "plot_type": "generic",
+         "x_axis": {"value": "tasks",
+                    "units": {"custom": None},
+                    "range": {"min": None, "max": None}},
+         "y_axis": {"value": "flops_value",
+                    "units": {"column": "flops_unit"},
+                    "range": {"min": None, "max": None}},
+         "filters": {"and": [["cpus_per_task", "==", 1]], "or": []},
+         "series": [],
+         "column_types": {"tasks": "int",
+                          "flops_value": "float",
+                          "flops_unit": "str",
+                          "cpus_per_task": "int"}})
+    with open(tmp_path / "config.yaml", "w") as file:
+        file.write(config.to_yaml())
+
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "post_processing.py")
+    sp.run([sys.executable, script, sombrero_log_path, str(tmp_path / "config.yaml"), "-o", str(tmp_path),
+            "--webgl", "--sidecar", "--profile", str(tmp_path / "profile.json")], check=True)
+
+    # check the plot is saved without the debug flag
+    assert os.path.isfile(tmp_path / "Command_Line.html")
+    assert os.path.isfile(tmp_path / "Command_Line.json")
+    with open(tmp_path / "profile.json", "r") as file:
+        assert "plotting" in [stage["stage"] for stage in json.load(file)["stages"]]
+
+
+# Test that plots can be drawn with WebGL and saved with their data in a separate file
+def test_plot_output(tmp_path):
+
+    df = pd.DataFrame({"tasks": [1, 2, 4, 1, 2, 4],
+                       "flops_value": [1.0, 2.0, 4.0, 2.0, 4.0, 8.0],
+                       "flops_unit": "Gflop/s",
+                       "cpus": pd.array([1, 1, 1, 2, 2, 2], dtype="Int64"),
+                       "system": "archer2"})
+    x_axis = {"value": "tasks", "units": {"custom": None}, "range": {"min": None, "max": None}}
+    y_axis = {"value": "flops_value", "units": {"column": "flops_unit"}, "range": {"min": None, "max": None}}
+
+    plot = plot_line_chart("Sidecar Plot", df, x_axis, y_axis, [["cpus", "==", 1], ["cpus", "==", 2]],
+                           tmp_path, True, webgl=True, sidecar=True)
+    assert plot.output_backend == "webgl"
+    # check sources only contain plotted columns
+    assert list(plot.renderers[0].data_source.data) == ["tasks", "flops_value"]
+
+    # check the page loads the plot from the JSON file
+    with open(tmp_path / "Sidecar_Plot.json", "r") as file:
+        assert json.load(file)["target_id"] == "plot-Sidecar_Plot"
+    with open(tmp_path / "Sidecar_Plot.html", "r") as file:
+        page = file.read()
+    assert 'fetch("Sidecar_Plot.json")' in page
+    assert '<div id="plot-Sidecar_Plot">' in page
+    assert "archer2" not in page
+
+    # check titles with special characters give the same element id in the page and the plot JSON
+    plot_line_chart("R&D <\"Plot\">", df, x_axis, y_axis, [["cpus", "==", 1]], tmp_path, True, sidecar=True)
+    with open(tmp_path / "R&D_<\"Plot\">.json", "r") as file:
+        target = json.load(file)["target_id"]
+    with open(tmp_path / "R&D_<\"Plot\">.html", "r") as file:
+        page = file.read()
+    assert '<div id="{0}">'.format(target) in page
+    assert 'fetch("R&D_\\u003c\\"Plot\\">.json")' in page
+
+
 # Test that high-level control script works as expected
 def test_high_level_script(run_sombrero):
 